@@ -4,21 +4,61 @@ Firestore database operations for CMS.
 This module provides helper functions for interacting with Firestore collections:
 - blogs: Blog posts and content management
 - images: Generated and uploaded images
+- jobs: Long-running jobs interrupted by a shutdown, kept for resumption
+- blog_stats: Per-owner blog counts, kept up to date by a background task
+
+Blog storage layout:
+- blogs/{blog_id}: lightweight header (owner, status, meta, admin_review, dates,
+  plus a small "summary" of the rendered blog used by list pages)
+- blogs/{blog_id}/content/body: the heavy final_blog (render + markdown + html),
+  only read when a single blog is opened
+- blogs/{blog_id}/revisions/{version}: revision history of meta + final_blog,
+  stored as a compressed delta against the previous version, with a full
+  snapshot every REVISION_SNAPSHOT_INTERVAL versions (see core.delta)
+
+The header's "version" counts content edits (meta / final_blog). It is the
+base version of PATCH autosaves (patch_blog); status transitions and admin
+comments do not change it. "revision_snapshot" is the version of the latest
+full snapshot, which the deltas of newer revisions chain from.
 
 All database operations use Firestore, which is shared with the main dashboard
 for user management (users collection).
 """
 import logging
 from datetime import datetime
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Callable
 
+from google.api_core.exceptions import NotFound
 from google.cloud import firestore
 from google.cloud.firestore_v1.base_query import FieldFilter
 
+from core.config import settings
+from core.delta import make_delta, apply_delta, pack, unpack
+from core.executors import run_in_executor
 from core.firestore_db import get_db
+from core.metrics import firestore_op, record_firestore
+from core.singleflight import SingleFlight
 
 logger = logging.getLogger(__name__)
 
+# Heavy blog content lives in a per-blog subcollection document
+BLOG_BODY_COLLECTION = 'content'
+BLOG_BODY_DOC_ID = 'body'
+BLOG_SUMMARY_FIELDS = ('title', 'cover_image_url', 'intro_md')
+BLOG_REVISIONS_COLLECTION = 'revisions'
+BLOG_CONTENT_FIELDS = ('meta', 'final_blog')
+BLOG_REVISION_LIST_FIELDS = [
+    'version', 'kind', 'snapshot_version', 'size', 'created_at',
+    'source', 'author_id', 'author_name', 'restored_from',
+]
+
+# Firestore allows at most 500 writes per batch
+BATCH_WRITE_LIMIT = 500
+
+
+class BlogNotFoundError(LookupError):
+    """Raised by transactional helpers when the blog document does not exist."""
+
 
 def get_blogs_collection():
     """Get Firestore blogs collection"""
@@ -26,19 +66,147 @@ def get_blogs_collection():
     return db.collection('blogs')
 
 
+def get_blog_body_ref(blog_id: str):
+    """Get the document reference holding a blog's final_blog body"""
+    return get_blogs_collection().document(blog_id).collection(BLOG_BODY_COLLECTION).document(BLOG_BODY_DOC_ID)
+
+
+def get_blog_revision_ref(blog_id: str, version: int):
+    """Get the document reference of one blog revision (IDs sort by version)"""
+    return get_blogs_collection().document(blog_id).collection(BLOG_REVISIONS_COLLECTION).document(f"{version:08d}")
+
+
 def get_images_collection():
     """Get Firestore images collection"""
     db = get_db()
     return db.collection('images')
 
 
+def _get_field(data: Dict[str, Any], field_path: str) -> Any:
+    """Resolve a dotted field path (e.g. "admin_review.requested_at") in a document dict."""
+    value: Any = data
+    for part in field_path.split('.'):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def _blog_summary(final_blog: Dict[str, Any]) -> Dict[str, Any]:
+    """Small subset of final_blog.render kept on the blog header for list pages."""
+    render = (final_blog or {}).get('render') or {}
+    return {field: render.get(field, "") for field in BLOG_SUMMARY_FIELDS}
+
+
+def _split_blog_doc(doc: Dict[str, Any]):
+    """Split a full blog dict into (header, body); body is None when there is no final_blog."""
+    header = dict(doc)
+    final_blog = header.pop('final_blog', None)
+    if final_blog is None:
+        return header, None
+    header['summary'] = _blog_summary(final_blog)
+    return header, {'final_blog': final_blog}
+
+
+def blog_summary_field(blog: Dict[str, Any], field: str) -> str:
+    """
+    Read a rendered-blog field (title, cover_image_url, intro_md) from a blog header.
+    
+    Falls back to the legacy inline final_blog.render for documents that were
+    not migrated to the header/body layout yet.
+    """
+    value = (blog.get('summary') or {}).get(field)
+    if value:
+        return value
+    return ((blog.get('final_blog') or {}).get('render') or {}).get(field, "") or ""
+
+
+def _to_firestore_updates(updates: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert nested dict updates to dot notation for Firestore."""
+    firestore_updates = {}
+    for key, value in updates.items():
+        if '.' in key:
+            # Already in dot notation (e.g., "admin_review.reviewed_at")
+            firestore_updates[key] = value
+        elif isinstance(value, dict):
+            # Convert nested dict to dot notation
+            for nested_key, nested_value in value.items():
+                firestore_updates[f"{key}.{nested_key}"] = nested_value
+        else:
+            firestore_updates[key] = value
+    return firestore_updates
+
+
+def _bumps_version(updates: Dict[str, Any]) -> bool:
+    """True when updates change blog content (meta / final_blog), i.e. the blog's version."""
+    return any(key.split('.')[0] in BLOG_CONTENT_FIELDS for key in updates)
+
+
+def _snapshot_due(header: Dict[str, Any], version: int) -> bool:
+    """Whether revision `version` must be a full snapshot instead of a delta."""
+    base = header.get('revision_snapshot')
+    return base is None or version - base >= settings.REVISION_SNAPSHOT_INTERVAL
+
+
+def _build_revision(
+    header: Dict[str, Any],
+    version: int,
+    old_content: Dict[str, Any],
+    new_content: Dict[str, Any],
+    revision: Optional[Dict[str, Any]],
+    now: datetime,
+):
+    """
+    Revision document for `version` and the header updates that go with it.
+    
+    new_content holds the content fields written by this version; it must hold
+    all of BLOG_CONTENT_FIELDS when _snapshot_due(). old_content holds the same
+    fields at the previous version (for the delta).
+    """
+    doc: Dict[str, Any] = {'version': version, 'created_at': now, **(revision or {})}
+    if _snapshot_due(header, version):
+        data = pack({field: new_content[field] for field in BLOG_CONTENT_FIELDS})
+        doc.update(kind='snapshot', snapshot_version=version)
+        header_updates = {'revision_snapshot': version}
+    else:
+        delta = make_delta({f: old_content.get(f) for f in new_content}, new_content)
+        data = pack(delta)
+        doc.update(kind='delta', snapshot_version=header['revision_snapshot'])
+        header_updates = {}
+    doc.update(data=data, size=len(data))
+    return doc, header_updates
+
+
+def _diff_updates(old: Any, new: Any, prefix: str) -> Dict[str, Any]:
+    """
+    Minimal dot-notation updates turning old into new.
+
+    Nested dicts are compared key by key; lists and scalars are written whole when
+    they differ (Firestore cannot update a single list element).
+    """
+    if not isinstance(old, dict) or not isinstance(new, dict):
+        return {} if old == new else {prefix: new}
+    updates: Dict[str, Any] = {}
+    for key, value in new.items():
+        if key not in old:
+            updates[f"{prefix}.{key}"] = value
+        else:
+            updates.update(_diff_updates(old[key], value, f"{prefix}.{key}"))
+    for key in old.keys() - new.keys():
+        updates[f"{prefix}.{key}"] = firestore.DELETE_FIELD
+    return updates
+
+
 # Helper functions for blogs
-def create_blog(doc: Dict[str, Any]) -> str:
+@firestore_op("create_blog")
+def create_blog(doc: Dict[str, Any], revision: Optional[Dict[str, Any]] = None) -> str:
     """
-    Create a blog document in Firestore and return document ID.
+    Create a blog (header + body documents) in Firestore and return document ID.
     
     Args:
-        doc: Dictionary containing blog data
+        doc: Dictionary containing blog data; with a "version" and full content
+            (meta + final_blog), that version is also stored as a revision snapshot
+        revision: Extra fields for the revision document (source, author_id, ...)
         
     Returns:
         str: The Firestore document ID of the created blog
@@ -47,7 +215,23 @@ def create_blog(doc: Dict[str, Any]) -> str:
         blogs_col = get_blogs_collection()
         doc['created_at'] = doc.get('created_at', datetime.utcnow())
         doc['updated_at'] = doc.get('updated_at', datetime.utcnow())
-        _, doc_ref = blogs_col.add(doc)
+        header, body = _split_blog_doc(doc)
+        doc_ref = blogs_col.document()
+        batch = get_db().batch()
+        writes = 1 if body is None else 2
+        version = doc.get('version')
+        if version and all(doc.get(field) is not None for field in BLOG_CONTENT_FIELDS):
+            revision_doc, header_updates = _build_revision(
+                {}, version, {}, {field: doc[field] for field in BLOG_CONTENT_FIELDS}, revision, doc['created_at']
+            )
+            header.update(header_updates)
+            batch.set(get_blog_revision_ref(doc_ref.id, version), revision_doc)
+            writes += 1
+        batch.set(doc_ref, header)
+        if body is not None:
+            batch.set(get_blog_body_ref(doc_ref.id), body)
+        batch.commit()
+        record_firestore(writes=writes)
         logger.info(f"Created blog with ID: {doc_ref.id}")
         return doc_ref.id
     except Exception as e:
@@ -55,12 +239,14 @@ def create_blog(doc: Dict[str, Any]) -> str:
         raise
 
 
-def get_blog_by_id(blog_id: str) -> Optional[Dict[str, Any]]:
+@firestore_op("get_blog_by_id")
+def get_blog_by_id(blog_id: str, include_body: bool = False) -> Optional[Dict[str, Any]]:
     """
     Get a blog by document ID.
     
     Args:
         blog_id: Firestore document ID
+        include_body: Also fetch the final_blog body document (one batched read)
         
     Returns:
         Optional[Dict]: Blog data if found, None otherwise
@@ -68,57 +254,405 @@ def get_blog_by_id(blog_id: str) -> Optional[Dict[str, Any]]:
     try:
         blogs_col = get_blogs_collection()
         doc_ref = blogs_col.document(blog_id)
-        doc = doc_ref.get()
-        if doc.exists:
-            data = doc.to_dict()
-            data['id'] = doc.id
-            return data
-        return None
+        if not include_body:
+            doc = doc_ref.get()
+            record_firestore(reads=1)
+            if doc.exists:
+                data = doc.to_dict()
+                data['id'] = doc.id
+                return data
+            return None
+
+        body_ref = get_blog_body_ref(blog_id)
+        snapshots = {snap.reference.path: snap for snap in get_db().get_all([doc_ref, body_ref])}
+        record_firestore(reads=len(snapshots))
+        doc = snapshots.get(doc_ref.path)
+        if doc is None or not doc.exists:
+            return None
+        data = doc.to_dict()
+        data['id'] = doc.id
+        body = snapshots.get(body_ref.path)
+        if body is not None and body.exists:
+            # Legacy documents keep final_blog inline until migrated
+            data['final_blog'] = (body.to_dict() or {}).get('final_blog')
+        return data
     except Exception as e:
         logger.error(f"Error getting blog {blog_id}: {e}")
         raise
 
 
-def update_blog(blog_id: str, updates: Dict[str, Any]) -> bool:
+@firestore_op("get_blog_body")
+def get_blog_body(blog_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Get only a blog's final_blog from its body document.
+    
+    Returns:
+        Optional[Dict]: final_blog, or None if the blog has no body document
+        (legacy blogs keep final_blog inline in the header)
+    """
+    doc = get_blog_body_ref(blog_id).get()
+    record_firestore(reads=1)
+    if not doc.exists:
+        return None
+    return (doc.to_dict() or {}).get('final_blog')
+
+
+@firestore_op("get_blogs_by_ids")
+def get_blogs_by_ids(blog_ids: List[str], include_body: bool = False) -> Dict[str, Optional[Dict[str, Any]]]:
     """
-    Update a blog document in Firestore.
+    Get several blogs in a single batched read (Firestore get_all).
     
     Args:
-        blog_id: Firestore document ID
-        updates: Dictionary of fields to update (supports nested fields with dot notation)
+        blog_ids: Firestore document IDs (duplicates are read once)
+        include_body: Also fetch each blog's final_blog body document
         
     Returns:
-        bool: True if update was successful
+        Dict[str, Optional[Dict]]: Blog data keyed by ID in request order, None for missing blogs
     """
     try:
         blogs_col = get_blogs_collection()
-        doc_ref = blogs_col.document(blog_id)
-        updates['updated_at'] = datetime.utcnow()
-        
-        # Convert nested dict updates to dot notation for Firestore
-        firestore_updates = {}
-        for key, value in updates.items():
-            if '.' in key:
-                # Already in dot notation (e.g., "admin_review.reviewed_at")
-                firestore_updates[key] = value
-            elif isinstance(value, dict):
-                # Convert nested dict to dot notation
-                for nested_key, nested_value in value.items():
-                    firestore_updates[f"{key}.{nested_key}"] = nested_value
-            else:
-                firestore_updates[key] = value
+        ids = list(dict.fromkeys(blog_ids))
+        refs = [blogs_col.document(blog_id) for blog_id in ids]
+        if include_body:
+            refs += [get_blog_body_ref(blog_id) for blog_id in ids]
+        snapshots = {snap.reference.path: snap for snap in get_db().get_all(refs)}
+        record_firestore(reads=len(snapshots))
         
-        doc_ref.update(firestore_updates)
-        logger.info(f"Updated blog {blog_id}")
-        return True
+        results: Dict[str, Optional[Dict[str, Any]]] = {}
+        for blog_id, doc_ref in zip(ids, refs):
+            doc = snapshots.get(doc_ref.path)
+            if doc is None or not doc.exists:
+                results[blog_id] = None
+                continue
+            data = doc.to_dict()
+            data['id'] = doc.id
+            if include_body:
+                body = snapshots.get(get_blog_body_ref(blog_id).path)
+                if body is not None and body.exists:
+                    data['final_blog'] = (body.to_dict() or {}).get('final_blog')
+            results[blog_id] = data
+        return results
     except Exception as e:
-        logger.error(f"Error updating blog {blog_id}: {e}")
+        logger.error(f"Error batch getting blogs: {e}")
         raise
 
 
+def _read_blog_body(transaction, blog_id: str, header: Dict[str, Any], io: Dict[str, int]) -> Optional[Dict[str, Any]]:
+    """final_blog read inside a transaction (from the body document, else the legacy inline copy)."""
+    body = get_blog_body_ref(blog_id).get(transaction=transaction)
+    _add_io(io, reads=1)
+    if body.exists:
+        return (body.to_dict() or {}).get('final_blog')
+    return header.get('final_blog')
+
+
+def _add_io(io: Dict[str, int], reads: int = 0, writes: int = 0, rpcs: int = 1) -> None:
+    """Tally one RPC of a transaction attempt (recorded once the transaction is done)."""
+    io['reads'] += reads
+    io['writes'] += writes
+    io['rpcs'] += rpcs
+
+
+def _run_and_record(run: Callable[[Any], Dict[str, Any]], transaction, io: Dict[str, int]) -> Dict[str, Any]:
+    """
+    Run a transactional function and record the I/O of its last attempt once.
+
+    Firestore retries the function on contention; recording inside it would
+    count every attempt's reads and writes again. Writes only count when the
+    transaction committed.
+    """
+    try:
+        result = run(transaction)
+    except Exception:
+        record_firestore(reads=io['reads'], rpcs=io['rpcs'])
+        raise
+    record_firestore(reads=io['reads'], writes=io['writes'], rpcs=io['rpcs'])
+    return result
+
+
+@firestore_op("update_blog_transactionally")
+def update_blog_transactionally(
+    blog_id: str,
+    build_updates: Callable[[Dict[str, Any]], Dict[str, Any]],
+    max_attempts: int = 5,
+    revision: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Read a blog and update it atomically in a Firestore transaction.
+    
+    build_updates(blog) receives the blog header read inside the transaction and
+    returns the updates to apply (dot-notation fields, final_blog allowed).
+    Any exception it raises aborts the transaction unchanged. The header write is
+    additionally guarded by the update_time that was read; on contention Firestore
+    retries the whole function up to max_attempts times.
+    
+    Content given as whole meta / final_blog values is compared with the stored
+    content (the body is read for that): unchanged fields are not rewritten, and
+    a change increments the version and adds a revision in the same transaction.
+    
+    Args:
+        blog_id: Firestore document ID
+        build_updates: Callback producing the updates dict
+        max_attempts: Transaction attempts before giving up
+        revision: Extra fields for the revision document (source, author_id, ...)
+        
+    Returns:
+        Dict: The updates that were applied
+    
+    Raises:
+        BlogNotFoundError: If the blog does not exist
+    """
+    db = get_db()
+    doc_ref = get_blogs_collection().document(blog_id)
+    transaction = db.transaction(max_attempts=max_attempts)
+    io = {'reads': 0, 'writes': 0, 'rpcs': 0}
+    
+    @firestore.transactional
+    def _run(transaction) -> Dict[str, Any]:
+        io.update(reads=0, writes=0, rpcs=0)
+        snapshot = doc_ref.get(transaction=transaction)
+        _add_io(io, reads=1)
+        if not snapshot.exists:
+            raise BlogNotFoundError(blog_id)
+        data = snapshot.to_dict()
+        data['id'] = snapshot.id
+        
+        updates = dict(build_updates(data))
+        updates['updated_at'] = updates.get('updated_at', datetime.utcnow())
+        revision_doc = None
+        content_fields = [field for field in BLOG_CONTENT_FIELDS if field in updates]
+        if content_fields:
+            version = data.get('version', 0) + 1
+            old_content = {'meta': data.get('meta')}
+            if 'final_blog' in content_fields or _snapshot_due(data, version):
+                old_content['final_blog'] = _read_blog_body(transaction, blog_id, data, io)
+            for field in content_fields:
+                if updates[field] == old_content.get(field):
+                    del updates[field]
+            new_content = {field: updates[field] for field in BLOG_CONTENT_FIELDS if field in updates}
+            if new_content:
+                full_content = {**old_content, **new_content}
+                revision_doc, header_updates = _build_revision(
+                    data, version, old_content,
+                    full_content if _snapshot_due(data, version) else new_content,
+                    revision, updates['updated_at'],
+                )
+                updates.update(header_updates, version=version)
+        elif _bumps_version(updates):
+            updates['version'] = data.get('version', 0) + 1
+            updates['revision_snapshot'] = firestore.DELETE_FIELD
+        final_blog = updates.pop('final_blog', None)
+        if final_blog is not None:
+            updates['summary'] = _blog_summary(final_blog)
+        
+        firestore_updates = _to_firestore_updates(updates)
+        writes = 1
+        if final_blog is not None:
+            firestore_updates['final_blog'] = firestore.DELETE_FIELD
+            transaction.set(get_blog_body_ref(blog_id), {'final_blog': final_blog})
+            writes += 1
+        if revision_doc is not None:
+            transaction.set(get_blog_revision_ref(blog_id, revision_doc['version']), revision_doc)
+            writes += 1
+        transaction.update(
+            doc_ref,
+            firestore_updates,
+            option=db.write_option(last_update_time=snapshot.update_time),
+        )
+        _add_io(io, writes=writes)
+        return updates
+    
+    applied = _run_and_record(_run, transaction, io)
+    logger.info(f"Transactionally updated blog {blog_id}")
+    return applied
+
+
+@firestore_op("patch_blog")
+def patch_blog(
+    blog_id: str,
+    build_content: Callable[[Dict[str, Any]], Dict[str, Any]],
+    include_body: bool,
+    max_attempts: int = 5,
+    revision: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Apply an incremental content edit to a blog in a Firestore transaction.
+    
+    build_content(blog) receives the blog read inside the transaction (header, plus
+    final_blog when include_body) and returns the new value of each content field it
+    changes ({"meta": ..., "final_blog": ...}); any exception it raises aborts the
+    transaction unchanged. Only the fields that differ from the stored blog are
+    written, with dot notation, and a patch that changes nothing writes nothing.
+    Otherwise the version is incremented, a revision is added and the header
+    write is guarded by the update_time that was read.
+    
+    Args:
+        blog_id: Firestore document ID
+        build_content: Callback producing the new content fields
+        include_body: Also read final_blog (needed when the edit touches it)
+        max_attempts: Transaction attempts before giving up
+        revision: Extra fields for the revision document (source, author_id, ...)
+        
+    Returns:
+        Dict: {"changed", "version", "updated_at", "status"} after the edit
+    
+    Raises:
+        BlogNotFoundError: If the blog does not exist
+    """
+    db = get_db()
+    doc_ref = get_blogs_collection().document(blog_id)
+    body_ref = get_blog_body_ref(blog_id)
+    transaction = db.transaction(max_attempts=max_attempts)
+    io = {'reads': 0, 'writes': 0, 'rpcs': 0}
+    
+    @firestore.transactional
+    def _run(transaction) -> Dict[str, Any]:
+        io.update(reads=0, writes=0, rpcs=0)
+        refs = [doc_ref, body_ref] if include_body else [doc_ref]
+        snapshots = {snap.reference.path: snap for snap in db.get_all(refs, transaction=transaction)}
+        _add_io(io, reads=len(snapshots))
+        snapshot = snapshots.get(doc_ref.path)
+        if snapshot is None or not snapshot.exists:
+            raise BlogNotFoundError(blog_id)
+        data = snapshot.to_dict()
+        data['id'] = snapshot.id
+        body = snapshots.get(body_ref.path)
+        has_body_doc = body is not None and body.exists
+        if has_body_doc:
+            data['final_blog'] = (body.to_dict() or {}).get('final_blog')
+        
+        content = build_content(data)
+        header_updates = _diff_updates(data.get('meta') or {}, content['meta'], 'meta') if 'meta' in content else {}
+        body_updates: Dict[str, Any] = {}
+        if 'final_blog' in content:
+            final_blog = content['final_blog']
+            body_updates = _diff_updates(data.get('final_blog') or {}, final_blog, 'final_blog')
+            if body_updates:
+                header_updates.update(_diff_updates(data.get('summary') or {}, _blog_summary(final_blog), 'summary'))
+        
+        version = data.get('version', 0)
+        if not header_updates and not body_updates:
+            return {"changed": False, "version": version, "updated_at": data.get('updated_at'), "status": data.get('status')}
+        
+        now = datetime.utcnow()
+        changed = {field: content[field] for field in BLOG_CONTENT_FIELDS if field in content}
+        if not body_updates:
+            changed.pop('final_blog', None)
+        if not any(key.startswith('meta.') for key in header_updates):
+            changed.pop('meta', None)
+        old_content = {'meta': data.get('meta'), 'final_blog': data.get('final_blog')}
+        if _snapshot_due(data, version + 1):
+            if not include_body:
+                old_content['final_blog'] = _read_blog_body(transaction, blog_id, data, io)
+            changed = {**old_content, **changed}
+        revision_doc, revision_updates = _build_revision(data, version + 1, old_content, changed, revision, now)
+        header_updates.update(revision_updates)
+        header_updates['version'] = version + 1
+        header_updates['updated_at'] = now
+        transaction.set(get_blog_revision_ref(blog_id, version + 1), revision_doc)
+        writes = 2
+        if body_updates:
+            writes = 3
+            if has_body_doc:
+                transaction.update(body_ref, body_updates)
+            else:
+                # Legacy blog with an inline final_blog: move it to the body document
+                transaction.set(body_ref, {'final_blog': content['final_blog']})
+                header_updates['final_blog'] = firestore.DELETE_FIELD
+        transaction.update(
+            doc_ref,
+            header_updates,
+            option=db.write_option(last_update_time=snapshot.update_time),
+        )
+        _add_io(io, writes=writes)
+        return {"changed": True, "version": version + 1, "updated_at": now, "status": data.get('status')}
+    
+    result = _run_and_record(_run, transaction, io)
+    if result["changed"]:
+        logger.info(f"Patched blog {blog_id} to version {result['version']}")
+    return result
+
+
+@firestore_op("bulk_update_blogs")
+def bulk_update_blogs(
+    blog_ids: List[str],
+    build_updates: Callable[[Dict[str, Any]], Dict[str, Any]],
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Apply per-blog header updates to many blogs with batched reads and writes.
+    
+    All headers are read with one get_all; build_updates(blog) returns the updates
+    for each blog or raises ValueError to skip it. Writes are committed in batches of
+    BATCH_WRITE_LIMIT, each guarded by the update_time that was read, so a blog
+    changed concurrently is reported as failed instead of being overwritten. If a
+    batch fails as a whole, its blogs are retried one by one to get per-item results.
+    
+    Args:
+        blog_ids: Firestore document IDs (duplicates are processed once)
+        build_updates: Callback producing the updates dict (dot notation allowed)
+        
+    Returns:
+        Dict[str, Dict]: {blog_id: {"ok": bool, "error": Optional[str]}} in request order
+    """
+    db = get_db()
+    blogs_col = get_blogs_collection()
+    ids = list(dict.fromkeys(blog_ids))
+    refs = {blog_id: blogs_col.document(blog_id) for blog_id in ids}
+    snapshots = {snap.reference.path: snap for snap in db.get_all(list(refs.values()))}
+    record_firestore(reads=len(snapshots))
+    
+    results: Dict[str, Dict[str, Any]] = {}
+    writes = []
+    for blog_id in ids:
+        doc = snapshots.get(refs[blog_id].path)
+        if doc is None or not doc.exists:
+            results[blog_id] = {"ok": False, "error": "Blog not found"}
+            continue
+        data = doc.to_dict()
+        data['id'] = doc.id
+        try:
+            updates = dict(build_updates(data))
+        except ValueError as e:
+            results[blog_id] = {"ok": False, "error": str(e)}
+            continue
+        updates['updated_at'] = updates.get('updated_at', datetime.utcnow())
+        option = db.write_option(last_update_time=doc.update_time)
+        writes.append((blog_id, _to_firestore_updates(updates), option))
+        results[blog_id] = {"ok": True, "error": None}
+    
+    for start in range(0, len(writes), BATCH_WRITE_LIMIT):
+        chunk = writes[start:start + BATCH_WRITE_LIMIT]
+        batch = db.batch()
+        for blog_id, updates, option in chunk:
+            batch.update(refs[blog_id], updates, option=option)
+        try:
+            batch.commit()
+            record_firestore(writes=len(chunk))
+            continue
+        except Exception as e:
+            logger.warning(f"Bulk blog update batch failed, retrying items individually: {e}")
+        for blog_id, updates, option in chunk:
+            try:
+                refs[blog_id].update(updates, option=option)
+                record_firestore(writes=1)
+            except Exception as e:
+                logger.error(f"Error updating blog {blog_id} in bulk: {e}")
+                results[blog_id] = {"ok": False, "error": "Blog was modified concurrently or could not be updated"}
+    
+    logger.info(f"Bulk updated {sum(1 for r in results.values() if r['ok'])}/{len(ids)} blogs")
+    return results
+
+
+@firestore_op("delete_blog")
 def delete_blog(blog_id: str) -> bool:
     """
-    Delete a blog document from Firestore.
+    Delete a blog document from Firestore, with its body and revision history.
+    
+    Revisions are found by listing the subcollection, not from the version, so
+    one written by an edit that committed meanwhile is deleted too. They go
+    first (if a batch fails, the blog still exists and can be deleted again);
+    a last sweep after the header delete catches revisions of edits that
+    committed in between, and none can follow once the header is gone.
     
     Args:
         blog_id: Firestore document ID
@@ -127,22 +661,104 @@ def delete_blog(blog_id: str) -> bool:
         bool: True if deletion was successful
     """
     try:
-        blogs_col = get_blogs_collection()
-        doc_ref = blogs_col.document(blog_id)
-        doc_ref.delete()
-        logger.info(f"Deleted blog {blog_id}")
+        doc_ref = get_blogs_collection().document(blog_id)
+        deleted = _delete_blog_revisions(doc_ref)
+        batch = get_db().batch()
+        batch.delete(get_blog_body_ref(blog_id))
+        batch.delete(doc_ref)
+        batch.commit()
+        record_firestore(writes=2)
+        deleted += _delete_blog_revisions(doc_ref)
+        logger.info(f"Deleted blog {blog_id} and {deleted} revisions")
         return True
     except Exception as e:
         logger.error(f"Error deleting blog {blog_id}: {e}")
         raise
 
 
+def _delete_blog_revisions(doc_ref) -> int:
+    """Delete every document of a blog's revisions subcollection in batches; returns how many."""
+    refs = list(doc_ref.collection(BLOG_REVISIONS_COLLECTION).list_documents(page_size=BATCH_WRITE_LIMIT))
+    record_firestore(reads=len(refs))
+    for start in range(0, len(refs), BATCH_WRITE_LIMIT):
+        chunk = refs[start:start + BATCH_WRITE_LIMIT]
+        batch = get_db().batch()
+        for ref in chunk:
+            batch.delete(ref)
+        batch.commit()
+        record_firestore(writes=len(chunk))
+    return len(refs)
+
+
+@firestore_op("list_blog_revisions")
+def list_blog_revisions(blog_id: str, before_version: int, limit: int) -> List[Dict[str, Any]]:
+    """
+    List revision metadata (no content), newest first, for versions below before_version.
+    
+    Revision IDs are their version numbers, so a page is one batched get_all of
+    known document IDs; versions without a revision (older than the history,
+    or written outside it) are skipped.
+    """
+    versions = range(before_version - 1, max(0, before_version - 1 - limit), -1)
+    refs = [get_blog_revision_ref(blog_id, v) for v in versions]
+    if not refs:
+        return []
+    snapshots = {snap.reference.path: snap for snap in get_db().get_all(refs, field_paths=BLOG_REVISION_LIST_FIELDS)}
+    record_firestore(reads=len(snapshots))
+    items = []
+    for ref in refs:
+        snap = snapshots.get(ref.path)
+        if snap is not None and snap.exists:
+            items.append(snap.to_dict())
+    return items
+
+
+@firestore_op("get_blog_revision")
+def get_blog_revision(blog_id: str, version: int) -> Optional[Dict[str, Any]]:
+    """
+    Reconstruct a blog's content (meta + final_blog) at a given version.
+    
+    Reads the revision, and for a delta every revision since its snapshot
+    (at most REVISION_SNAPSHOT_INTERVAL documents, one get_all), then applies
+    the deltas in order.
+    
+    Returns:
+        Optional[Dict]: The revision metadata with a "content" field, or None if
+        the revision (or part of its delta chain) does not exist
+    """
+    revision_ref = get_blog_revision_ref(blog_id, version)
+    doc = revision_ref.get()
+    record_firestore(reads=1)
+    if not doc.exists:
+        return None
+    revision = doc.to_dict()
+    if revision.get('kind') == 'snapshot':
+        content = unpack(revision.pop('data'))
+    else:
+        base = revision['snapshot_version']
+        refs = [get_blog_revision_ref(blog_id, v) for v in range(base, version)]
+        snapshots = {snap.reference.path: snap for snap in get_db().get_all(refs)}
+        record_firestore(reads=len(snapshots))
+        chain = [snapshots.get(ref.path) for ref in refs]
+        if any(snap is None or not snap.exists for snap in chain):
+            logger.error(f"Revision chain {base}..{version} of blog {blog_id} is incomplete")
+            return None
+        content = unpack(chain[0].to_dict()['data'])
+        for snap in chain[1:]:
+            content = apply_delta(content, unpack(snap.to_dict()['data']))
+        content = apply_delta(content, unpack(revision.pop('data')))
+    revision['content'] = content
+    return revision
+
+
+@firestore_op("query_blogs")
 def query_blogs(
     query_filters: Dict[str, Any], 
     order_by: str = "created_at", 
     order_direction: str = "DESCENDING", 
     skip: int = 0, 
-    limit: int = 10
+    limit: int = 10,
+    select: Optional[List[str]] = None,
 ) -> List[Dict[str, Any]]:
     """
     Query blogs with filters, ordering, and pagination.
@@ -153,6 +769,8 @@ def query_blogs(
         order_direction: "ASCENDING" or "DESCENDING"
         skip: Number of documents to skip
         limit: Maximum number of documents to return
+        select: Optional field paths to project (e.g. ["meta.title", "status"]).
+            When given, only these fields are transferred from Firestore.
         
     Returns:
         List[Dict]: List of blog documents
@@ -170,6 +788,12 @@ def query_blogs(
         else:
             query = query.where(filter=FieldFilter(field, '==', value))
     
+    # Apply projection; the order_by field is always kept so the in-memory
+    # fallback sort below still works on projected documents
+    if select is not None:
+        field_paths = list(dict.fromkeys([*select, order_by]))
+        query = query.select(field_paths)
+    
     # Apply ordering (handle nested fields like admin_review.requested_at)
     # Note: Firestore requires composite indexes for queries that filter and order by different fields
     # If index is missing, we'll fall back to in-memory sorting
@@ -182,18 +806,21 @@ def query_blogs(
     try:
         if skip > 0:
             docs = list(query_with_order.limit(skip + limit).stream())
+            record_firestore(reads=len(docs))
             docs = docs[skip:]
         else:
             docs = list(query_with_order.limit(limit).stream())
+            record_firestore(reads=len(docs))
     except Exception as e:
         # If index is missing, try without ordering (less efficient but works)
         if "index" in str(e).lower() or "FailedPrecondition" in str(type(e).__name__):
             logger.warning(f"Firestore index missing for query, falling back to in-memory sort: {e}")
             # Fetch all matching docs, sort in memory, then paginate
             all_docs = list(query.stream())
+            record_firestore(reads=len(all_docs))
             # Sort by the order_by field
             reverse = order_direction == "DESCENDING"
-            all_docs.sort(key=lambda d: d.to_dict().get(order_by, datetime.min), reverse=reverse)
+            all_docs.sort(key=lambda d: _get_field(d.to_dict(), order_by) or datetime.min, reverse=reverse)
             if skip > 0:
                 docs = all_docs[skip:skip + limit]
             else:
@@ -211,6 +838,7 @@ def query_blogs(
     return items
 
 
+@firestore_op("count_blogs")
 def count_blogs(query_filters: Dict[str, Any]) -> int:
     """
     Count blogs matching query filters.
@@ -231,12 +859,104 @@ def count_blogs(query_filters: Dict[str, Any]) -> int:
         else:
             query = query.where(filter=FieldFilter(field, '==', value))
     
-    # Count documents
-    docs = list(query.stream())
+    # Count documents (key-only projection, no field data is transferred)
+    docs = list(query.select([]).stream())
+    record_firestore(reads=len(docs))
     return len(docs)
 
 
+@firestore_op("migrate_blog_bodies")
+def migrate_blog_bodies(batch_size: int = 200, dry_run: bool = False, max_attempts: int = 3) -> int:
+    """
+    Move inline final_blog content of legacy blog documents into body documents.
+    
+    Pages through the blogs collection by document ID; each migrated blog costs two
+    writes (body set + header update), so batch_size must stay <= BATCH_WRITE_LIMIT / 2.
+    The header update is guarded by the update_time that was read, so a blog edited
+    in between is not overwritten: if a batch fails, its blogs are migrated one by
+    one, re-reading a blog that changed (up to max_attempts times, then skipped).
+    
+    Args:
+        batch_size: Number of blog documents read and migrated per batch
+        dry_run: Only count documents that would be migrated
+        max_attempts: Tries per blog when it keeps changing during the migration
+        
+    Returns:
+        int: Number of migrated blogs
+    """
+    if batch_size < 1 or batch_size * 2 > BATCH_WRITE_LIMIT:
+        raise ValueError(f"batch_size must be between 1 and {BATCH_WRITE_LIMIT // 2}")
+    
+    db = get_db()
+    blogs_col = get_blogs_collection()
+
+    def add_writes(batch, doc, final_blog) -> None:
+        batch.set(get_blog_body_ref(doc.id), {'final_blog': final_blog})
+        batch.update(doc.reference, {
+            'final_blog': firestore.DELETE_FIELD,
+            'summary': _blog_summary(final_blog),
+        }, option=db.write_option(last_update_time=doc.update_time))
+
+    def migrate_one(doc) -> bool:
+        for attempt in range(max_attempts):
+            if attempt:
+                doc = doc.reference.get(field_paths=['final_blog'])
+                record_firestore(reads=1)
+                if not doc.exists:
+                    return False
+            final_blog = (doc.to_dict() or {}).get('final_blog')
+            if final_blog is None:
+                return False  # migrated or rewritten by a concurrent save
+            batch = db.batch()
+            add_writes(batch, doc, final_blog)
+            try:
+                batch.commit()
+            except Exception as e:
+                logger.warning(f"Blog body migration: {doc.id} changed concurrently, retrying: {e}")
+                continue
+            record_firestore(writes=2)
+            return True
+        logger.error(f"Blog body migration: skipped {doc.id} (modified during {max_attempts} attempts)")
+        return False
+
+    migrated = 0
+    last_doc = None
+    while True:
+        query = blogs_col.order_by('__name__').limit(batch_size).select(['final_blog'])
+        if last_doc is not None:
+            query = query.start_after(last_doc)
+        docs = list(query.stream())
+        record_firestore(reads=len(docs))
+        if not docs:
+            break
+        last_doc = docs[-1]
+        
+        batch = db.batch()
+        pending = []
+        for doc in docs:
+            final_blog = (doc.to_dict() or {}).get('final_blog')
+            if final_blog is None:
+                continue
+            pending.append(doc)
+            if not dry_run:
+                add_writes(batch, doc, final_blog)
+        if pending and not dry_run:
+            try:
+                batch.commit()
+                record_firestore(writes=len(pending) * 2)
+                migrated += len(pending)
+            except Exception as e:
+                logger.warning(f"Blog body migration batch failed, migrating items individually: {e}")
+                migrated += sum(1 for doc in pending if migrate_one(doc))
+        else:
+            migrated += len(pending)
+        logger.info(f"Blog body migration: {migrated} blogs {'to migrate' if dry_run else 'migrated'} so far")
+    
+    return migrated
+
+
 # Helper functions for images
+@firestore_op("create_image")
 def create_image(doc: Dict[str, Any]) -> str:
     """
     Create an image document in Firestore and return document ID.
@@ -251,6 +971,7 @@ def create_image(doc: Dict[str, Any]) -> str:
         images_col = get_images_collection()
         doc['created_at'] = doc.get('created_at', datetime.utcnow())
         _, doc_ref = images_col.add(doc)
+        record_firestore(writes=1)
         logger.info(f"Created image with ID: {doc_ref.id}")
         return doc_ref.id
     except Exception as e:
@@ -258,6 +979,7 @@ def create_image(doc: Dict[str, Any]) -> str:
         raise
 
 
+@firestore_op("get_image_by_url")
 def get_image_by_url(owner_id: str, image_url: str) -> Optional[Dict[str, Any]]:
     """
     Get an image by owner_id and image_url.
@@ -273,6 +995,7 @@ def get_image_by_url(owner_id: str, image_url: str) -> Optional[Dict[str, Any]]:
         images_col = get_images_collection()
         query = images_col.where(filter=FieldFilter('owner_id', '==', owner_id)).where(filter=FieldFilter('image_url', '==', image_url)).limit(1)
         docs = list(query.stream())
+        record_firestore(reads=len(docs))
         if docs:
             data = docs[0].to_dict()
             data['id'] = docs[0].id
@@ -283,6 +1006,40 @@ def get_image_by_url(owner_id: str, image_url: str) -> Optional[Dict[str, Any]]:
         raise
 
 
+@firestore_op("get_images_by_ids")
+def get_images_by_ids(image_ids: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+    """
+    Get several images in a single batched read (Firestore get_all).
+    
+    Args:
+        image_ids: Firestore document IDs (duplicates are read once)
+        
+    Returns:
+        Dict[str, Optional[Dict]]: Image data keyed by ID in request order, None for missing images
+    """
+    try:
+        images_col = get_images_collection()
+        ids = list(dict.fromkeys(image_ids))
+        refs = [images_col.document(image_id) for image_id in ids]
+        snapshots = {snap.reference.path: snap for snap in get_db().get_all(refs)}
+        record_firestore(reads=len(snapshots))
+        
+        results: Dict[str, Optional[Dict[str, Any]]] = {}
+        for image_id, doc_ref in zip(ids, refs):
+            doc = snapshots.get(doc_ref.path)
+            if doc is None or not doc.exists:
+                results[image_id] = None
+                continue
+            data = doc.to_dict()
+            data['id'] = doc.id
+            results[image_id] = data
+        return results
+    except Exception as e:
+        logger.error(f"Error batch getting images: {e}")
+        raise
+
+
+@firestore_op("query_images")
 def query_images(
     query_filters: Dict[str, Any], 
     order_by: str = "created_at",
@@ -322,6 +1079,7 @@ def query_images(
                         query = images_col.where(filter=FieldFilter('owner_id', '==', query_filters.get('owner_id')))
                         query = query.where(filter=FieldFilter('source', '==', val))
                         docs = list(query.stream())
+                        record_firestore(reads=len(docs))
                         for doc in docs:
                             if doc.id not in seen_ids:
                                 all_docs.append(doc)
@@ -330,6 +1088,7 @@ def query_images(
                     # Handle source: {"$exists": False}
                     query = images_col.where(filter=FieldFilter('owner_id', '==', query_filters.get('owner_id')))
                     docs = list(query.stream())
+                    record_firestore(reads=len(docs))
                     for doc in docs:
                         data = doc.to_dict()
                         if doc.id not in seen_ids and (data.get('source') is None or 'source' not in data):
@@ -339,6 +1098,7 @@ def query_images(
                 # Handle source: None or missing source field
                 query = images_col.where(filter=FieldFilter('owner_id', '==', query_filters.get('owner_id')))
                 docs = list(query.stream())
+                record_firestore(reads=len(docs))
                 for doc in docs:
                     data = doc.to_dict()
                     if doc.id not in seen_ids and (data.get('source') is None or 'source' not in data):
@@ -350,6 +1110,7 @@ def query_images(
                 for field, value in condition.items():
                     query = query.where(filter=FieldFilter(field, '==', value))
                 docs = list(query.stream())
+                record_firestore(reads=len(docs))
                 for doc in docs:
                     if doc.id not in seen_ids:
                         all_docs.append(doc)
@@ -385,15 +1146,18 @@ def query_images(
         try:
             if skip > 0:
                 docs = list(query_with_order.limit(skip + limit).stream())
+                record_firestore(reads=len(docs))
                 docs = docs[skip:]
             else:
                 docs = list(query_with_order.limit(limit).stream())
+                record_firestore(reads=len(docs))
         except Exception as e:
             # If index is missing, try without ordering (less efficient but works)
             if "index" in str(e).lower() or "FailedPrecondition" in str(type(e).__name__):
                 logger.warning(f"Firestore index missing for images query, falling back to in-memory sort: {e}")
                 # Fetch all matching docs, sort in memory, then paginate
                 all_docs = list(query.stream())
+                record_firestore(reads=len(all_docs))
                 # Sort by the order_by field
                 reverse = order_direction == "DESCENDING"
                 all_docs.sort(key=lambda d: d.to_dict().get(order_by, datetime.min), reverse=reverse)
@@ -414,6 +1178,7 @@ def query_images(
         return items
 
 
+@firestore_op("count_images")
 def count_images(query_filters: Dict[str, Any]) -> int:
     """
     Count images matching query filters.
@@ -440,11 +1205,13 @@ def count_images(query_filters: Dict[str, Any]) -> int:
                         query = images_col.where(filter=FieldFilter('owner_id', '==', query_filters.get('owner_id')))
                         query = query.where(filter=FieldFilter('source', '==', val))
                         docs = list(query.stream())
+                        record_firestore(reads=len(docs))
                         for doc in docs:
                             seen_ids.add(doc.id)
                 elif isinstance(source_val, dict) and "$exists" in source_val:
                     query = images_col.where(filter=FieldFilter('owner_id', '==', query_filters.get('owner_id')))
                     docs = list(query.stream())
+                    record_firestore(reads=len(docs))
                     for doc in docs:
                         data = doc.to_dict()
                         if data.get('source') is None or 'source' not in data:
@@ -452,6 +1219,7 @@ def count_images(query_filters: Dict[str, Any]) -> int:
             elif "source" not in condition or condition.get("source") is None:
                 query = images_col.where(filter=FieldFilter('owner_id', '==', query_filters.get('owner_id')))
                 docs = list(query.stream())
+                record_firestore(reads=len(docs))
                 for doc in docs:
                     data = doc.to_dict()
                     if data.get('source') is None or 'source' not in data:
@@ -462,6 +1230,156 @@ def count_images(query_filters: Dict[str, Any]) -> int:
         for field, value in query_filters.items():
             query = query.where(filter=FieldFilter(field, '==', value))
         docs = list(query.stream())
+        record_firestore(reads=len(docs))
         return len(docs)
 
 
+
+# Helper functions for interrupted jobs
+def get_jobs_collection():
+    """Get Firestore jobs collection"""
+    db = get_db()
+    return db.collection('jobs')
+
+
+@firestore_op("save_interrupted_jobs")
+def save_interrupted_jobs(jobs: List[Dict[str, Any]]) -> int:
+    """
+    Persist jobs that were still running when the worker shut down.
+    
+    Each dict needs an "id" (used as document ID, so saving twice is harmless)
+    plus kind/owner_id/payload. Documents are stored with status "interrupted".
+    
+    Returns:
+        int: Number of jobs written
+    """
+    if not jobs:
+        return 0
+    db = get_db()
+    jobs_col = get_jobs_collection()
+    now = datetime.utcnow()
+    for start in range(0, len(jobs), BATCH_WRITE_LIMIT):
+        chunk = jobs[start:start + BATCH_WRITE_LIMIT]
+        batch = db.batch()
+        for job in chunk:
+            doc = {k: v for k, v in job.items() if k != 'id'}
+            doc.update({'status': 'interrupted', 'interrupted_at': now})
+            # merge keeps "attempts" when a resumed job is interrupted again
+            batch.set(jobs_col.document(job['id']), doc, merge=True)
+        batch.commit()
+        record_firestore(writes=len(chunk))
+    logger.info(f"Saved {len(jobs)} interrupted job(s)")
+    return len(jobs)
+
+
+@firestore_op("claim_interrupted_jobs")
+def claim_interrupted_jobs(limit: int, worker: str) -> List[Dict[str, Any]]:
+    """
+    Claim up to limit interrupted jobs for resumption.
+    
+    Each claim flips status to "resuming", guarded by the update_time that was
+    read, so when several workers start at once every job is claimed by one of them.
+    
+    Returns:
+        List[Dict]: The claimed jobs (with "id")
+    """
+    db = get_db()
+    query = get_jobs_collection().where(filter=FieldFilter('status', '==', 'interrupted')).limit(limit)
+    docs = list(query.stream())
+    record_firestore(reads=len(docs))
+    
+    claimed = []
+    for doc in docs:
+        data = doc.to_dict()
+        try:
+            doc.reference.update(
+                {'status': 'resuming', 'worker': worker, 'attempts': data.get('attempts', 0) + 1,
+                 'resumed_at': datetime.utcnow()},
+                option=db.write_option(last_update_time=doc.update_time),
+            )
+            record_firestore(writes=1)
+        except Exception as e:
+            logger.info(f"Job {doc.id} was claimed by another worker: {e}")
+            continue
+        data['id'] = doc.id
+        claimed.append(data)
+    return claimed
+
+
+@firestore_op("finish_job")
+def finish_job(job_id: str, status: str, error: Optional[str] = None) -> None:
+    """Record the outcome of a resumed job ("done", "failed" or back to "interrupted")."""
+    updates: Dict[str, Any] = {'status': status, 'finished_at': datetime.utcnow()}
+    if error:
+        updates['error'] = error[:1000]
+    get_jobs_collection().document(job_id).update(updates)
+    record_firestore(writes=1)
+
+
+# Helper functions for data derived from blogs by background tasks (app.services.blog_tasks)
+def get_blog_stats_collection():
+    """Get Firestore blog_stats collection (per-owner blog counts)"""
+    db = get_db()
+    return db.collection('blog_stats')
+
+
+@firestore_op("set_blog_thumbnail")
+def set_blog_thumbnail(blog_id: str, thumbnail_url: str, source_url: str) -> bool:
+    """
+    Store a blog's list thumbnail and the cover URL it was made from.
+
+    Only the two summary fields are written (updated_at is left alone: this is
+    not an edit). Returns False when the blog no longer exists.
+    """
+    try:
+        get_blogs_collection().document(blog_id).update({
+            'summary.thumbnail_url': thumbnail_url,
+            'summary.thumbnail_source': source_url,
+        })
+    except NotFound:
+        return False
+    record_firestore(writes=1)
+    return True
+
+
+@firestore_op("save_blog_counts")
+def save_blog_counts(owner_id: str, counts: Dict[str, int]) -> None:
+    """Store an owner's blog counts by status (recomputed by the blog.counters task)."""
+    get_blog_stats_collection().document(owner_id).set({**counts, 'updated_at': datetime.utcnow()})
+    record_firestore(writes=1)
+
+
+@firestore_op("get_blog_counts")
+def get_blog_counts(owner_id: str) -> Optional[Dict[str, Any]]:
+    """An owner's stored blog counts, or None if they were never computed."""
+    doc = get_blog_stats_collection().document(owner_id).get()
+    record_firestore(reads=1)
+    return doc.to_dict() if doc.exists else None
+
+# Async list/count reads for hot endpoints: run on the db pool, and identical
+# queries already in flight (polling tabs, refresh storms) share one Firestore read
+_reads_inflight = SingleFlight("firestore_reads")
+
+
+@_reads_inflight.coalesce("query_blogs")
+async def query_blogs_coalesced(*args, **kwargs) -> List[Dict[str, Any]]:
+    """query_blogs() off the event loop, coalesced with identical in-flight queries."""
+    return await run_in_executor("db", query_blogs, *args, **kwargs)
+
+
+@_reads_inflight.coalesce("count_blogs")
+async def count_blogs_coalesced(query_filters: Dict[str, Any]) -> int:
+    """count_blogs() off the event loop, coalesced with identical in-flight counts."""
+    return await run_in_executor("db", count_blogs, query_filters)
+
+
+@_reads_inflight.coalesce("query_images")
+async def query_images_coalesced(*args, **kwargs) -> List[Dict[str, Any]]:
+    """query_images() off the event loop, coalesced with identical in-flight queries."""
+    return await run_in_executor("db", query_images, *args, **kwargs)
+
+
+@_reads_inflight.coalesce("count_images")
+async def count_images_coalesced(query_filters: Dict[str, Any]) -> int:
+    """count_images() off the event loop, coalesced with identical in-flight counts."""
+    return await run_in_executor("db", count_images, query_filters)
@@ -1,7 +1,20 @@
-from pydantic import BaseModel, EmailStr, Field
-from typing import List, Literal, Optional
+from pydantic import AfterValidator, BaseModel, EmailStr, Field, StringConstraints
+from typing import Annotated, Any, Dict, List, Literal, Optional
 from datetime import datetime
 
+
+def _check_document_id(value: str) -> str:
+    if value in (".", "..") or (value.startswith("__") and value.endswith("__")):
+        raise ValueError("Invalid document ID")
+    return value
+
+
+# A Firestore document ID: one path segment, so it can never address another
+# collection or a subcollection document (e.g. "x/content/body")
+DocumentId = Annotated[
+    str, StringConstraints(min_length=1, max_length=1500, pattern=r"^[^/]+$"), AfterValidator(_check_document_id)
+]
+
 # ---------------- AUTH ----------------
 class SignupIn(BaseModel):
     name: str
@@ -107,17 +120,35 @@ class BlogMeta(BaseModel):
     cover_image_url: str = ""
 
 
+class ReviewComment(BaseModel):
+    id: str
+    author_id: str
+    author_name: str = ""
+    text: str
+    created_at: Optional[datetime] = None
+
+
 class AdminReview(BaseModel):
     requested_at: Optional[datetime] = None
     reviewed_at: Optional[datetime] = None
     reviewed_by: Optional[str] = None
     reviewed_by_name: Optional[str] = None
-    feedback: str = ""
+    feedback: str = ""  # latest feedback/comment
+    comments: List[ReviewComment] = []  # append-only admin comment history
 
 
 class BlogCommentIn(BaseModel):
     """Schema for adding a comment to a blog"""
-    comment: str
+    comment: Annotated[str, StringConstraints(strip_whitespace=True, min_length=1)]
+
+
+BULK_MODERATION_MAX = 200
+
+class BulkModerationIn(BaseModel):
+    """Schema for approving/rejecting/commenting many blogs at once (admin only)"""
+    action: Literal["approve", "reject", "comment"]
+    blog_ids: List[DocumentId] = Field(min_length=1, max_length=BULK_MODERATION_MAX)
+    feedback: str = ""  # rejection feedback or comment text
 
 
 class BlogCreateIn(BaseModel):
@@ -141,6 +172,51 @@ class BlogOut(BaseModel):
     created_at: datetime
     updated_at: datetime
     published_at: Optional[datetime] = None
+    version: int = 0  # content version (meta/final_blog), base_version for PATCH autosaves
+
+
+# ---------------- PATCH (AUTOSAVE) ----------------
+BLOG_PATCH_MAX_OPS = 500
+
+class BlogPatchOp(BaseModel):
+    """One JSON Patch (RFC 6902) operation; paths are JSON Pointers under /meta or /final_blog"""
+    op: Literal["add", "remove", "replace", "test"]
+    path: str
+    value: Any = None
+
+
+class BlogPatchIn(BaseModel):
+    """
+    Incremental edit against a known version of the blog.
+    fields: field diffs by dotted path ("meta.title": "..."), applied first.
+    patch: JSON Patch operations, applied after fields.
+    """
+    base_version: int = Field(ge=0)
+    fields: Dict[str, Any] = Field(default_factory=dict, max_length=BLOG_PATCH_MAX_OPS)
+    patch: List[BlogPatchOp] = Field(default_factory=list, max_length=BLOG_PATCH_MAX_OPS)
+
+
+# ---------------- BATCH GET ----------------
+BATCH_GET_MAX = 100
+
+class BlogBatchGetIn(BaseModel):
+    ids: List[DocumentId] = Field(min_length=1, max_length=BATCH_GET_MAX)
+    include_body: bool = False  # also return final_blog (markdown + html)
+
+
+class BlogBatchItem(BlogOut):
+    """A blog in a batchGet response: same fields as BlogOut; final_blog only with include_body"""
+    final_blog: Optional[FinalBlog] = None
+
+
+class BlogBatchGetOut(BaseModel):
+    items: List[BlogBatchItem]
+    missing: List[str]
+    forbidden: List[str]
+
+
+class ImageBatchGetIn(BaseModel):
+    ids: List[DocumentId] = Field(min_length=1, max_length=BATCH_GET_MAX)
 
 
 class BlogListItem(BaseModel):
@@ -258,6 +334,7 @@ class GenerateBlogIn(BaseModel):
 
     cover_image_url: str = ""
     primary_color: str = "#4443E4"  # Color code theme for high quality generation
+    mode: Optional[Literal["single", "sections"]] = None  # None = BLOG_GENERATION_MODE
 
 
 class OptionsOut(BaseModel):
@@ -1,10 +1,20 @@
 from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, Query
-from app.models.firestore_db import query_blogs, count_blogs, get_blog_by_id, update_blog
+from fastapi import APIRouter, Depends, Query
+from app.models.firestore_db import query_blogs_coalesced, count_blogs_coalesced, blog_summary_field, bulk_update_blogs
+from app.models.schemas import BulkModerationIn
+from app.services.blog_workflow import run_transition, approve_updates, reject_updates, comment_updates
+from app.services.blog_cache import invalidate_public_blogs
+from app.services.blog_tasks import on_blog_changed
 from core.deps import require_admin
+from core.executors import run_in_executor
 
 router = APIRouter()
 
+# Only the fields rendered in the admin list are read from Firestore
+ADMIN_BLOGS_FIELDS = [
+    "meta.title", "summary.title", "final_blog.render.title", "owner_name", "created_at", "status",
+]
+
 @router.get("/blogs", response_model=dict)
 async def list_blogs_for_admin(
     admin=Depends(require_admin),
@@ -14,50 +24,98 @@ async def list_blogs_for_admin(
 ):
     skip = (page - 1) * limit
     q = {"status": status}
-    total = count_blogs(q)
+    total = await count_blogs_coalesced(q)
 
-    blogs = query_blogs(q, order_by="created_at", order_direction="DESCENDING", skip=skip, limit=limit)
+    blogs = await query_blogs_coalesced(
+        q, order_by="created_at", order_direction="DESCENDING", skip=skip, limit=limit,
+        select=ADMIN_BLOGS_FIELDS,
+    )
     items = []
     for b in blogs:
         items.append({
             "id": b.get("id", ""),
-            "title": (b.get("meta") or {}).get("title","") or (b.get("final_blog") or {}).get("render", {}).get("title",""),
+            "title": (b.get("meta") or {}).get("title","") or blog_summary_field(b, "title"),
             "created_by": b.get("owner_name", ""),
             "created_at": b.get("created_at"),
             "status": b.get("status", ""),
         })
     return {"items": items, "page": page, "limit": limit, "total": total}
 
+@router.post("/blogs:bulk", response_model=dict)
+async def bulk_moderate_blogs(payload: BulkModerationIn, admin=Depends(require_admin)):
+    """
+    Approve, reject or comment on many blogs in one request.
+    Reads all blogs with one batched get and writes them with batched writes;
+    each blog gets its own result so one bad ID does not fail the others.
+    """
+    now = datetime.utcnow()
+    if payload.action == "approve":
+        build_updates = lambda b: approve_updates(b, admin, now)
+        new_status = "published"
+    elif payload.action == "reject":
+        build_updates = lambda b: reject_updates(b, admin, payload.feedback, now)
+        new_status = "saved"
+    else:
+        build_updates = lambda b: comment_updates(b, admin, payload.feedback, now)
+        new_status = None
+
+    owners = {}
+
+    def build(b):
+        owners[b["id"]] = b.get("owner_id")
+        return build_updates(b)
+
+    results = await run_in_executor("db", bulk_update_blogs, payload.blog_ids, build)
+
+    items = []
+    for blog_id, result in results.items():
+        item = {"blog_id": blog_id, "ok": result["ok"]}
+        if result["ok"] and new_status:
+            item["status"] = new_status
+        if not result["ok"]:
+            item["error"] = result["error"]
+        items.append(item)
+
+    succeeded = sum(1 for i in items if i["ok"])
+    if payload.action == "approve" and succeeded:
+        await invalidate_public_blogs()
+    if new_status:
+        # Keys coalesce: one feed rebuild and one recount per owner for the whole batch
+        for item in items:
+            if item["ok"]:
+                await on_blog_changed(
+                    item["blog_id"], owner_id=owners.get(item["blog_id"]), public=payload.action == "approve"
+                )
+    return {
+        "action": payload.action,
+        "results": items,
+        "succeeded": succeeded,
+        "failed": len(items) - succeeded,
+    }
+
 @router.post("/blogs/{blog_id}/approve", response_model=dict)
 async def approve_blog(blog_id: str, admin=Depends(require_admin)):
-    b = get_blog_by_id(blog_id)
-    if not b:
-        raise HTTPException(status_code=404, detail="Blog not found")
-
-    updates = {
-        "status": "published",
-        "updated_at": datetime.utcnow(),
-        "published_at": datetime.utcnow(),
-        "admin_review.reviewed_at": datetime.utcnow(),
-        "admin_review.reviewed_by": admin["id"],
-        "admin_review.reviewed_by_name": admin["name"],
-    }
-    update_blog(blog_id, updates)
+    now = datetime.utcnow()
+    stored = {}
+
+    def build(b):
+        stored["owner_id"] = b.get("owner_id")
+        return approve_updates(b, admin, now)
+
+    await run_transition(blog_id, build)
+    await invalidate_public_blogs()
+    await on_blog_changed(blog_id, owner_id=stored["owner_id"], public=True)
     return {"ok": True, "status": "published"}
 
 @router.post("/blogs/{blog_id}/reject", response_model=dict)
 async def reject_blog(blog_id: str, feedback: str = "", admin=Depends(require_admin)):
-    b = get_blog_by_id(blog_id)
-    if not b:
-        raise HTTPException(status_code=404, detail="Blog not found")
-
-    updates = {
-        "status": "rejected",
-        "updated_at": datetime.utcnow(),
-        "admin_review.reviewed_at": datetime.utcnow(),
-        "admin_review.reviewed_by": admin["id"],
-        "admin_review.reviewed_by_name": admin["name"],
-        "admin_review.feedback": feedback or "",
-    }
-    update_blog(blog_id, updates)
-    return {"ok": True, "status": "rejected"}
+    now = datetime.utcnow()
+    stored = {}
+
+    def build(b):
+        stored["owner_id"] = b.get("owner_id")
+        return reject_updates(b, admin, feedback, now)
+
+    await run_transition(blog_id, build)
+    await on_blog_changed(blog_id, owner_id=stored["owner_id"])
+    return {"ok": True, "status": "saved", "feedback": feedback}
@@ -7,16 +7,24 @@ from app.models.schemas import (
 )
 
 from app.services.gemini_service import (
-    gen_topic_ideas, gen_titles, gen_intros, gen_outlines, gen_image_prompts, gen_final_blog_markdown
+    gen_topic_ideas, gen_titles, gen_intros, gen_outlines, gen_image_prompts, gen_final_blog_markdown,
+    gen_blog_sections,
 )
 from app.services.image_service import generate_cover_image
-from app.services.markdown_service import markdown_to_html, normalize_markdown
+from app.services.markdown_service import markdown_to_html, normalize_markdown, render_to_markdown
 from app.models.firestore_db import create_image
+from core.config import settings
 from core.deps import get_current_user
+from core.executors import ExecutorSaturated, run_in_executor
+from core.jobs import ServiceDraining, job_tracker, register_resumer
+from core.rate_limit import ai_rate_limit
 
 router = APIRouter()
 
 def _raise_ai_error(err: Exception):
+    # Load shedding and draining have their own handlers (503 + Retry-After)
+    if isinstance(err, (ExecutorSaturated, ServiceDraining, HTTPException)):
+        raise err
     msg = str(err)
     lower = msg.lower()
 
@@ -48,81 +56,104 @@ def _raise_ai_error(err: Exception):
 
     raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=msg)
 
-@router.post("/ideas", response_model=OptionsOut)
+@router.post("/ideas", response_model=OptionsOut, dependencies=[Depends(ai_rate_limit("ideas"))])
 async def topic_ideas(payload: TopicIdeasIn):
     print("idea playload",payload)
-    try:
-        
-        options = await gen_topic_ideas(payload.model_dump())
-        return {"options": options}
-    except Exception as e:
-        _raise_ai_error(e)
-
-@router.post("/titles", response_model=OptionsOut)
-async def titles(payload: TitlesIn):
-    try:
-        options = await gen_titles(payload.model_dump())
-        return {"options": options}
-    except Exception as e:
-        _raise_ai_error(e)
+    async with job_tracker.track("ideas"):
+        try:
+            
+            options = await gen_topic_ideas(payload.model_dump())
+            return {"options": options}
+        except Exception as e:
+            _raise_ai_error(e)
 
-@router.post("/intros", response_model=OptionsOut)
+@router.post("/titles", response_model=OptionsOut, dependencies=[Depends(ai_rate_limit("titles"))])
+async def titles(payload: TitlesIn):
+    async with job_tracker.track("titles"):
+        try:
+            options = await gen_titles(payload.model_dump())
+            return {"options": options}
+        except Exception as e:
+            _raise_ai_error(e)
+
+@router.post("/intros", response_model=OptionsOut, dependencies=[Depends(ai_rate_limit("intros"))])
 async def intros(payload: IntrosIn):
-    try:
-        options = await gen_intros(payload.model_dump())
-        return {"options": options}
-    except Exception as e:
-        _raise_ai_error(e)
-
-@router.post("/outlines", response_model=dict)
+    async with job_tracker.track("intros"):
+        try:
+            options = await gen_intros(payload.model_dump())
+            return {"options": options}
+        except Exception as e:
+            _raise_ai_error(e)
+
+@router.post("/outlines", response_model=dict, dependencies=[Depends(ai_rate_limit("outlines"))])
 async def outlines(payload: OutlinesIn):
-    try:
-        options = await gen_outlines(payload.model_dump())
-        return {"options": options}  # 5 variants, each {outline:[...]}
-    except Exception as e:
-        _raise_ai_error(e)
-
-@router.post("/image-prompts", response_model=OptionsOut)
+    async with job_tracker.track("outlines"):
+        try:
+            options = await gen_outlines(payload.model_dump())
+            return {"options": options}  # 5 variants, each {outline:[...]}
+        except Exception as e:
+            _raise_ai_error(e)
+
+@router.post("/image-prompts", response_model=OptionsOut, dependencies=[Depends(ai_rate_limit("image-prompts"))])
 async def image_prompts(payload: ImagePromptsIn):
-    try:
-        options = await gen_image_prompts(payload.model_dump())
-        return {"options": options}
-    except Exception as e:
-        _raise_ai_error(e)
-
-
-@router.post("/image-generate", response_model=ImageOut)
+    async with job_tracker.track("image-prompts"):
+        try:
+            options = await gen_image_prompts(payload.model_dump())
+            return {"options": options}
+        except Exception as e:
+            _raise_ai_error(e)
+
+
+def _gallery_image(owner_id: str, owner_name: str, data: dict, result: dict) -> dict:
+    return {
+        "owner_id": owner_id,
+        "owner_name": owner_name,
+        "image_url": result.get("image_url", ""),
+        "meta": result.get("meta", {}),
+        "source": data.get("source", "nano"),
+        "created_at": datetime.utcnow(),
+    }
+
+
+@router.post("/image-generate", response_model=ImageOut, dependencies=[Depends(ai_rate_limit("image-generate", cost=10))])
 async def image_generate(payload: ImageGenerateIn, user=Depends(get_current_user)):
-    try:
-        data = payload.model_dump()
-        save_to_gallery = data.pop("save_to_gallery", True)
-        
-        # 1. Generate the image
-        result = await generate_cover_image(data)
-        
-        #  Save the image to the database!
-        if save_to_gallery:
-            create_image(
-                {
-                    "owner_id": user["id"],
-                    "owner_name": user.get("name", ""),
-                    "image_url": result.get("image_url", ""),
-                    "meta": result.get("meta", {}),
-                    "source": data.get("source", "nano"),
-                    "created_at": datetime.utcnow(),
-                }
-            )
+    data = payload.model_dump()
+    save_to_gallery = data.pop("save_to_gallery", True)
+    # Images saved to the gallery are regenerated after a restart if the worker
+    # is stopped mid-generation (see core.jobs)
+    job_payload = {"request": data, "owner_name": user.get("name", "")}
+    async with job_tracker.track("image-generate", user["id"], job_payload, resumable=save_to_gallery):
+        try:
+            # 1. Generate the image
+            result = await generate_cover_image(data, user["id"])
+            
+            #  Save the image to the database!
+            if save_to_gallery:
+                await run_in_executor("db", create_image, _gallery_image(user["id"], user.get("name", ""), data, result))
+                
+            return result
+        except (ExecutorSaturated, ServiceDraining):
+            raise
+        except Exception as e:
+            error_detail = str(e)
+            import logging
+            logger = logging.getLogger(__name__)
+            logger.error(f"Image generation failed: {error_detail}", exc_info=True)
             
-        return result
-    except Exception as e:
-        error_detail = str(e)
-        import logging
-        logger = logging.getLogger(__name__)
-        logger.error(f"Image generation failed: {error_detail}", exc_info=True)
-        
-        raise HTTPException(status_code=400, detail=error_detail)
-
-@router.post("/blog-generate", response_model=FinalBlog)
+            raise HTTPException(status_code=400, detail=error_detail)
+
+
+async def _resume_image_generate(job: dict) -> None:
+    """Re-run an image generation interrupted by a shutdown and save it to the owner's gallery."""
+    data = job["payload"]["request"]
+    result = await generate_cover_image(data, job["owner_id"])
+    await run_in_executor("db", create_image, _gallery_image(job["owner_id"], job["payload"].get("owner_name", ""), data, result))
+
+
+register_resumer("image-generate", _resume_image_generate)
+
+
+@router.post("/blog-generate", response_model=FinalBlog, dependencies=[Depends(ai_rate_limit("blog-generate", cost=5))])
 async def blog_generate(payload: GenerateBlogIn):
     """
     Called on 'Generate Blog' button from review page.
@@ -130,24 +161,41 @@ async def blog_generate(payload: GenerateBlogIn):
       - markdown (right)
       - html (left)
       - render (structured, optional for UI)
+
+    mode="sections" writes the intro, each outline section and the conclusion
+    as concurrent LLM calls and fills render.sections with the results.
     """
 
-    try:
-        markdown = await gen_final_blog_markdown(payload.model_dump())
-        markdown = normalize_markdown(markdown)
-        html = markdown_to_html(markdown)
-
-        # Minimal structured render for convenience (frontend can just render markdown too)
-        refs = [r.strip() for r in (payload.reference_links or "").split(",") if r.strip()]
-        render = BlogRender(
-            title=payload.title,
-            cover_image_url=payload.cover_image_url or "",
-            intro_md=payload.intro_md,
-            sections=[BlogSection(heading=h, body_md="") for h in payload.outline],
-            conclusion_md="",
-            references=refs,
-        )
+    async with job_tracker.track("blog-generate"):
+        try:
+            refs = [r.strip() for r in (payload.reference_links or "").split(",") if r.strip()]
+            if (payload.mode or settings.BLOG_GENERATION_MODE) == "sections":
+                parts = await gen_blog_sections(payload.model_dump(exclude={"mode"}))
+                render = BlogRender(
+                    title=payload.title,
+                    cover_image_url=payload.cover_image_url or "",
+                    intro_md=parts["intro_md"],
+                    sections=[BlogSection(**section) for section in parts["sections"]],
+                    conclusion_md=parts["conclusion_md"],
+                    references=refs,
+                )
+                markdown = normalize_markdown(render_to_markdown(render))
+                return {"render": render, "markdown": markdown, "html": markdown_to_html(markdown)}
+
+            markdown = await gen_final_blog_markdown(payload.model_dump(exclude={"mode"}))
+            markdown = normalize_markdown(markdown)
+            html = markdown_to_html(markdown)
+
+            # Minimal structured render for convenience (frontend can just render markdown too)
+            render = BlogRender(
+                title=payload.title,
+                cover_image_url=payload.cover_image_url or "",
+                intro_md=payload.intro_md,
+                sections=[BlogSection(heading=h, body_md="") for h in payload.outline],
+                conclusion_md="",
+                references=refs,
+            )
 
-        return {"render": render, "markdown": markdown, "html": html}
-    except Exception as e:
-        _raise_ai_error(e)
+            return {"render": render, "markdown": markdown, "html": html}
+        except Exception as e:
+            _raise_ai_error(e)
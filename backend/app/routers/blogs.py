@@ -1,20 +1,57 @@
+import asyncio
 import os
 import uuid
 from datetime import datetime
+from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query, Request, Response
 
 
 from app.models.firestore_db import (
-    create_blog, get_blog_by_id, update_blog, delete_blog,
-    query_blogs, count_blogs, create_image
+    create_blog, get_blog_by_id, get_blog_body, patch_blog, delete_blog, BlogNotFoundError,
+    list_blog_revisions, get_blog_revision,
+    query_blogs_coalesced, count_blogs_coalesced, create_image, blog_summary_field, get_blogs_by_ids
 )
+from core.conditional import content_etag, is_not_modified, not_modified_response, respond_conditionally, weak_etag
+from core.config import settings
 from core.deps import get_current_user, require_admin
-from app.models.schemas import BlogCreateIn, BlogOut, BlogCommentIn
+from core.executors import run_in_executor
+from core.jobs import job_tracker
+from app.models.schemas import BlogCreateIn, BlogOut, BlogCommentIn, BlogBatchGetIn, BlogBatchGetOut, BlogPatchIn
 from app.services.image_service import upload_bytes_to_gcs
+from app.services.blog_cache import invalidate_public_blogs, public_blogs_cache
+from app.services.blog_tasks import on_blog_changed
+from app.services.blog_patch import PatchError, PatchTestFailed, StaleVersionError, patch_content, touched_roots
+from app.services.blog_workflow import (
+    run_transition, request_publish_updates, approve_updates, reject_updates, comment_updates, draft_updates,
+    content_updates,
+)
 
 router = APIRouter()
 
+# Field projections for list endpoints: only these fields are read from Firestore,
+# so list responses never transfer the full final_blog markdown/html.
+# final_blog.render.* paths only match legacy documents that still embed the body.
+MY_BLOGS_FIELDS = [
+    "meta.title", "meta.language", "meta.tone", "meta.creativity",
+    "summary.title", "final_blog.render.title", "owner_name", "created_at", "status",
+]
+PENDING_BLOGS_FIELDS = MY_BLOGS_FIELDS + ["owner_id", "admin_review.requested_at"]
+PUBLISHED_BLOGS_FIELDS = MY_BLOGS_FIELDS + [
+    "owner_id", "published_at", "admin_review.reviewed_at", "admin_review.reviewed_by_name",
+]
+PUBLIC_BLOGS_FIELDS = [
+    "meta.title", "meta.focus_or_niche",
+    "summary.title", "summary.cover_image_url", "summary.intro_md", "summary.thumbnail_url",
+    "final_blog.render.title", "final_blog.render.cover_image_url", "final_blog.render.intro_md",
+    "owner_name", "published_at",
+]
+
+
+def _revision_info(user: dict, source: str) -> dict:
+    """Who made a content change, for the revision history."""
+    return {"source": source, "author_id": user["id"], "author_name": user.get("name", "")}
+
 
 # ---------------- save ----------------
 @router.post("/blog", response_model=dict)  # POST /blog
@@ -37,14 +74,18 @@ async def save_blog(payload: BlogCreateIn, user=Depends(get_current_user)):
         "created_at": now,
         "updated_at": now,
         "published_at": None,
+        "version": 1,
     }
 
-    blog_id = create_blog(doc)
-    return {"blog_id": blog_id, "status": "saved"}
+    blog_id = await run_in_executor("db", create_blog, doc, revision=_revision_info(user, "create"))
+    await on_blog_changed(blog_id, owner_id=user["id"])
+    return {"blog_id": blog_id, "status": "saved", "version": 1}
 
 # ---------------- LIST (MY BLOGS) ----------------
 @router.get("/blog", response_model=dict)  # GET /blog?page=1&limit=10&search=query
 async def list_my_blogs(
+    request: Request,
+    response: Response,
     user=Depends(get_current_user),
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=5, le=50),
@@ -55,14 +96,16 @@ async def list_my_blogs(
     
     # Fetch all blogs for the user (we'll filter by search in Python since Firestore doesn't support full-text search)
     # For better performance with large datasets, consider using a search service like Algolia or Elasticsearch
-    all_blogs = query_blogs(q, order_by="created_at", order_direction="DESCENDING", skip=0, limit=1000)
+    all_blogs = await query_blogs_coalesced(
+        q, order_by="created_at", order_direction="DESCENDING", skip=0, limit=1000, select=MY_BLOGS_FIELDS
+    )
     
     # Apply search filter if provided
     search_lower = search.strip().lower()
     if search_lower:
         filtered_blogs = []
         for b in all_blogs:
-            title = (b.get("meta") or {}).get("title", "") or (b.get("final_blog") or {}).get("render", {}).get("title", "")
+            title = (b.get("meta") or {}).get("title", "") or blog_summary_field(b, "title")
             language = (b.get("meta") or {}).get("language", "English")
             tone = (b.get("meta") or {}).get("tone", "")
             creativity = (b.get("meta") or {}).get("creativity", "")
@@ -86,8 +129,7 @@ async def list_my_blogs(
         items.append(
             {
                 "id": b.get("id", ""),
-                "title": (b.get("meta") or {}).get("title", "")
-                or (b.get("final_blog") or {}).get("render", {}).get("title", ""),
+                "title": (b.get("meta") or {}).get("title", "") or blog_summary_field(b, "title"),
                 "language": (b.get("meta") or {}).get("language", "English"),
                 "tone": (b.get("meta") or {}).get("tone", ""),
                 "creativity": (b.get("meta") or {}).get("creativity", ""),
@@ -97,38 +139,51 @@ async def list_my_blogs(
             }
         )
 
-    return {"items": items, "page": page, "limit": limit, "total": total}
+    body = {"items": items, "page": page, "limit": limit, "total": total}
+    return respond_conditionally(request, response, body, content_etag(body))
 
 
 # ---------------- STATS ----------------
 @router.get("/blogs/stats", response_model=dict)  # GET /blogs/stats
 async def blog_stats(user=Depends(get_current_user)):
-    from app.models.firestore_db import count_images, query_images
+    from app.models.firestore_db import count_images_coalesced, get_blog_counts
     
     q_owner = {"owner_id": user["id"]}
 
-    total = count_blogs(q_owner)
-    saved = count_blogs({**q_owner, "status": "saved"})
-    pending = count_blogs({**q_owner, "status": "pending"})
-    published = count_blogs({**q_owner, "status": "published"})
-    
-    # Count images with $or condition
-    images = count_images(
-        {
-            "owner_id": user["id"],
-            "$or": [
-                {"source": {"$in": ["nano", "blog"]}},
-                {"source": {"$exists": False}},
-                {"source": None},
-            ],
-        }
+    async def no_counts():
+        return None
+
+    # Blog counts are kept by the blog.counters background task (one document
+    # read); they are only trusted while task workers run to keep them current
+    counts, images = await asyncio.gather(
+        run_in_executor("db", get_blog_counts, user["id"]) if settings.TASK_WORKER_ENABLED else no_counts(),
+        # Count images with $or condition
+        count_images_coalesced(
+            {
+                "owner_id": user["id"],
+                "$or": [
+                    {"source": {"$in": ["nano", "blog"]}},
+                    {"source": {"$exists": False}},
+                    {"source": None},
+                ],
+            }
+        ),
     )
+    if counts is None:
+        # Not computed yet for this owner: the four counts are independent, run them concurrently
+        total, saved, pending, published = await asyncio.gather(
+            count_blogs_coalesced(q_owner),
+            count_blogs_coalesced({**q_owner, "status": "saved"}),
+            count_blogs_coalesced({**q_owner, "status": "pending"}),
+            count_blogs_coalesced({**q_owner, "status": "published"}),
+        )
+        counts = {"total_blogs": total, "saved_blogs": saved, "pending_blogs": pending, "published_blogs": published}
 
     return {
-        "total_blogs": total,
-        "saved_blogs": saved,
-        "pending_blogs": pending,
-        "published_blogs": published,
+        "total_blogs": counts["total_blogs"],
+        "saved_blogs": counts["saved_blogs"],
+        "pending_blogs": counts["pending_blogs"],
+        "published_blogs": counts["published_blogs"],
         "generated_images": images,
     }
 
@@ -153,70 +208,221 @@ async def upload_image(file: UploadFile = File(...), user=Depends(get_current_us
         else:
             ext = ".png"
 
-    filename = f"{uuid.uuid4().hex}{ext}"
-    image_url = upload_bytes_to_gcs(data, filename, file.content_type or None)
-    create_image(
-        {
-            "owner_id": user["id"],
-            "owner_name": user.get("name", ""),
-            "image_url": image_url,
-            "meta": {
-                "filename": file.filename or filename,
-                "content_type": file.content_type or "",
-                "size": len(data),
-            },
-            "source": "upload",
-            "created_at": datetime.utcnow(),
-        }
-    )
+    async with job_tracker.track("image-upload", user["id"]):
+        filename = f"{uuid.uuid4().hex}{ext}"
+        image_url = await run_in_executor("storage", upload_bytes_to_gcs, data, filename, file.content_type or None)
+        await run_in_executor(
+            "db", create_image,
+            {
+                "owner_id": user["id"],
+                "owner_name": user.get("name", ""),
+                "image_url": image_url,
+                "meta": {
+                    "filename": file.filename or filename,
+                    "content_type": file.content_type or "",
+                    "size": len(data),
+                },
+                "source": "upload",
+                "created_at": datetime.utcnow(),
+            }
+        )
     return {"image_url": image_url}
 
 
 # ---------------- BLOG BY ID ---------------- 
 @router.get("/blogs/{blog_id}", response_model=BlogOut)  # GET /blogs/{blog_id}
-async def get_blog(blog_id: str, user=Depends(get_current_user)):
-    b = get_blog_by_id(blog_id)
+async def get_blog(blog_id: str, request: Request, response: Response, user=Depends(get_current_user)):
+    # Revalidations (If-None-Match / If-Modified-Since) read the header first and
+    # only fetch the heavy body when the blog changed since the client's copy
+    conditional = "if-none-match" in request.headers or "if-modified-since" in request.headers
+    b = await run_in_executor("db", get_blog_by_id, blog_id, include_body=not conditional)
     if not b:
         raise HTTPException(status_code=404, detail="Blog not found")
     if b.get("owner_id") != user["id"] and user["role"] != "admin":
         raise HTTPException(status_code=403, detail="Not allowed")
 
+    updated_at = b.get("updated_at")
+    etag = weak_etag(blog_id, updated_at.isoformat()) if updated_at else None
+    if etag and is_not_modified(request, etag, updated_at):
+        return not_modified_response(etag, updated_at)
+    if conditional:
+        final_blog = await run_in_executor("db", get_blog_body, blog_id)
+        if final_blog is not None:
+            b["final_blog"] = final_blog
+
     # Ensure 'id' field is present (BlogOut schema requires it)
     if "id" not in b:
         b["id"] = blog_id
     
-    return b
+    return respond_conditionally(request, response, b, etag or content_etag(b), updated_at)
+
+
+# ---------------- BATCH GET BLOGS ----------------
+@router.post("/blogs:batchGet", response_model=BlogBatchGetOut)  # POST /blogs:batchGet
+async def batch_get_blogs(payload: BlogBatchGetIn, user=Depends(get_current_user)):
+    """
+    Fetch many blogs in one request (single Firestore get_all).
+    Blogs the user may not read are reported in 'forbidden', unknown IDs in 'missing'.
+    Items have the same fields as GET /blogs/{blog_id} (final_blog only with include_body).
+    """
+    blogs = await run_in_executor("db", get_blogs_by_ids, payload.ids, include_body=payload.include_body)
+
+    items, missing, forbidden = [], [], []
+    for blog_id, b in blogs.items():
+        if not b:
+            missing.append(blog_id)
+        elif b.get("owner_id") != user["id"] and user["role"] != "admin":
+            forbidden.append(blog_id)
+        else:
+            items.append(b)
+
+    return {"items": items, "missing": missing, "forbidden": forbidden}
 
 
 # ---------------- DELETE BLOG ----------------
 @router.delete("/blogs/{blog_id}", response_model=dict)
 async def delete_blog_route(blog_id: str, user=Depends(get_current_user)):
-    b = get_blog_by_id(blog_id)
+    b = await run_in_executor("db", get_blog_by_id, blog_id)
     if not b:
         raise HTTPException(status_code=404, detail="Blog not found")
     if b.get("owner_id") != user["id"] and user["role"] != "admin":
         raise HTTPException(status_code=403, detail="Not allowed")
 
-    delete_blog(blog_id)
+    await run_in_executor("db", delete_blog, blog_id)
+    if b.get("status") == "published":
+        await invalidate_public_blogs()
+    await on_blog_changed(blog_id, owner_id=b.get("owner_id"), public=b.get("status") == "published")
     return {"ok": True}
 
 
 # ---------------- UPDATE BLOG ----------------
 @router.put("/blogs/{blog_id}", response_model=dict)
 async def update_blog_route(blog_id: str, payload: BlogCreateIn, user=Depends(get_current_user)):
-    b = get_blog_by_id(blog_id)
+    content = {
+        "meta": payload.meta.model_dump(),
+        "final_blog": payload.final_blog.model_dump(),
+    }
+    stored = {}
+
+    def build(b):
+        stored.update(status=b.get("status"), version=b.get("version", 0))
+        return content_updates(b, user, content)
+
+    applied = await run_transition(blog_id, build, revision=_revision_info(user, "update"))
+    if stored["status"] == "published":
+        await invalidate_public_blogs()
+        if "version" in applied:
+            await on_blog_changed(blog_id, public=True)
+    # Unchanged content keeps the stored version
+    return {"ok": True, "blog_id": blog_id, "version": applied.get("version", stored["version"])}
+
+
+# ---------------- PATCH BLOG (AUTOSAVE) ----------------
+@router.patch("/blogs/{blog_id}", response_model=dict)  # PATCH /blogs/{blog_id}
+async def patch_blog_route(blog_id: str, payload: BlogPatchIn, user=Depends(get_current_user)):
+    """
+    Incremental save (editor autosave): field diffs and/or JSON Patch operations
+    against base_version. Only the changed fields are written; the blog body is
+    only read when the patch touches final_blog. A stale base_version is a 409
+    with the current version, so the editor can reload instead of overwriting.
+    """
+    try:
+        include_body = "final_blog" in touched_roots(payload)
+        result = await run_in_executor(
+            "db", patch_blog, blog_id, lambda b: patch_content(b, user, payload),
+            include_body=include_body, revision=_revision_info(user, "autosave"),
+        )
+    except BlogNotFoundError:
+        raise HTTPException(status_code=404, detail="Blog not found")
+    except PermissionError as e:
+        raise HTTPException(status_code=403, detail=str(e))
+    except StaleVersionError as e:
+        raise HTTPException(
+            status_code=409, detail={"message": str(e), "current_version": e.current_version}
+        )
+    except PatchTestFailed as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except PatchError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if result["changed"] and result["status"] == "published":
+        await invalidate_public_blogs()
+        await on_blog_changed(blog_id, public=True)
+    return {
+        "ok": True,
+        "blog_id": blog_id,
+        "changed": result["changed"],
+        "version": result["version"],
+        "updated_at": result["updated_at"],
+    }
+
+
+# ---------------- REVISIONS ----------------
+async def _get_own_blog(blog_id: str, user: dict) -> dict:
+    b = await run_in_executor("db", get_blog_by_id, blog_id)
     if not b:
         raise HTTPException(status_code=404, detail="Blog not found")
     if b.get("owner_id") != user["id"] and user["role"] != "admin":
         raise HTTPException(status_code=403, detail="Not allowed")
+    return b
 
-    updates = {
-        "meta": payload.meta.model_dump(),
-        "final_blog": payload.final_blog.model_dump(),
-        "updated_at": datetime.utcnow(),
+
+@router.get("/blogs/{blog_id}/revisions", response_model=dict)  # GET /blogs/{blog_id}/revisions?limit=20&before=42
+async def list_revisions(
+    blog_id: str,
+    user=Depends(get_current_user),
+    limit: int = Query(20, ge=1, le=100),
+    before: Optional[int] = Query(None, ge=1, description="Only versions below this one (next page)"),
+):
+    """Revision history (metadata only), newest first."""
+    b = await _get_own_blog(blog_id, user)
+    current = b.get("version", 0)
+    before_version = min(before or current + 1, current + 1)
+    items = await run_in_executor("db", list_blog_revisions, blog_id, before_version, limit)
+    oldest = before_version - limit
+    return {
+        "items": items,
+        "version": current,
+        "next_before": oldest if oldest > 1 else None,
+    }
+
+
+@router.get("/blogs/{blog_id}/revisions/{version}", response_model=dict)  # GET /blogs/{blog_id}/revisions/{version}
+async def get_revision(blog_id: str, version: int, user=Depends(get_current_user)):
+    """One revision with its full content (meta + final_blog), e.g. to preview before restoring."""
+    await _get_own_blog(blog_id, user)
+    revision = await run_in_executor("db", get_blog_revision, blog_id, version)
+    if revision is None:
+        raise HTTPException(status_code=404, detail="Revision not found")
+    return revision
+
+
+@router.post("/blogs/{blog_id}/revisions/{version}/restore", response_model=dict)  # POST /blogs/{blog_id}/revisions/{version}/restore
+async def restore_revision(blog_id: str, version: int, user=Depends(get_current_user)):
+    """
+    Restore the blog's content to an earlier revision. This is a new edit (new
+    version and revision), so the history is kept and the restore can be undone.
+    """
+    b = await _get_own_blog(blog_id, user)
+    revision = await run_in_executor("db", get_blog_revision, blog_id, version)
+    if revision is None:
+        raise HTTPException(status_code=404, detail="Revision not found")
+
+    content = revision["content"]
+    applied = await run_transition(
+        blog_id, lambda blog: content_updates(blog, user, content),
+        revision={**_revision_info(user, "restore"), "restored_from": version},
+    )
+    if b.get("status") == "published":
+        await invalidate_public_blogs()
+        if "version" in applied:
+            await on_blog_changed(blog_id, public=True)
+    return {
+        "ok": True,
+        "blog_id": blog_id,
+        "restored_from": version,
+        "version": applied.get("version", b.get("version", 0)),
     }
-    update_blog(blog_id, updates)
-    return {"ok": True, "blog_id": blog_id}
 
 
 # ---------------- PUBLISH REQUEST ---------------- 
@@ -231,26 +437,18 @@ async def request_publish(
     This endpoint saves the blog content (if provided) and changes status to 'pending' for admin review.
     The blog content is saved when user clicks publish to ensure latest content is submitted.
     """
-    b = get_blog_by_id(blog_id)
-    if not b:
-        raise HTTPException(status_code=404, detail="Blog not found")
-    if b.get("owner_id") != user["id"]:
-        raise HTTPException(status_code=403, detail="Not allowed")
-
-    if b.get("status") == "published":
-        raise HTTPException(status_code=400, detail="Already published")
-
-    # Save/update the blog content and request publish
+    # Save/update the blog content and request publish in one transaction
     # This ensures the latest content is saved when user clicks publish
-    updates = {
+    content = {
         "meta": payload.meta.model_dump(),
         "final_blog": payload.final_blog.model_dump(),
-        "status": "pending",
-        "updated_at": datetime.utcnow(),
-        "admin_review.requested_at": datetime.utcnow(),
-        "admin_review.feedback": "",
     }
-    update_blog(blog_id, updates)
+    now = datetime.utcnow()
+    await run_transition(
+        blog_id, lambda b: request_publish_updates(b, user, content, now),
+        revision=_revision_info(user, "publish_request"),
+    )
+    await on_blog_changed(blog_id, owner_id=user["id"])
     return {"ok": True, "status": "pending", "blog_id": blog_id}
 
 
@@ -264,16 +462,18 @@ async def list_pending_blogs(
     """List all blogs pending admin approval"""
     skip = (page - 1) * limit
     q = {"status": "pending"}
-    total = count_blogs(q)
+    total = await count_blogs_coalesced(q)
 
-    blogs = query_blogs(q, order_by="admin_review.requested_at", order_direction="DESCENDING", skip=skip, limit=limit)
+    blogs = await query_blogs_coalesced(
+        q, order_by="admin_review.requested_at", order_direction="DESCENDING", skip=skip, limit=limit,
+        select=PENDING_BLOGS_FIELDS,
+    )
     items = []
     for b in blogs:
         items.append(
             {
                 "id": b.get("id", ""),
-                "title": (b.get("meta") or {}).get("title", "")
-                or (b.get("final_blog") or {}).get("render", {}).get("title", ""),
+                "title": (b.get("meta") or {}).get("title", "") or blog_summary_field(b, "title"),
                 "language": (b.get("meta") or {}).get("language", "English"),
                 "tone": (b.get("meta") or {}).get("tone", ""),
                 "creativity": (b.get("meta") or {}).get("creativity", ""),
@@ -298,16 +498,18 @@ async def list_published_blogs(
     """List all published/approved blogs"""
     skip = (page - 1) * limit
     q = {"status": "published"}
-    total = count_blogs(q)
+    total = await count_blogs_coalesced(q)
 
-    blogs = query_blogs(q, order_by="published_at", order_direction="DESCENDING", skip=skip, limit=limit)
+    blogs = await query_blogs_coalesced(
+        q, order_by="published_at", order_direction="DESCENDING", skip=skip, limit=limit,
+        select=PUBLISHED_BLOGS_FIELDS,
+    )
     items = []
     for b in blogs:
         items.append(
             {
                 "id": b.get("id", ""),
-                "title": (b.get("meta") or {}).get("title", "")
-                or (b.get("final_blog") or {}).get("render", {}).get("title", ""),
+                "title": (b.get("meta") or {}).get("title", "") or blog_summary_field(b, "title"),
                 "language": (b.get("meta") or {}).get("language", "English"),
                 "tone": (b.get("meta") or {}).get("tone", ""),
                 "creativity": (b.get("meta") or {}).get("creativity", ""),
@@ -327,25 +529,17 @@ async def list_published_blogs(
 # ---------------- ADMIN: APPROVE BLOG ---------------- 
 @router.post("/admin/blogs/{blog_id}/approve", response_model=dict)  # POST /admin/blogs/{blog_id}/approve
 async def approve_blog(blog_id: str, admin=Depends(require_admin)):
-    """Approve a blog for publishing"""
-    b = get_blog_by_id(blog_id)
-    if not b:
-        raise HTTPException(status_code=404, detail="Blog not found")
-    
-    if b.get("status") != "pending":
-        raise HTTPException(status_code=400, detail="Blog is not pending approval")
-
+    """Approve a blog for publishing (page, thumbnail, feeds and counters are updated in the background)"""
     now = datetime.utcnow()
-    updates = {
-        "status": "published",
-        "updated_at": now,
-        "published_at": now,
-        "admin_review.reviewed_at": now,
-        "admin_review.reviewed_by": admin["id"],
-        "admin_review.reviewed_by_name": admin["name"],
-        "admin_review.feedback": "",
-    }
-    update_blog(blog_id, updates)
+    stored = {}
+
+    def build(b):
+        stored["owner_id"] = b.get("owner_id")
+        return approve_updates(b, admin, now)
+
+    await run_transition(blog_id, build)
+    await invalidate_public_blogs()
+    await on_blog_changed(blog_id, owner_id=stored["owner_id"], public=True)
     return {"ok": True, "status": "published"}
 
 
@@ -357,23 +551,15 @@ async def reject_blog(
     admin=Depends(require_admin),
 ):
     """Reject a blog and return it to saved status with feedback"""
-    b = get_blog_by_id(blog_id)
-    if not b:
-        raise HTTPException(status_code=404, detail="Blog not found")
-    
-    if b.get("status") != "pending":
-        raise HTTPException(status_code=400, detail="Blog is not pending approval")
-
     now = datetime.utcnow()
-    updates = {
-        "status": "saved",
-        "updated_at": now,
-        "admin_review.reviewed_at": now,
-        "admin_review.reviewed_by": admin["id"],
-        "admin_review.reviewed_by_name": admin["name"],
-        "admin_review.feedback": feedback or "Blog rejected. Please review and resubmit.",
-    }
-    update_blog(blog_id, updates)
+    stored = {}
+
+    def build(b):
+        stored["owner_id"] = b.get("owner_id")
+        return reject_updates(b, admin, feedback, now)
+
+    await run_transition(blog_id, build)
+    await on_blog_changed(blog_id, owner_id=stored["owner_id"])
     return {"ok": True, "status": "saved", "feedback": feedback}
 
 
@@ -385,84 +571,63 @@ async def add_blog_comment(
     admin=Depends(require_admin),
 ):
     """Add a comment/feedback to a blog (admin only)"""
-    b = get_blog_by_id(blog_id)
-    if not b:
-        raise HTTPException(status_code=404, detail="Blog not found")
-    
     now = datetime.utcnow()
-    # Update the feedback field with the comment
-    # If there's existing feedback, append the new comment
-    existing_feedback = (b.get("admin_review") or {}).get("feedback", "")
-    new_feedback = payload.comment.strip()
-    
-    if existing_feedback and new_feedback:
-        # Append new comment with separator
-        updated_feedback = f"{existing_feedback}\n\n--- {admin.get('name', 'Admin')} ({now.strftime('%Y-%m-%d %H:%M:%S')}) ---\n{new_feedback}"
-    else:
-        updated_feedback = new_feedback
-    
-    updates = {
-        "updated_at": now,
-        "admin_review.feedback": updated_feedback,
-    }
-    
-    # If blog is pending and hasn't been reviewed yet, update reviewed_by info
-    admin_review = b.get("admin_review") or {}
-    if not admin_review.get("reviewed_by"):
-        updates["admin_review.reviewed_by"] = admin["id"]
-        updates["admin_review.reviewed_by_name"] = admin["name"]
-    
-    update_blog(blog_id, updates)
-    return {"ok": True, "comment": new_feedback}
+    await run_transition(blog_id, lambda b: comment_updates(b, admin, payload.comment, now))
+    return {"ok": True, "comment": payload.comment.strip()}
 
 
 # ---------------- CHANGE BLOG STATUS TO DRAFT ---------------- 
 @router.post("/blogs/{blog_id}/draft", response_model=dict)  # POST /blogs/{blog_id}/draft
 async def change_to_draft(blog_id: str, user=Depends(get_current_user)):
     """Change a published blog back to draft (saved) status"""
-    b = get_blog_by_id(blog_id)
-    if not b:
-        raise HTTPException(status_code=404, detail="Blog not found")
-    
-    if b.get("owner_id") != user["id"] and user["role"] != "admin":
-        raise HTTPException(status_code=403, detail="Not allowed")
-    
-    if b.get("status") != "published":
-        raise HTTPException(status_code=400, detail="Blog is not published")
-
     now = datetime.utcnow()
-    updates = {
-        "status": "saved",
-        "updated_at": now,
-    }
-    update_blog(blog_id, updates)
+    stored = {}
+
+    def build(b):
+        stored["owner_id"] = b.get("owner_id")
+        return draft_updates(b, user, now)
+
+    await run_transition(blog_id, build)
+    await invalidate_public_blogs()
+    await on_blog_changed(blog_id, owner_id=stored["owner_id"], public=True)
     return {"ok": True, "status": "saved"}
 
 @router.get("/public/blogs", response_model=dict)
 async def list_public_blogs(
+    request: Request,
+    response: Response,
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1, le=50),
 ):
+    """Fetch published blogs, served from the shared cache between publish/unpublish events."""
+    body = await public_blogs_cache.get_or_load(f"{page}:{limit}", lambda: _load_public_blogs(page, limit))
+    return respond_conditionally(request, response, body, content_etag(body), public=True)
+
+
+async def _load_public_blogs(page: int, limit: int) -> dict:
     """Fetch published blogs directly from Firestore."""
     skip = (page - 1) * limit
     q = {"status": "published"}
     
-    total_count = count_blogs(q)
+    total_count = await count_blogs_coalesced(q)
     
     # Fetch the actual blogs from Firestore, sorted by newest first
-    blogs_from_db = query_blogs(q, order_by="published_at", order_direction="DESCENDING", skip=skip, limit=limit)
+    blogs_from_db = await query_blogs_coalesced(
+        q, order_by="published_at", order_direction="DESCENDING", skip=skip, limit=limit,
+        select=PUBLIC_BLOGS_FIELDS,
+    )
     
     # Format them exactly how your React frontend expects them
     items = []
     for b in blogs_from_db:
-        render = b.get("final_blog", {}).get("render", {})
         meta = b.get("meta", {})
         
         items.append({
             "id": str(b.get("id")), # Firestore uses standard id
-            "title": render.get("title", "") or meta.get("title", ""),
-            "cover_image_url": render.get("cover_image_url", ""),
-            "intro": render.get("intro_md", ""),
+            "title": blog_summary_field(b, "title") or meta.get("title", ""),
+            "cover_image_url": blog_summary_field(b, "cover_image_url"),
+            "thumbnail_url": (b.get("summary") or {}).get("thumbnail_url", ""),
+            "intro": blog_summary_field(b, "intro_md"),
             "author": b.get("owner_name", "Admin"),
             "category": meta.get("focus_or_niche", "Technology"),
             "published_at": b.get("published_at"),
@@ -1,9 +1,11 @@
 from datetime import datetime
-from fastapi import APIRouter, Depends, Query, HTTPException
+from fastapi import APIRouter, Depends, Query, HTTPException, Request, Response
 
-from app.models.firestore_db import create_image, get_image_by_url, query_images, count_images
-from app.models.schemas import ImageSaveIn
+from app.models.firestore_db import create_image, get_image_by_url, query_images_coalesced, count_images_coalesced, get_images_by_ids
+from app.models.schemas import ImageSaveIn, ImageBatchGetIn
+from core.conditional import content_etag, respond_conditionally
 from core.deps import get_current_user
+from core.executors import ExecutorSaturated, run_in_executor
 
 router = APIRouter()
 
@@ -18,12 +20,39 @@ async def save_image(payload: ImageSaveIn, user=Depends(get_current_user)):
         "created_at": datetime.utcnow(),
     }
 
-    existing = get_image_by_url(user["id"], payload.image_url)
+    existing = await run_in_executor("db", get_image_by_url, user["id"], payload.image_url)
     if not existing:
-        create_image(doc)
+        await run_in_executor("db", create_image, doc)
 
     return {"image_url": payload.image_url, "meta": payload.meta or {}}
 
+@router.post("/images:batchGet", response_model=dict)
+async def batch_get_images(payload: ImageBatchGetIn, user=Depends(get_current_user)):
+    """
+    Fetch many images by ID in one request (single Firestore get_all).
+    Like blogs:batchGet, admins may read every image; others only their own.
+    """
+    images = await run_in_executor("db", get_images_by_ids, payload.ids)
+
+    items, missing, forbidden = [], [], []
+    for image_id, img in images.items():
+        if not img:
+            missing.append(image_id)
+        elif img.get("owner_id") != user["id"] and user["role"] != "admin":
+            forbidden.append(image_id)
+        else:
+            items.append(
+                {
+                    "id": img.get("id", ""),
+                    "image_url": img.get("image_url", ""),
+                    "meta": img.get("meta", {}),
+                    "source": img.get("source", None),
+                    "created_at": img.get("created_at"),
+                }
+            )
+
+    return {"items": items, "missing": missing, "forbidden": forbidden}
+
 @router.delete("/images/{image_id}", response_model=dict)
 async def delete_image(image_id: str, user=Depends(get_current_user)):
     """Delete an image by ID (only if owned by the user)"""
@@ -31,7 +60,7 @@ async def delete_image(image_id: str, user=Depends(get_current_user)):
     
     images_col = get_images_collection()
     doc_ref = images_col.document(image_id)
-    doc = doc_ref.get()
+    doc = await run_in_executor("db", doc_ref.get)
     
     if not doc.exists:
         raise HTTPException(status_code=404, detail="Image not found")
@@ -40,10 +69,12 @@ async def delete_image(image_id: str, user=Depends(get_current_user)):
     if image_data.get("owner_id") != user["id"]:
         raise HTTPException(status_code=403, detail="Not allowed to delete this image")
     
-    doc_ref.delete()
+    await run_in_executor("db", doc_ref.delete)
     return {"ok": True, "image_id": image_id}
 @router.get("/images", response_model=dict)
 async def list_images(
+    request: Request,
+    response: Response,
     user=Depends(get_current_user),
     page: int = Query(1, ge=1),
     limit: int = Query(24, ge=1, le=100),
@@ -69,8 +100,8 @@ async def list_images(
                 q["source"] = source
         
         #   Ask the database for the actual images!
-        total = count_images(q)
-        images = query_images(q, order_by="created_at", order_direction="DESCENDING", skip=skip, limit=limit)
+        total = await count_images_coalesced(q)
+        images = await query_images_coalesced(q, order_by="created_at", order_direction="DESCENDING", skip=skip, limit=limit)
         
         items = []
         for img in images:
@@ -84,7 +115,10 @@ async def list_images(
                 }
             )
 
-        return {"items": items, "page": page, "limit": limit, "total": total}
+        body = {"items": items, "page": page, "limit": limit, "total": total}
+        return respond_conditionally(request, response, body, content_etag(body))
         
+    except ExecutorSaturated:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
\ No newline at end of file
@@ -0,0 +1,17 @@
+"""
+Shared caches for blog list responses.
+
+The public blog list is the same for every visitor and only changes when a
+blog enters or leaves the published state (or a published blog is edited or
+deleted). Its pages are cached in the shared cache so every worker serves the
+same data, and every such change invalidates all pages at once.
+"""
+from core.cache import CacheNamespace
+from core.config import settings
+
+public_blogs_cache = CacheNamespace("public_blogs", settings.PUBLIC_BLOGS_CACHE_TTL_SECONDS)
+
+
+async def invalidate_public_blogs() -> None:
+    """Call after any write that changes what /public/blogs shows."""
+    await public_blogs_cache.invalidate()
@@ -0,0 +1,183 @@
+"""
+Incremental blog edits (editor autosave).
+
+PATCH /blogs/{blog_id} sends only what changed since the version the editor
+loaded, either as field diffs or as JSON Patch (RFC 6902) operations:
+
+    {"base_version": 7, "fields": {"meta.title": "New title",
+                                   "final_blog.render.sections.2.body_md": "..."}}
+    {"base_version": 7, "patch": [{"op": "replace", "path": "/meta/title", "value": "New title"},
+                                  {"op": "add", "path": "/final_blog/render/sections/-", "value": {...}}]}
+
+Only meta and final_blog can be edited this way. The patch is applied to the
+stored blog inside a Firestore transaction (patch_blog): the stored version
+must still equal base_version, otherwise the edit was made against an older
+copy and is rejected (409) instead of silently overwriting a newer save.
+The result is validated against the BlogMeta / FinalBlog schemas and only the
+fields that actually changed are written.
+"""
+import copy
+from typing import Any, Dict, List, Set
+
+from pydantic import ValidationError
+
+from app.models.schemas import BlogMeta, BlogPatchIn, FinalBlog
+
+PATCHABLE_ROOTS = {"meta": BlogMeta, "final_blog": FinalBlog}
+
+
+class PatchError(ValueError):
+    """The patch is malformed or does not apply to the stored blog."""
+
+
+class PatchTestFailed(PatchError):
+    """A JSON Patch "test" operation did not match the stored value."""
+
+
+class StaleVersionError(Exception):
+    """The blog changed since the version the patch was made against."""
+
+    def __init__(self, current_version: int):
+        super().__init__(f"Blog was modified (current version {current_version})")
+        self.current_version = current_version
+
+
+def _pointer_tokens(pointer: str) -> List[str]:
+    """Split a JSON Pointer ("/final_blog/render/title") into unescaped reference tokens."""
+    if not pointer.startswith("/"):
+        raise PatchError(f"Invalid JSON Pointer: {pointer!r}")
+    return [token.replace("~1", "/").replace("~0", "~") for token in pointer[1:].split("/")]
+
+
+def _check_root(tokens: List[str], path: str) -> None:
+    if tokens[0] not in PATCHABLE_ROOTS:
+        raise PatchError(f"Only fields under {', '.join(PATCHABLE_ROOTS)} can be patched: {path!r}")
+
+
+def _index(container: list, token: str, path: str, allow_end: bool = False) -> int:
+    if allow_end and token == "-":
+        return len(container)
+    if not token.isdigit():
+        raise PatchError(f"Invalid list index in {path!r}")
+    index = int(token)
+    if index > len(container) or (index == len(container) and not allow_end):
+        raise PatchError(f"List index out of range in {path!r}")
+    return index
+
+
+def _parent(doc: Dict[str, Any], tokens: List[str], path: str) -> Any:
+    target: Any = doc
+    for token in tokens[:-1]:
+        if isinstance(target, dict) and token in target:
+            target = target[token]
+        elif isinstance(target, list):
+            target = target[_index(target, token, path)]
+        else:
+            raise PatchError(f"Path not found: {path!r}")
+    return target
+
+
+def _get(doc: Dict[str, Any], tokens: List[str], path: str) -> Any:
+    parent = _parent(doc, tokens, path)
+    last = tokens[-1]
+    if isinstance(parent, dict) and last in parent:
+        return parent[last]
+    if isinstance(parent, list):
+        return parent[_index(parent, last, path)]
+    raise PatchError(f"Path not found: {path!r}")
+
+
+def _add(doc: Dict[str, Any], tokens: List[str], path: str, value: Any) -> None:
+    parent = _parent(doc, tokens, path)
+    if isinstance(parent, dict):
+        parent[tokens[-1]] = value
+    elif isinstance(parent, list):
+        parent.insert(_index(parent, tokens[-1], path, allow_end=True), value)
+    else:
+        raise PatchError(f"Path not found: {path!r}")
+
+
+def _replace(doc: Dict[str, Any], tokens: List[str], path: str, value: Any) -> None:
+    parent = _parent(doc, tokens, path)
+    if isinstance(parent, dict) and tokens[-1] in parent:
+        parent[tokens[-1]] = value
+    elif isinstance(parent, list):
+        parent[_index(parent, tokens[-1], path)] = value
+    else:
+        raise PatchError(f"Path not found: {path!r}")
+
+
+def _remove(doc: Dict[str, Any], tokens: List[str], path: str) -> None:
+    parent = _parent(doc, tokens, path)
+    if isinstance(parent, dict) and tokens[-1] in parent:
+        del parent[tokens[-1]]
+    elif isinstance(parent, list):
+        del parent[_index(parent, tokens[-1], path)]
+    else:
+        raise PatchError(f"Path not found: {path!r}")
+
+
+def _apply_field(doc: Dict[str, Any], field_path: str, value: Any) -> None:
+    """Field diff: set a dotted path ("meta.title", "final_blog.render.sections.0.heading")."""
+    tokens = field_path.split(".")
+    _check_root(tokens, field_path)
+    if isinstance(_parent(doc, tokens, field_path), dict):
+        _add(doc, tokens, field_path, value)
+    else:
+        # List items are replaced in place, never inserted
+        _replace(doc, tokens, field_path, value)
+
+
+def touched_roots(payload: BlogPatchIn) -> Set[str]:
+    """Top-level fields (meta / final_blog) the patch writes to."""
+    roots = {path.split(".")[0] for path in payload.fields}
+    roots.update(_pointer_tokens(op.path)[0] for op in payload.patch)
+    return roots
+
+
+def apply_patch(blog: Dict[str, Any], payload: BlogPatchIn) -> Dict[str, Any]:
+    """
+    Apply field diffs, then JSON Patch operations, to a copy of the blog's content.
+
+    Returns {root: validated content} for the touched roots (meta / final_blog).
+    Raises PatchError (or PatchTestFailed) when the patch does not apply.
+    """
+    roots = touched_roots(payload)
+    doc = {root: copy.deepcopy(blog.get(root) or {}) for root in roots}
+
+    for field_path, value in payload.fields.items():
+        _apply_field(doc, field_path, copy.deepcopy(value))
+
+    for op in payload.patch:
+        tokens = _pointer_tokens(op.path)
+        _check_root(tokens, op.path)
+        if op.op == "test":
+            if _get(doc, tokens, op.path) != op.value:
+                raise PatchTestFailed(f"Test failed at {op.path!r}")
+        elif op.op == "add":
+            _add(doc, tokens, op.path, copy.deepcopy(op.value))
+        elif op.op == "replace":
+            _replace(doc, tokens, op.path, copy.deepcopy(op.value))
+        else:
+            _remove(doc, tokens, op.path)
+
+    content = {}
+    for root in roots:
+        try:
+            content[root] = PATCHABLE_ROOTS[root].model_validate(doc.get(root) or {}).model_dump()
+        except ValidationError as e:
+            errors = "; ".join(
+                f"{root}.{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors()
+            )
+            raise PatchError(f"Patched blog is invalid: {errors}")
+    return content
+
+
+def patch_content(blog: Dict[str, Any], user: dict, payload: BlogPatchIn) -> Dict[str, Any]:
+    """Builder for patch_blog: owner/admin check, base version check, then apply_patch."""
+    if blog.get("owner_id") != user["id"] and user["role"] != "admin":
+        raise PermissionError("Not allowed")
+    current_version = blog.get("version", 0)
+    if current_version != payload.base_version:
+        raise StaleVersionError(current_version)
+    return apply_patch(blog, payload)
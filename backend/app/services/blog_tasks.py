@@ -0,0 +1,268 @@
+"""
+Side effects of blog state transitions, run as background tasks (core.tasks).
+
+Publishing only flips the blog's status; everything derived from published
+blogs is rebuilt after the response by these tasks:
+
+- blog.prerender: static HTML page of a published blog, uploaded to GCS
+  (public/blogs/{id}.html); deleted when the blog is unpublished or deleted
+- blog.thumbnail: small JPEG of the cover image for list pages
+  (summary.thumbnail_url on the blog header); only covers in this host's
+  /uploads or the app's GCS bucket are read, never arbitrary URLs
+- site.feeds: sitemap.xml and rss.xml of all published blogs
+- blog.counters: an owner's blog counts by status (blog_stats/{owner_id}),
+  read by /blogs/stats instead of four count queries
+
+Each task derives its output from the blog's current state, never from the
+event that queued it, so retries, duplicates and out-of-order runs all end in
+the same result. Keys are per blog (per owner for counters, one for feeds):
+a burst of transitions coalesces into at most one pending run per key.
+"""
+import asyncio
+import html
+import logging
+import os
+import uuid
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Any, Dict, List, Optional
+from xml.sax.saxutils import escape
+
+from app.models.firestore_db import (
+    get_blog_by_id, blog_summary_field, count_blogs_coalesced, query_blogs_coalesced,
+    save_blog_counts, set_blog_thumbnail,
+)
+from app.services import image_service
+from app.services.blog_cache import invalidate_public_blogs
+from app.services.image_service import delete_from_gcs, make_thumbnail_file, upload_bytes_to_gcs
+from app.services.markdown_service import markdown_to_html
+from core.config import settings
+from core.executors import run_in_executor
+from core.http import stream_download
+from core.tasks import enqueue_task, task_handler
+
+logger = logging.getLogger(__name__)
+
+PAGE_OBJECT = "public/blogs/{blog_id}.html"
+THUMBNAIL_OBJECT = "public/thumbnails/{blog_id}.jpg"
+SITEMAP_OBJECT = "public/sitemap.xml"
+RSS_OBJECT = "public/rss.xml"
+PUBLIC_CACHE_CONTROL = "public, max-age=300"
+
+RSS_ITEMS = 50
+SITEMAP_MAX_URLS = 5000
+FEED_FIELDS = ["meta.title", "summary.title", "summary.intro_md", "owner_name", "published_at", "updated_at"]
+
+
+def site_url() -> str:
+    return (settings.SITE_URL or settings.PUBLIC_BASE_URL).rstrip("/")
+
+
+def blog_url(blog_id: str) -> str:
+    return site_url() + settings.SITE_BLOG_PATH.format(id=blog_id)
+
+
+def _utc(value: Any) -> Optional[datetime]:
+    """Firestore timestamps come back timezone-aware; datetime.utcnow() values written by older code may not."""
+    if not isinstance(value, datetime):
+        return None
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+# ---------------- triggers ----------------
+async def on_blog_changed(blog_id: str, owner_id: Optional[str] = None, public: bool = False) -> None:
+    """
+    Queue the side effects of a blog write (call after it committed).
+
+    owner_id: the owner's blog counts changed (created, deleted, status changed)
+    public: what visitors see changed (the blog entered or left the published
+    state, or a published blog was edited or deleted)
+    """
+    if owner_id:
+        await enqueue_task("blog.counters", {"owner_id": owner_id}, key=f"blog.counters:{owner_id}")
+    if public:
+        await enqueue_task("blog.prerender", {"blog_id": blog_id}, key=f"blog.prerender:{blog_id}")
+        await enqueue_task("blog.thumbnail", {"blog_id": blog_id}, key=f"blog.thumbnail:{blog_id}")
+        await enqueue_task("site.feeds", {}, key="site.feeds")
+
+
+# ---------------- blog.prerender ----------------
+def render_blog_page(blog: Dict[str, Any], body_html: str) -> str:
+    """Standalone HTML page of a published blog (title, description, Open Graph tags, body)."""
+    meta = blog.get("meta") or {}
+    title = blog_summary_field(blog, "title") or meta.get("title", "")
+    description = " ".join((blog_summary_field(blog, "intro_md") or "").split())[:300]
+    cover = blog_summary_field(blog, "cover_image_url")
+    published = _utc(blog.get("published_at"))
+    url = blog_url(blog["id"])
+    head = [
+        '<meta charset="utf-8">',
+        '<meta name="viewport" content="width=device-width, initial-scale=1">',
+        f"<title>{html.escape(title)}</title>",
+        f'<meta name="description" content="{html.escape(description)}">',
+        f'<link rel="canonical" href="{html.escape(url)}">',
+        '<meta property="og:type" content="article">',
+        f'<meta property="og:title" content="{html.escape(title)}">',
+        f'<meta property="og:description" content="{html.escape(description)}">',
+        f'<meta property="og:url" content="{html.escape(url)}">',
+    ]
+    if cover:
+        head.append(f'<meta property="og:image" content="{html.escape(cover)}">')
+    if published:
+        head.append(f'<meta property="article:published_time" content="{published.isoformat()}">')
+    author = html.escape(blog.get("owner_name", ""))
+    return (
+        f'<!DOCTYPE html>\n<html lang="en">\n<head>\n{chr(10).join(head)}\n</head>\n<body>\n'
+        f'<article>\n<p class="byline">{author}</p>\n{body_html}\n</article>\n</body>\n</html>\n'
+    )
+
+
+@task_handler("blog.prerender")
+async def prerender_blog(payload: Dict[str, Any]) -> None:
+    blog_id = payload["blog_id"]
+    filename = PAGE_OBJECT.format(blog_id=blog_id)
+    blog = await run_in_executor("db", get_blog_by_id, blog_id, True)
+    if not blog or blog.get("status") != "published":
+        await run_in_executor("storage", delete_from_gcs, filename)
+        return
+
+    final_blog = blog.get("final_blog") or {}
+    body_html = final_blog.get("html") or await run_in_executor(
+        "imaging", markdown_to_html, final_blog.get("markdown", "")
+    )
+    page = render_blog_page(blog, body_html)
+    await run_in_executor(
+        "storage", upload_bytes_to_gcs, page.encode("utf-8"), filename,
+        "text/html; charset=utf-8", PUBLIC_CACHE_CONTROL,
+    )
+
+
+# ---------------- blog.thumbnail ----------------
+def _local_upload(url: str) -> Optional[str]:
+    """Path of a cover served from this host's /uploads (generated images), if present."""
+    _, sep, name = url.partition("/uploads/")
+    if not sep or not (url.startswith("/uploads/") or url.startswith(f"{settings.PUBLIC_BASE_URL}/uploads/")):
+        return None
+    path = os.path.join(image_service.UPLOADS_DIR, os.path.basename(name))
+    return path if os.path.exists(path) else None
+
+
+def _bucket_url(url: str) -> bool:
+    """True for an object URL in the app's own GCS bucket (the only remote covers fetched)."""
+    return bool(settings.GCS_BUCKET) and url.startswith(image_service._gcs_public_url(""))
+
+
+@task_handler("blog.thumbnail")
+async def make_blog_thumbnail(payload: Dict[str, Any]) -> None:
+    blog_id = payload["blog_id"]
+    blog = await run_in_executor("db", get_blog_by_id, blog_id)
+    if not blog:
+        await run_in_executor("storage", delete_from_gcs, THUMBNAIL_OBJECT.format(blog_id=blog_id))
+        return
+    cover = blog_summary_field(blog, "cover_image_url")
+    if blog.get("status") != "published" or not cover:
+        return
+    if (blog.get("summary") or {}).get("thumbnail_source") == cover:
+        return  # already made from this cover
+
+    src = _local_upload(cover)
+    download = None
+    if src is None:
+        # cover_image_url is user input: fetching any URL would let blog owners make
+        # the server request internal addresses (SSRF)
+        if not _bucket_url(cover):
+            logger.warning(f"Blog {blog_id}: cover image is not in our uploads or bucket, no thumbnail: {cover}")
+            return
+        download = src = os.path.join(image_service.UPLOADS_DIR, f"{uuid.uuid4().hex}.thumbsrc")
+        await run_in_executor("storage", stream_download, cover, download)
+    try:
+        data = await run_in_executor("imaging", make_thumbnail_file, src, settings.THUMBNAIL_WIDTH)
+    finally:
+        if download:
+            await run_in_executor("storage", os.remove, download)
+
+    url = await run_in_executor(
+        "storage", upload_bytes_to_gcs, data, THUMBNAIL_OBJECT.format(blog_id=blog_id),
+        "image/jpeg", PUBLIC_CACHE_CONTROL,
+    )
+    # If the cover changed meanwhile, that edit queued another run, which sees
+    # thumbnail_source != cover and replaces this thumbnail
+    if await run_in_executor("db", set_blog_thumbnail, blog_id, url, cover):
+        await invalidate_public_blogs()
+
+
+# ---------------- site.feeds ----------------
+def build_sitemap(blogs: List[Dict[str, Any]]) -> str:
+    urls = []
+    for b in blogs:
+        lastmod = _utc(b.get("updated_at")) or _utc(b.get("published_at"))
+        entry = f"<url><loc>{escape(blog_url(b['id']))}</loc>"
+        if lastmod:
+            entry += f"<lastmod>{lastmod.date().isoformat()}</lastmod>"
+        urls.append(entry + "</url>")
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+        + "\n".join(urls) + "\n</urlset>\n"
+    )
+
+
+def build_rss(blogs: List[Dict[str, Any]]) -> str:
+    items = []
+    for b in blogs:
+        title = blog_summary_field(b, "title") or (b.get("meta") or {}).get("title", "")
+        link = escape(blog_url(b["id"]))
+        item = (
+            f"<item><title>{escape(title)}</title><link>{link}</link>"
+            f'<guid isPermaLink="true">{link}</guid>'
+            f"<description>{escape(blog_summary_field(b, 'intro_md'))}</description>"
+        )
+        if b.get("owner_name"):
+            item += f"<dc:creator>{escape(b['owner_name'])}</dc:creator>"
+        published = _utc(b.get("published_at"))
+        if published:
+            item += f"<pubDate>{format_datetime(published)}</pubDate>"
+        items.append(item + "</item>")
+    site = escape(site_url() or "/")
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<rss version="2.0" xmlns:dc="http://purl.org/dc/elements/1.1/">\n<channel>\n'
+        f"<title>{escape(settings.SITE_NAME)}</title><link>{site}</link>"
+        f"<description>{escape(settings.SITE_NAME)}</description>\n"
+        + "\n".join(items) + "\n</channel>\n</rss>\n"
+    )
+
+
+@task_handler("site.feeds")
+async def rebuild_feeds(payload: Dict[str, Any]) -> None:
+    blogs = await query_blogs_coalesced(
+        {"status": "published"}, order_by="published_at", order_direction="DESCENDING",
+        skip=0, limit=SITEMAP_MAX_URLS, select=FEED_FIELDS,
+    )
+    for filename, body, content_type in (
+        (SITEMAP_OBJECT, build_sitemap(blogs), "application/xml"),
+        (RSS_OBJECT, build_rss(blogs[:RSS_ITEMS]), "application/rss+xml"),
+    ):
+        await run_in_executor(
+            "storage", upload_bytes_to_gcs, body.encode("utf-8"), filename,
+            f"{content_type}; charset=utf-8", PUBLIC_CACHE_CONTROL,
+        )
+
+
+# ---------------- blog.counters ----------------
+@task_handler("blog.counters")
+async def recount_blogs(payload: Dict[str, Any]) -> None:
+    owner_id = payload["owner_id"]
+    q_owner = {"owner_id": owner_id}
+    total, saved, pending, published = await asyncio.gather(
+        count_blogs_coalesced(q_owner),
+        count_blogs_coalesced({**q_owner, "status": "saved"}),
+        count_blogs_coalesced({**q_owner, "status": "pending"}),
+        count_blogs_coalesced({**q_owner, "status": "published"}),
+    )
+    await run_in_executor("db", save_blog_counts, owner_id, {
+        "total_blogs": total,
+        "saved_blogs": saved,
+        "pending_blogs": pending,
+        "published_blogs": published,
+    })
@@ -0,0 +1,163 @@
+"""
+Blog moderation workflow: a small state machine for blog status transitions.
+
+    saved/rejected --request_publish--> pending --approve--> published
+                                        pending --reject---> saved
+                                      published --draft----> saved
+
+Each transition is applied inside a Firestore transaction (see
+update_blog_transactionally), so the status check and the write can never
+interleave with a concurrent approve/reject/edit. Admin comments are appended
+to admin_review.comments with ArrayUnion instead of rewriting a feedback string.
+
+The *_updates builders are also used by the bulk moderation endpoint.
+"""
+import uuid
+from datetime import datetime
+from typing import Any, Callable, Dict, FrozenSet, Optional, Tuple
+
+from fastapi import HTTPException
+from google.cloud import firestore
+
+from app.models.firestore_db import update_blog_transactionally, BlogNotFoundError
+from core.executors import run_in_executor
+
+DEFAULT_REJECT_FEEDBACK = "Blog rejected. Please review and resubmit."
+
+# action -> (allowed source statuses, target status)
+TRANSITIONS: Dict[str, Tuple[FrozenSet[str], str]] = {
+    "request_publish": (frozenset({"saved", "rejected", "pending"}), "pending"),
+    "approve": (frozenset({"pending"}), "published"),
+    "reject": (frozenset({"pending"}), "saved"),
+    "draft": (frozenset({"published"}), "saved"),
+}
+
+TRANSITION_ERRORS = {
+    "request_publish": "Already published",
+    "approve": "Blog is not pending approval",
+    "reject": "Blog is not pending approval",
+    "draft": "Blog is not published",
+}
+
+
+class InvalidTransition(ValueError):
+    """The blog's current status does not allow the requested transition."""
+
+
+def check_transition(blog: Dict[str, Any], action: str) -> str:
+    """Validate a transition against the blog's current status and return the target status."""
+    sources, target = TRANSITIONS[action]
+    if blog.get("status", "saved") not in sources:
+        raise InvalidTransition(TRANSITION_ERRORS[action])
+    return target
+
+
+def request_publish_updates(blog: Dict[str, Any], user: dict, content: Dict[str, Any], now: datetime) -> Dict[str, Any]:
+    """saved/rejected -> pending, saving the latest content submitted with the request"""
+    if blog.get("owner_id") != user["id"]:
+        raise PermissionError("Not allowed")
+    target = check_transition(blog, "request_publish")
+    return {
+        **content,
+        "status": target,
+        "updated_at": now,
+        "admin_review.requested_at": now,
+        "admin_review.feedback": "",
+    }
+
+
+def approve_updates(blog: Dict[str, Any], admin: dict, now: datetime) -> Dict[str, Any]:
+    """pending -> published"""
+    target = check_transition(blog, "approve")
+    return {
+        "status": target,
+        "updated_at": now,
+        "published_at": now,
+        "admin_review.reviewed_at": now,
+        "admin_review.reviewed_by": admin["id"],
+        "admin_review.reviewed_by_name": admin["name"],
+        "admin_review.feedback": "",
+    }
+
+
+def reject_updates(blog: Dict[str, Any], admin: dict, feedback: str, now: datetime) -> Dict[str, Any]:
+    """pending -> saved, with feedback for the author"""
+    target = check_transition(blog, "reject")
+    return {
+        "status": target,
+        "updated_at": now,
+        "admin_review.reviewed_at": now,
+        "admin_review.reviewed_by": admin["id"],
+        "admin_review.reviewed_by_name": admin["name"],
+        "admin_review.feedback": feedback or DEFAULT_REJECT_FEEDBACK,
+    }
+
+
+def content_updates(blog: Dict[str, Any], user: dict, content: Dict[str, Any]) -> Dict[str, Any]:
+    """Content edit without a status change (owner or admin)"""
+    if blog.get("owner_id") != user["id"] and user["role"] != "admin":
+        raise PermissionError("Not allowed")
+    return dict(content)
+
+
+def draft_updates(blog: Dict[str, Any], user: dict, now: datetime) -> Dict[str, Any]:
+    """published -> saved (owner or admin)"""
+    if blog.get("owner_id") != user["id"] and user["role"] != "admin":
+        raise PermissionError("Not allowed")
+    target = check_transition(blog, "draft")
+    return {
+        "status": target,
+        "updated_at": now,
+    }
+
+
+def comment_updates(blog: Dict[str, Any], admin: dict, comment: str, now: datetime) -> Dict[str, Any]:
+    """
+    Append an admin comment (any status).
+
+    The comment is added to admin_review.comments with ArrayUnion, so the write does
+    not depend on the previous feedback text; admin_review.feedback holds the latest one.
+    A blank comment adds nothing and keeps the previous feedback.
+    """
+    text = comment.strip()
+    updates: Dict[str, Any] = {
+        "updated_at": now,
+    }
+    if text:
+        updates["admin_review.feedback"] = text
+        entry = {
+            "id": uuid.uuid4().hex,
+            "author_id": admin["id"],
+            "author_name": admin.get("name", "Admin"),
+            "text": text,
+            "created_at": now,
+        }
+        updates["admin_review.comments"] = firestore.ArrayUnion([entry])
+
+    # If blog is pending and hasn't been reviewed yet, update reviewed_by info
+    if not (blog.get("admin_review") or {}).get("reviewed_by"):
+        updates["admin_review.reviewed_by"] = admin["id"]
+        updates["admin_review.reviewed_by_name"] = admin["name"]
+    return updates
+
+
+async def run_transition(
+    blog_id: str,
+    build_updates: Callable[[Dict[str, Any]], Dict[str, Any]],
+    revision: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Apply build_updates(blog) to a blog inside a Firestore transaction (on the db pool).
+
+    Builder errors are mapped to HTTP errors: PermissionError -> 403,
+    ValueError/InvalidTransition -> 400; a missing blog is a 404.
+    revision describes the edit in the revision history when content changes.
+    """
+    try:
+        return await run_in_executor("db", update_blog_transactionally, blog_id, build_updates, revision=revision)
+    except BlogNotFoundError:
+        raise HTTPException(status_code=404, detail="Blog not found")
+    except PermissionError as e:
+        raise HTTPException(status_code=403, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -0,0 +1,74 @@
+"""
+Per-session context handles for provider-side prompt prefix caching.
+
+Every wizard step sends the same session context (writer persona, tone, niche,
+keyword, audience, reference links; see prompt_builder.session_context). The
+services send it as a stable prefix, the system instruction/message, with only
+the step-specific text after it, and look up a handle for it here:
+
+- Gemini: a GenerativeModel bound to the context as system_instruction, or to
+  an explicit CachedContent when GEMINI_CONTEXT_CACHE is on and the context is
+  large enough. Created once per session and reused by the later steps.
+- OpenAI: the handle key is sent as prompt_cache_key so all steps of a session
+  hit the same automatic prompt cache.
+
+A session is identified by the hash of its context, so clients do not need to
+pass a session ID. Handles live in a small LRU with a TTL.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+from core.config import settings
+from core.metrics import LLM_CONTEXT_CACHE
+from core.singleflight import make_key
+
+
+class ContextHandle:
+    """A session context plus whatever provider resource was created for it."""
+
+    def __init__(self, key: str, context: str, resource: Any, ttl: int):
+        self.key = key
+        self.context = context
+        self.resource = resource
+        self.expires_at = time.monotonic() + ttl
+
+
+class ContextCache:
+    """Thread-safe LRU of ContextHandles (the services call it from the llm pool)."""
+
+    def __init__(self, provider: str, max_entries: Optional[int] = None, ttl: Optional[int] = None):
+        self.provider = provider
+        self.max_entries = max_entries or settings.PROMPT_CONTEXT_CACHE_SIZE
+        self.ttl = ttl or settings.PROMPT_CONTEXT_TTL_SECONDS
+        self._lock = threading.Lock()
+        self._handles: "OrderedDict[str, ContextHandle]" = OrderedDict()
+
+    def get(self, context: str, create: Callable[[str, str], Any], scope: str = "") -> ContextHandle:
+        """
+        Handle for context (per scope, e.g. model name), calling create(key, context) on a miss.
+
+        create runs outside the lock; two concurrent misses for the same context
+        may both create a resource, and the later one wins.
+        """
+        key = make_key(self.provider, scope, context)
+        now = time.monotonic()
+        with self._lock:
+            handle = self._handles.get(key)
+            if handle is not None and handle.expires_at > now:
+                self._handles.move_to_end(key)
+                LLM_CONTEXT_CACHE.labels(self.provider, "hit").inc()
+                return handle
+
+        LLM_CONTEXT_CACHE.labels(self.provider, "miss").inc()
+        handle = ContextHandle(key, context, create(key, context), self.ttl)
+        with self._lock:
+            self._handles[key] = handle
+            self._handles.move_to_end(key)
+            while len(self._handles) > self.max_entries:
+                self._handles.popitem(last=False)
+        return handle
+
+    def __len__(self) -> int:
+        return len(self._handles)
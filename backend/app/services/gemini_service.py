@@ -1,21 +1,89 @@
-from typing import List
+from datetime import timedelta
+from typing import TYPE_CHECKING, List, Optional
 from textwrap import dedent
+import asyncio
 import logging
 import json
 
-import google.generativeai as genai
 from pydantic import BaseModel, Field, create_model
 
 from core.config import settings
+from core.executors import run_in_executor
+from core.metrics import observe_llm
+from core.singleflight import SingleFlight
 from app.models.schemas import AI_OPTIONS_COUNT
+from app.services.context_cache import ContextCache
+from app.services.prompt_builder import (
+    blog_part_prompts, collect_blog_parts, estimate_tokens, fit_payload, record_prompt, session_context,
+)
 
+if TYPE_CHECKING:
+    import google.generativeai as genai
 
-def _get_model() -> "genai.GenerativeModel":
+# Identical generations already in flight (double clicks, several tabs) share one LLM call
+_inflight = SingleFlight("gemini")
+
+# Session context -> model bound to it, reused by every wizard step of the session
+_contexts = ContextCache("gemini")
+
+
+def _model_name() -> str:
+    return settings.GEMINI_TEXT_MODEL or "gemini-1.5-flash"
+
+
+def _get_model(system_instruction: Optional[str] = None) -> "genai.GenerativeModel":
     if not settings.GEMINI_API_KEY:
         raise RuntimeError("GEMINI_API_KEY is not set.")
+    # Imported on first use: the SDK takes ~0.3 s to import
+    import google.generativeai as genai
+
     genai.configure(api_key=settings.GEMINI_API_KEY)
-    model_name = settings.GEMINI_TEXT_MODEL or "gemini-1.5-flash"
-    return genai.GenerativeModel(model_name)
+    return genai.GenerativeModel(_model_name(), system_instruction=system_instruction)
+
+
+def _create_context_model(key: str, context: str) -> "genai.GenerativeModel":
+    """
+    Model for one session context.
+
+    The context goes in as system_instruction, a stable prefix that Gemini's
+    implicit caching can reuse. With GEMINI_CONTEXT_CACHE on and a large enough
+    context, it is uploaded once as an explicit CachedContent instead.
+    """
+    if settings.GEMINI_CONTEXT_CACHE and estimate_tokens(context) >= settings.GEMINI_CONTEXT_CACHE_MIN_TOKENS:
+        import google.generativeai as genai
+
+        try:
+            _get_model()  # configures the API key
+            cached = genai.caching.CachedContent.create(
+                model=f"models/{_model_name()}",
+                display_name=f"cms-session-{key[:16]}",
+                system_instruction=context,
+                # Outlive the handle so a cached handle never points at an expired cache
+                ttl=timedelta(seconds=settings.PROMPT_CONTEXT_TTL_SECONDS + 300),
+            )
+            return genai.GenerativeModel.from_cached_content(cached)
+        except Exception as e:
+            logging.warning(f"Gemini context caching failed, sending the context inline: {e}")
+    return _get_model(system_instruction=context)
+
+
+def _generate(operation: str, prompt: str, context: Optional[str] = None, **kwargs):
+    """Blocking generate_content call with latency/token/error metrics (runs on the llm pool)."""
+    record_prompt("gemini", operation, context or "", prompt)
+    if context:
+        model = _contexts.get(context, _create_context_model, scope=_model_name()).resource
+    else:
+        model = _get_model()
+    with observe_llm("gemini", _model_name(), operation) as call:
+        resp = model.generate_content(prompt, **kwargs)
+        usage = getattr(resp, "usage_metadata", None)
+        if usage is not None:
+            call.usage(
+                getattr(usage, "prompt_token_count", 0),
+                getattr(usage, "candidates_token_count", 0),
+                getattr(usage, "cached_content_token_count", 0),
+            )
+    return resp
 
 # ---------- schemas for structured outputs ----------
 class _StringOptions(BaseModel):
@@ -27,20 +95,9 @@ def _string_options_schema(count: int) -> type[BaseModel]:
         options=(List[str], Field(min_length=count, max_length=count)),
     )
 
-def _sys(tone: str, creativity: str) -> str:
-    return (
-        "You are a senior blog writer.\n"
-        "Language must be English.\n"
-        f"Tone: {tone}\n"
-        f"Creativity: {creativity}\n"
-        "Return ONLY valid JSON according to the schema.\n"
-    )
-
-
-def _call_json_model(prompt: str) -> dict:
+def _call_json_model(prompt: str, operation: str = "json", context: Optional[str] = None) -> dict:
     """Call Gemini and parse JSON response from text."""
-    model = _get_model()
-    resp = model.generate_content(prompt)
+    resp = _generate(operation, prompt, context)
     text = (resp.text or "").strip()
     try:
         return json.loads(text)
@@ -49,42 +106,39 @@ def _call_json_model(prompt: str) -> dict:
         raise
 
 
+@_inflight.coalesce("topic_ideas")
 async def gen_topic_ideas(payload: dict) -> List[str]:
+    context = session_context(payload)
+    payload = fit_payload(payload, _model_name(), "topic_ideas")
     prompt = dedent(f"""
-    {_sys(payload['tone'], payload['creativity'])}
-    Focus/Niche: {payload['focus_or_niche']}
-    Targeted keyword: {payload.get('targeted_keyword','')}
-    Targeted audience: {payload.get('targeted_audience','')}
-    Reference links: {payload.get('reference_links','')}
-
     Generate exactly {AI_OPTIONS_COUNT} blog topic ideas.
     Each idea must be a single sentence, clear and specific.
 
+    Return ONLY valid JSON.
     Return a JSON object: {{"options": [ ... ]}} with exactly {AI_OPTIONS_COUNT} strings.
     """).lstrip("\n")
 
-    data = _call_json_model(prompt)
+    data = await run_in_executor("llm", _call_json_model, prompt, "topic_ideas", context)
     options = data.get("options") or []
     if not isinstance(options, list):
         raise ValueError("Gemini topic ideas response missing 'options' list")
     return [str(o) for o in options][:AI_OPTIONS_COUNT]
 
+@_inflight.coalesce("titles")
 async def gen_titles(payload: dict) -> List[str]:
     try:
+        context = session_context(payload)
         prompt = dedent(f"""
-        {_sys(payload['tone'], payload['creativity'])}
-        Focus/Niche: {payload['focus_or_niche']}
-        Keyword: {payload.get('targeted_keyword','')}
-        Audience: {payload.get('targeted_audience','')}
         Selected idea: {payload['selected_idea']}
 
         Generate exactly {AI_OPTIONS_COUNT} SEO-friendly blog titles.
         No quotes, no emojis.
 
+        Return ONLY valid JSON.
         Return a JSON object: {{"options": [ ... ]}} with exactly {AI_OPTIONS_COUNT} strings.
         """).lstrip("\n")
 
-        data = _call_json_model(prompt)
+        data = await run_in_executor("llm", _call_json_model, prompt, "titles", context)
         options = data.get("options") or []
         if not isinstance(options, list):
             raise ValueError("Gemini titles response missing 'options' list")
@@ -93,23 +147,22 @@ async def gen_titles(payload: dict) -> List[str]:
         logging.error(f"Error generating titles: {e}")
         raise
 
+@_inflight.coalesce("intros")
 async def gen_intros(payload: dict) -> List[str]:
     try:
+        context = session_context(payload)
         prompt = dedent(f"""
-        {_sys(payload['tone'], payload['creativity'])}
-        Focus/Niche: {payload['focus_or_niche']}
-        Keyword: {payload.get('targeted_keyword','')}
-        Audience: {payload.get('targeted_audience','')}
         Selected idea: {payload['selected_idea']}
         Title: {payload['title']}
 
         Generate exactly {AI_OPTIONS_COUNT} intro paragraphs in Markdown.
         Each intro: 80-140 words.
 
+        Return ONLY valid JSON.
         Return a JSON object: {{"options": [ ... ]}} with exactly {AI_OPTIONS_COUNT} strings.
         """).lstrip("\n")
 
-        data = _call_json_model(prompt)
+        data = await run_in_executor("llm", _call_json_model, prompt, "intros", context)
         options = data.get("options") or []
         if not isinstance(options, list):
             raise ValueError("Gemini intros response missing 'options' list")
@@ -124,13 +177,12 @@ class _OutlineVariant(BaseModel):
 class _OutlineOptions(BaseModel):
     options: List[_OutlineVariant] = Field(min_length=AI_OPTIONS_COUNT, max_length=AI_OPTIONS_COUNT)
 
+@_inflight.coalesce("outlines")
 async def gen_outlines(payload: dict):
     try:
+        context = session_context(payload)
+        payload = fit_payload(payload, _model_name(), "outlines")
         prompt = dedent(f"""
-        {_sys(payload['tone'], payload['creativity'])}
-        Focus/Niche: {payload['focus_or_niche']}
-        Keyword: {payload.get('targeted_keyword','')}
-        Audience: {payload.get('targeted_audience','')}
         Selected idea: {payload['selected_idea']}
         Title: {payload['title']}
         Intro: {payload['intro_md']}
@@ -139,10 +191,11 @@ async def gen_outlines(payload: dict):
         Each outline should be 6-10 headings.
         Headings must be short and not numbered.
 
+        Return ONLY valid JSON.
         Return a JSON object: {{"options": [{{"outline": [..] }}, ...]}}.
         """).lstrip("\n")
 
-        data = _call_json_model(prompt)
+        data = await run_in_executor("llm", _call_json_model, prompt, "outlines", context)
         options = data.get("options") or []
         if not isinstance(options, list):
             raise ValueError("Gemini outlines response missing 'options' list")
@@ -157,22 +210,22 @@ async def gen_outlines(payload: dict):
         logging.error(f"Error generating outlines: {e}")
         raise
 
+@_inflight.coalesce("image_prompts")
 async def gen_image_prompts(payload: dict) -> List[str]:
     try:
+        context = session_context(payload)
         prompt = dedent(f"""
-        {_sys(payload['tone'], payload['creativity'])}
-        Focus/Niche: {payload['focus_or_niche']}
-        Keyword: {payload.get('targeted_keyword','')}
         Selected idea: {payload['selected_idea']}
         Title: {payload['title']}
 
         Generate exactly {AI_OPTIONS_COUNT} blog cover image prompts.
         Avoid text/logos/watermarks.
 
+        Return ONLY valid JSON.
         Return a JSON object: {{"options": [ ... ]}} with exactly {AI_OPTIONS_COUNT} strings.
         """).lstrip("\n")
 
-        data = _call_json_model(prompt)
+        data = await run_in_executor("llm", _call_json_model, prompt, "image_prompts", context)
         options = data.get("options") or []
         if not isinstance(options, list):
             raise ValueError("Gemini image prompts response missing 'options' list")
@@ -182,15 +235,11 @@ async def gen_image_prompts(payload: dict) -> List[str]:
         raise
 
 # Final blog generation returns ONE markdown (not 5)
+@_inflight.coalesce("final_blog")
 async def gen_final_blog_markdown(payload: dict) -> str:
-    refs = payload.get("reference_links", "")
+    context = session_context(payload)
+    payload = fit_payload(payload, _model_name(), "final_blog")
     prompt = dedent(f"""
-    {_sys(payload['tone'], payload['creativity'])}
-    Focus/Niche: {payload['focus_or_niche']}
-    Keyword: {payload.get('targeted_keyword','')}
-    Audience: {payload.get('targeted_audience','')}
-    Reference links: {refs}
-
     Selected idea: {payload['selected_idea']}
     Title: {payload['title']}
     Intro (markdown): {payload['intro_md']}
@@ -207,9 +256,37 @@ async def gen_final_blog_markdown(payload: dict) -> str:
         Return ONLY the Markdown text.
         """).lstrip("\n")
 
-    model = _get_model()
-    resp = model.generate_content(
+    resp = await run_in_executor(
+        "llm",
+        _generate,
+        "final_blog",
         prompt,
+        context,
         generation_config={"temperature": 0.7},
     )
     return (resp.text or "").strip()
+
+
+# Section-parallel generation: intro, each outline section and the conclusion
+# are written concurrently and stitched together in outline order
+@_inflight.coalesce("blog_sections")
+async def gen_blog_sections(payload: dict) -> dict:
+    context = session_context(payload)
+    fitted = fit_payload(payload, _model_name(), "blog_sections")
+    parts = blog_part_prompts(payload, fitted)
+    limit = asyncio.Semaphore(max(1, settings.BLOG_SECTION_CONCURRENCY))
+
+    async def write(kind: str, prompt: str) -> str:
+        async with limit:
+            resp = await run_in_executor(
+                "llm",
+                _generate,
+                f"blog_{kind}",
+                prompt,
+                context,
+                generation_config={"temperature": 0.7},
+            )
+        return resp.text or ""
+
+    texts = await asyncio.gather(*(write(kind, prompt) for kind, _, prompt in parts))
+    return collect_blog_parts(payload, parts, texts)
@@ -1,18 +1,26 @@
 import base64
 import logging
 import os
+import time
 import uuid
 from io import BytesIO
 from textwrap import dedent
-
-import requests
-from PIL import Image
-from google import genai
-from google.genai import types
-from openai import OpenAI
-from google.cloud import storage
+from typing import TYPE_CHECKING
 
 from core.config import settings
+from core.executors import run_in_executor
+from core.http import get_http_client, stream_download
+from core.metrics import IMAGE_GENERATION_DURATION
+from core.singleflight import SingleFlight
+
+if TYPE_CHECKING:
+    from PIL import Image
+    from google import genai
+    from google.cloud import storage
+    from openai import OpenAI
+
+# The provider SDKs, GCS and Pillow are imported on first use: together they
+# account for most of the API's import time
 
 logger = logging.getLogger(__name__)
 
@@ -22,6 +30,7 @@ UPLOADS_DIR = os.path.join(BASE_DIR, "uploads")
 os.makedirs(UPLOADS_DIR, exist_ok=True)
 
 _client = None
+_openai_client = None
 _storage_client = None
 
 def _normalize_model(name: str) -> str:
@@ -29,21 +38,35 @@ def _normalize_model(name: str) -> str:
         return name
     return name if name.startswith("models/") else f"models/{name}"
 
-def _get_client() -> genai.Client:
+def _get_client() -> "genai.Client":
     global _client
     if not settings.GEMINI_API_KEY:
         raise RuntimeError("GEMINI_API_KEY is not set.")
     if _client is None:
+        from google import genai
+        from google.genai import types
+
         try:
-            _client = genai.Client(api_key=settings.GEMINI_API_KEY)
+            # Reuse the shared pooled HTTP client when this google-genai version supports it
+            http_options = None
+            if "httpx_client" in types.HttpOptions.model_fields:
+                http_options = types.HttpOptions(httpx_client=get_http_client())
+            _client = genai.Client(api_key=settings.GEMINI_API_KEY, http_options=http_options)
         except Exception as e:
             logger.warning(f"Failed to initialize Gemini client: {e}")
             raise
     return _client
 
-openai_client = OpenAI(api_key=settings.OPENAI_API_KEY) if settings.OPENAI_API_KEY else None
+def _get_openai_client() -> "OpenAI | None":
+    """OpenAI client for the DALL-E fallback (None without OPENAI_API_KEY)."""
+    global _openai_client
+    if _openai_client is None and settings.OPENAI_API_KEY:
+        from openai import OpenAI
+
+        _openai_client = OpenAI(api_key=settings.OPENAI_API_KEY, http_client=get_http_client())
+    return _openai_client
 
-def _get_storage_client() -> storage.Client:
+def _get_storage_client() -> "storage.Client":
     """
     Get Google Cloud Storage client.
     Uses GOOGLE_APPLICATION_CREDENTIALS for GCS bucket access.
@@ -51,6 +74,7 @@ def _get_storage_client() -> storage.Client:
     """
     global _storage_client
     if _storage_client is None:
+        from google.cloud import storage
         from google.oauth2 import service_account
         
         # Use GOOGLE_APPLICATION_CREDENTIALS for GCS bucket (separate from Firestore credentials)
@@ -101,14 +125,29 @@ def _content_type_from_ext(ext: str) -> str:
         return "image/bmp"
     return "application/octet-stream"
 
-def upload_bytes_to_gcs(data: bytes, filename: str, content_type: str | None = None) -> str:
+def upload_bytes_to_gcs(
+    data: bytes, filename: str, content_type: str | None = None, cache_control: str | None = None
+) -> str:
     bucket_name = _require_bucket()
     bucket = _get_storage_client().bucket(bucket_name)
     object_name = _gcs_object_name(filename)
     blob = bucket.blob(object_name)
+    if cache_control:
+        blob.cache_control = cache_control
     blob.upload_from_string(data, content_type=content_type or "application/octet-stream")
     return _gcs_public_url(object_name)
 
+def delete_from_gcs(filename: str) -> bool:
+    """Delete an object uploaded with upload_bytes_to_gcs; False if it did not exist."""
+    from google.api_core.exceptions import NotFound
+
+    bucket = _get_storage_client().bucket(_require_bucket())
+    try:
+        bucket.blob(_gcs_object_name(filename)).delete()
+    except NotFound:
+        return False
+    return True
+
 _BASE64_CHARS = set(b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/=\n\r")
 
 def _detect_image_kind(data: bytes) -> str | None:
@@ -178,10 +217,72 @@ def _prepare_image(data: bytes, mime_type: str | None) -> tuple[bytes, str]:
     ext = _extension_from_bytes(normalized, mime_type)
     return normalized, ext
 
-import asyncio
+_PIL_FORMATS = {"png": "PNG", "jpeg": "JPEG", "webp": "WEBP"}
+
+def _target_format() -> str | None:
+    """IMAGE_OUTPUT_FORMAT as a detected image kind, or None to keep the provider's encoding."""
+    fmt = (settings.IMAGE_OUTPUT_FORMAT or "").lower().replace("jpg", "jpeg")
+    return fmt if fmt in _PIL_FORMATS else None
+
+def _save_as(img: "Image.Image", target, fmt: str) -> None:
+    if fmt == "jpeg" and img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+    img.save(target, format=_PIL_FORMATS[fmt])
+
+def _transcode(data: bytes, fmt: str) -> bytes:
+    """Decode an image and re-encode it as fmt (CPU-bound, runs in the imaging process pool)."""
+    from PIL import Image
+
+    with Image.open(BytesIO(data)) as img:
+        out = BytesIO()
+        _save_as(img, out, fmt)
+        return out.getvalue()
+
+def _transcode_file(src: str, dst: str, fmt: str) -> None:
+    """Like _transcode, file to file, so only paths cross into the process pool."""
+    from PIL import Image
+
+    with Image.open(src) as img:
+        _save_as(img, dst, fmt)
+    os.remove(src)
+
+def make_thumbnail_file(src: str, width: int) -> bytes:
+    """JPEG thumbnail of an image file, at most width pixels wide (runs in the imaging process pool)."""
+    from PIL import Image
+
+    with Image.open(src) as img:
+        img.thumbnail((width, width * 4))
+        out = BytesIO()
+        _save_as(img, out, "jpeg")
+        return out.getvalue()
+
+def _sniff_file(path: str) -> str | None:
+    """Image kind of a file from its first bytes."""
+    with open(path, "rb") as f:
+        return _detect_image_kind(f.read(16))
 
+def _ext_for_kind(kind: str) -> str:
+    return "jpg" if kind == "jpeg" else kind
 
-async def generate_cover_image(payload: dict) -> dict:
+def _write_upload(data: bytes, filename: str) -> str:
+    path = os.path.join(UPLOADS_DIR, filename)
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
+
+
+# Identical image requests already in flight share one generation
+_inflight = SingleFlight("cover_image")
+
+
+@_inflight.coalesce("generate")
+async def generate_cover_image(payload: dict, owner_id: str) -> dict:
+    """
+    Generate a cover image for payload and store it.
+
+    owner_id is part of the coalescing key: identical prompts from different
+    users run separately, so each user gets a file of their own.
+    """
     os.makedirs("uploads", exist_ok=True)
 
     final_prompt = dedent(f"""
@@ -200,17 +301,25 @@ async def generate_cover_image(payload: dict) -> dict:
     No watermark, no logos, no text.
     """).lstrip("\n")
 
-   
-    
-    def run_sync_generation():
+    image_id = uuid.uuid4().hex
+    download_path = os.path.join(UPLOADS_DIR, f"{image_id}.download")
+
+    def run_sync_generation() -> tuple[bytes | None, str | None, str]:
+        """
+        Call the image model(s); returns (image bytes, mime type, model name).
+
+        The OpenAI fallback streams its download straight to download_path and
+        returns None instead of bytes.
+        """
         try:
             client = _get_client()
+            from google.genai import types
+
             cfg = types.GenerateContentConfig(
                 response_modalities=["Image"],
                 image_config=types.ImageConfig(aspect_ratio=payload["aspect_ratio"]),
             )
 
-            
             resp = client.models.generate_content(
                 model=settings.GEMINI_IMAGE_MODEL,
                 contents=[final_prompt],
@@ -219,21 +328,7 @@ async def generate_cover_image(payload: dict) -> dict:
 
             for part in resp.parts:
                 if part.inline_data is not None:
-                    img: Image.Image = part.as_image()
-                    filename = f"{uuid.uuid4().hex}.png"
-                    path = os.path.join(UPLOADS_DIR, filename)
-                    img.save(path)
-
-                    return {
-                        "image_url": f"{settings.PUBLIC_BASE_URL}/uploads/{filename}",
-                        "meta": {
-                            "aspect_ratio": payload["aspect_ratio"],
-                            "quality": payload["quality"],
-                            "primary_color": payload["primary_color"],
-                            "model": settings.GEMINI_IMAGE_MODEL,
-                            "prompt": payload["prompt"],
-                        },
-                    }
+                    return part.inline_data.data, part.inline_data.mime_type, settings.GEMINI_IMAGE_MODEL
 
             raise RuntimeError("Image model did not return an image in the response parts.")
         
@@ -241,6 +336,7 @@ async def generate_cover_image(payload: dict) -> dict:
             logger.warning(f"Gemini image generation failed: {e}. Falling back to OpenAI DALL-E.")
             
             # Fallback to OpenAI DALL-E
+            openai_client = _get_openai_client()
             if openai_client is None:
                 raise RuntimeError(f"Gemini error: {e}. OpenAI API key not configured.")
             
@@ -265,26 +361,54 @@ async def generate_cover_image(payload: dict) -> dict:
                 image_url = response.data[0].url
                 
                 
-                img_response = requests.get(image_url, stream=True, timeout=30)
-                img_response.raise_for_status()
-                
-                img = Image.open(BytesIO(img_response.content))
-                filename = f"{uuid.uuid4().hex}.png"
-                path = os.path.join(UPLOADS_DIR, filename)
-                img.save(path)
-                
-                return {
-                    "image_url": f"{settings.PUBLIC_BASE_URL}/uploads/{filename}",
-                    "meta": {
-                        "aspect_ratio": payload["aspect_ratio"],
-                        "quality": payload["quality"],
-                        "primary_color": payload["primary_color"],
-                        "model": settings.OPENAI_IMAGE_MODEL,
-                        "prompt": payload["prompt"],
-                    },
-                }
+                stream_download(image_url, download_path)
+                return None, None, settings.OPENAI_IMAGE_MODEL
             except Exception as openai_error:
                 raise RuntimeError(f"Gemini error: {e}. OpenAI error: {str(openai_error)}")
 
-   
-    return await asyncio.to_thread(run_sync_generation)
\ No newline at end of file
+    # Provider call on the llm pool, file work on the storage pool. The provider's
+    # encoded bytes are stored as they are; Pillow (imaging process pool) only
+    # runs when IMAGE_OUTPUT_FORMAT asks for a different format.
+    target = _target_format()
+    start = time.perf_counter()
+    try:
+        data, mime_type, model = await run_in_executor("llm", run_sync_generation)
+        if data is None:
+            kind = await run_in_executor("storage", _sniff_file, download_path)
+            ext = _ext_for_kind(kind) if kind else ""
+        else:
+            data, ext = _prepare_image(data, mime_type)
+            kind = _detect_image_kind(data)
+        if kind is None:
+            if data is None:
+                await run_in_executor("storage", os.remove, download_path)
+            raise RuntimeError("Image model did not return a supported image (png, jpeg, gif, webp or bmp).")
+
+        if target and kind != target:
+            ext = _ext_for_kind(target)
+        filename = f"{image_id}.{ext}"
+        if data is None:
+            if target and kind != target:
+                await run_in_executor("imaging", _transcode_file, download_path, os.path.join(UPLOADS_DIR, filename), target)
+            else:
+                await run_in_executor("storage", os.replace, download_path, os.path.join(UPLOADS_DIR, filename))
+        else:
+            if target and kind != target:
+                data = await run_in_executor("imaging", _transcode, data, target)
+            await run_in_executor("storage", _write_upload, data, filename)
+    except Exception:
+        IMAGE_GENERATION_DURATION.labels("unknown", "error").observe(time.perf_counter() - start)
+        raise
+    provider = "gemini" if model == settings.GEMINI_IMAGE_MODEL else "openai"
+    IMAGE_GENERATION_DURATION.labels(provider, "ok").observe(time.perf_counter() - start)
+
+    return {
+        "image_url": f"{settings.PUBLIC_BASE_URL}/uploads/{filename}",
+        "meta": {
+            "aspect_ratio": payload["aspect_ratio"],
+            "quality": payload["quality"],
+            "primary_color": payload["primary_color"],
+            "model": model,
+            "prompt": payload["prompt"],
+        },
+    }
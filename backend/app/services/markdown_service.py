@@ -1,7 +1,5 @@
 import re
 
-import markdown as md
-
 _IMAGE_BRACKETED_RE = re.compile(
     r"\[\!\[([^\]]*)\]\(([^)\s]+(?:\s+\"[^\"]*\")?)\)\](?!\s*\()"
 )
@@ -18,6 +16,8 @@ def normalize_markdown(markdown_text: str) -> str:
     return text
 
 def markdown_to_html(markdown_text: str) -> str:
+    import markdown as md
+
     # production-friendly: basic extensions
     markdown_text = normalize_markdown(markdown_text)
     return md.markdown(
@@ -25,3 +25,21 @@ def markdown_to_html(markdown_text: str) -> str:
         extensions=["extra", "tables", "fenced_code", "sane_lists"],
         output_format="html5",
     )
+
+def render_to_markdown(render) -> str:
+    """Markdown for a structured BlogRender (used by section-parallel generation)."""
+    parts = [f"# {render.title}"]
+    if render.cover_image_url:
+        parts.append(f"![Cover]({render.cover_image_url})")
+    if render.intro_md:
+        parts.append(render.intro_md.strip())
+    for section in render.sections:
+        body = section.body_md.strip()
+        if section.bullets:
+            body = "\n".join([body, ""] + [f"- {b}" for b in section.bullets]).strip()
+        parts.append(f"## {section.heading}\n\n{body}")
+    if render.conclusion_md:
+        parts.append(f"## Conclusion\n\n{render.conclusion_md.strip()}")
+    if render.references:
+        parts.append("## References\n\n" + "\n".join(f"- [{r}]({r})" for r in render.references))
+    return "\n\n".join(parts) + "\n"
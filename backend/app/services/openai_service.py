@@ -1,12 +1,26 @@
-from typing import List
+from typing import List, Optional
 from textwrap import dedent
+import asyncio
 import json
 
-from openai import OpenAI
 from pydantic import BaseModel, Field
 
 from core.config import settings
+from core.executors import run_in_executor
+from core.http import get_http_client
+from core.metrics import observe_llm
+from core.singleflight import SingleFlight
 from app.models.schemas import AI_OPTIONS_COUNT
+from app.services.context_cache import ContextCache
+from app.services.prompt_builder import (
+    blog_part_prompts, collect_blog_parts, fit_payload, record_prompt, session_context,
+)
+
+# Identical generations already in flight (double clicks, several tabs) share one LLM call
+_inflight = SingleFlight("openai")
+
+# Session context handles; their key routes every wizard step of a session to the same prompt cache
+_contexts = ContextCache("openai")
 
 # Initialize client lazily to avoid import errors if API key is missing
 _client = None
@@ -16,40 +30,59 @@ def _get_client():
     if _client is None:
         if not settings.OPENAI_API_KEY:
             raise RuntimeError("OPENAI_API_KEY is not set.")
-        _client = OpenAI(api_key=settings.OPENAI_API_KEY)
+        # Imported on first use: the SDK takes ~0.3 s to import
+        from openai import OpenAI
+
+        _client = OpenAI(api_key=settings.OPENAI_API_KEY, http_client=get_http_client())
     return _client
 
+
+def _create_completion(operation: str, context: Optional[str] = None, **kwargs):
+    """
+    Blocking chat completion call with latency/token/error metrics (runs on the llm pool).
+
+    With a session context, it becomes the system message (the stable prompt
+    prefix) and the session's handle key is sent as prompt_cache_key.
+    """
+    client = _get_client()
+    if context:
+        handle = _contexts.get(context, lambda key, text: None, scope=kwargs.get("model") or "")
+        kwargs["messages"] = [{"role": "system", "content": context}] + list(kwargs.get("messages", []))
+        kwargs["prompt_cache_key"] = handle.key
+    record_prompt("openai", operation, *(m.get("content") or "" for m in kwargs.get("messages", [])))
+    with observe_llm("openai", kwargs.get("model") or "", operation) as call:
+        response = client.chat.completions.create(**kwargs)
+        if response.usage is not None:
+            details = getattr(response.usage, "prompt_tokens_details", None)
+            call.usage(
+                response.usage.prompt_tokens,
+                response.usage.completion_tokens,
+                getattr(details, "cached_tokens", 0) or 0,
+            )
+    return response
+
 # ---------- schemas for structured outputs ----------
 class _StringOptions(BaseModel):
     options: List[str] = Field(min_length=AI_OPTIONS_COUNT, max_length=AI_OPTIONS_COUNT)
 
-def _sys(tone: str, creativity: str) -> str:
-    return (
-        "You are a senior blog writer.\n"
-        "Language must be English.\n"
-        f"Tone: {tone}\n"
-        f"Creativity: {creativity}\n"
-        "Return ONLY valid JSON according to the schema.\n"
-    )
-
+@_inflight.coalesce("topic_ideas")
 async def gen_topic_ideas(payload: dict) -> List[str]:
+    context = session_context(payload)
+    payload = fit_payload(payload, settings.OPENAI_TEXT_MODEL, "topic_ideas")
     prompt = dedent(f"""
-    {_sys(payload['tone'], payload['creativity'])}
-    Focus/Niche: {payload['focus_or_niche']}
-    Targeted keyword: {payload.get('targeted_keyword','')}
-    Targeted audience: {payload.get('targeted_audience','')}
-    Reference links: {payload.get('reference_links','')}
-
     Generate exactly {AI_OPTIONS_COUNT} blog topic ideas.
     Each idea must be a single sentence, clear and specific.
+    Return ONLY valid JSON.
     Return a JSON object with an "options" array containing exactly {AI_OPTIONS_COUNT} strings.
     """).lstrip("\n")
 
-    client = _get_client()
-    response = client.chat.completions.create(
+    response = await run_in_executor(
+        "llm",
+        _create_completion,
+        "topic_ideas",
+        context,
         model=settings.OPENAI_TEXT_MODEL,
         messages=[
-            {"role": "system", "content": "You are a helpful assistant that returns only valid JSON."},
             {"role": "user", "content": prompt}
         ],
         response_format={"type": "json_object"},
@@ -59,24 +92,25 @@ async def gen_topic_ideas(payload: dict) -> List[str]:
     result = json.loads(response.choices[0].message.content)
     return result.get("options", [])
 
+@_inflight.coalesce("titles")
 async def gen_titles(payload: dict) -> List[str]:
+    context = session_context(payload)
     prompt = dedent(f"""
-    {_sys(payload['tone'], payload['creativity'])}
-    Focus/Niche: {payload['focus_or_niche']}
-    Keyword: {payload.get('targeted_keyword','')}
-    Audience: {payload.get('targeted_audience','')}
     Selected idea: {payload['selected_idea']}
 
     Generate exactly {AI_OPTIONS_COUNT} SEO-friendly blog titles.
     No quotes, no emojis.
+    Return ONLY valid JSON.
     Return a JSON object with an "options" array containing exactly {AI_OPTIONS_COUNT} strings.
     """).lstrip("\n")
 
-    client = _get_client()
-    response = client.chat.completions.create(
+    response = await run_in_executor(
+        "llm",
+        _create_completion,
+        "titles",
+        context,
         model=settings.OPENAI_TEXT_MODEL,
         messages=[
-            {"role": "system", "content": "You are a helpful assistant that returns only valid JSON."},
             {"role": "user", "content": prompt}
         ],
         response_format={"type": "json_object"},
@@ -86,25 +120,26 @@ async def gen_titles(payload: dict) -> List[str]:
     result = json.loads(response.choices[0].message.content)
     return result.get("options", [])
 
+@_inflight.coalesce("intros")
 async def gen_intros(payload: dict) -> List[str]:
+    context = session_context(payload)
     prompt = dedent(f"""
-    {_sys(payload['tone'], payload['creativity'])}
-    Focus/Niche: {payload['focus_or_niche']}
-    Keyword: {payload.get('targeted_keyword','')}
-    Audience: {payload.get('targeted_audience','')}
     Selected idea: {payload['selected_idea']}
     Title: {payload['title']}
 
     Generate exactly {AI_OPTIONS_COUNT} intro paragraphs in Markdown.
     Each intro: 80-140 words.
+    Return ONLY valid JSON.
     Return a JSON object with an "options" array containing exactly {AI_OPTIONS_COUNT} strings.
     """).lstrip("\n")
 
-    client = _get_client()
-    response = client.chat.completions.create(
+    response = await run_in_executor(
+        "llm",
+        _create_completion,
+        "intros",
+        context,
         model=settings.OPENAI_TEXT_MODEL,
         messages=[
-            {"role": "system", "content": "You are a helpful assistant that returns only valid JSON."},
             {"role": "user", "content": prompt}
         ],
         response_format={"type": "json_object"},
@@ -120,12 +155,11 @@ class _OutlineVariant(BaseModel):
 class _OutlineOptions(BaseModel):
     options: List[_OutlineVariant] = Field(min_length=AI_OPTIONS_COUNT, max_length=AI_OPTIONS_COUNT)
 
+@_inflight.coalesce("outlines")
 async def gen_outlines(payload: dict):
+    context = session_context(payload)
+    payload = fit_payload(payload, settings.OPENAI_TEXT_MODEL, "outlines")
     prompt = dedent(f"""
-    {_sys(payload['tone'], payload['creativity'])}
-    Focus/Niche: {payload['focus_or_niche']}
-    Keyword: {payload.get('targeted_keyword','')}
-    Audience: {payload.get('targeted_audience','')}
     Selected idea: {payload['selected_idea']}
     Title: {payload['title']}
     Intro: {payload['intro_md']}
@@ -133,15 +167,18 @@ async def gen_outlines(payload: dict):
     Generate exactly {AI_OPTIONS_COUNT} outline variants.
     Each outline should be 6-10 headings.
     Headings must be short and not numbered.
+    Return ONLY valid JSON.
     Return a JSON object with an "options" array containing exactly {AI_OPTIONS_COUNT} objects.
     Each object should have an "outline" array with 6-12 string headings.
     """).lstrip("\n")
 
-    client = _get_client()
-    response = client.chat.completions.create(
+    response = await run_in_executor(
+        "llm",
+        _create_completion,
+        "outlines",
+        context,
         model=settings.OPENAI_TEXT_MODEL,
         messages=[
-            {"role": "system", "content": "You are a helpful assistant that returns only valid JSON."},
             {"role": "user", "content": prompt}
         ],
         response_format={"type": "json_object"},
@@ -151,24 +188,26 @@ async def gen_outlines(payload: dict):
     result = json.loads(response.choices[0].message.content)
     return result.get("options", [])
 
+@_inflight.coalesce("image_prompts")
 async def gen_image_prompts(payload: dict) -> List[str]:
+    context = session_context(payload)
     prompt = dedent(f"""
-    {_sys(payload['tone'], payload['creativity'])}
-    Focus/Niche: {payload['focus_or_niche']}
-    Keyword: {payload.get('targeted_keyword','')}
     Selected idea: {payload['selected_idea']}
     Title: {payload['title']}
 
     Generate exactly {AI_OPTIONS_COUNT} blog cover image prompts.
     Avoid text/logos/watermarks.
+    Return ONLY valid JSON.
     Return a JSON object with an "options" array containing exactly {AI_OPTIONS_COUNT} strings.
     """).lstrip("\n")
 
-    client = _get_client()
-    response = client.chat.completions.create(
+    response = await run_in_executor(
+        "llm",
+        _create_completion,
+        "image_prompts",
+        context,
         model=settings.OPENAI_TEXT_MODEL,
         messages=[
-            {"role": "system", "content": "You are a helpful assistant that returns only valid JSON."},
             {"role": "user", "content": prompt}
         ],
         response_format={"type": "json_object"},
@@ -179,15 +218,11 @@ async def gen_image_prompts(payload: dict) -> List[str]:
     return result.get("options", [])
 
 # Final blog generation returns ONE markdown (not 5)
+@_inflight.coalesce("final_blog")
 async def gen_final_blog_markdown(payload: dict) -> str:
-    refs = payload.get("reference_links", "")
+    context = session_context(payload)
+    payload = fit_payload(payload, settings.OPENAI_TEXT_MODEL, "final_blog")
     prompt = dedent(f"""
-    {_sys(payload['tone'], payload['creativity'])}
-    Focus/Niche: {payload['focus_or_niche']}
-    Keyword: {payload.get('targeted_keyword','')}
-    Audience: {payload.get('targeted_audience','')}
-    Reference links: {refs}
-
     Selected idea: {payload['selected_idea']}
     Title: {payload['title']}
     Intro (markdown): {payload['intro_md']}
@@ -204,14 +239,44 @@ async def gen_final_blog_markdown(payload: dict) -> str:
     Return ONLY the Markdown text.
     """).lstrip("\n")
 
-    client = _get_client()
-    response = client.chat.completions.create(
+    response = await run_in_executor(
+        "llm",
+        _create_completion,
+        "final_blog",
+        context,
         model=settings.OPENAI_TEXT_MODEL,
         messages=[
-            {"role": "system", "content": "You are a senior blog writer. Return only the Markdown text, no additional commentary."},
             {"role": "user", "content": prompt}
         ],
         temperature=0.7,
     )
     
     return (response.choices[0].message.content or "").strip()
+
+
+# Section-parallel generation: intro, each outline section and the conclusion
+# are written concurrently and stitched together in outline order
+@_inflight.coalesce("blog_sections")
+async def gen_blog_sections(payload: dict) -> dict:
+    context = session_context(payload)
+    fitted = fit_payload(payload, settings.OPENAI_TEXT_MODEL, "blog_sections")
+    parts = blog_part_prompts(payload, fitted)
+    limit = asyncio.Semaphore(max(1, settings.BLOG_SECTION_CONCURRENCY))
+
+    async def write(kind: str, prompt: str) -> str:
+        async with limit:
+            response = await run_in_executor(
+                "llm",
+                _create_completion,
+                f"blog_{kind}",
+                context,
+                model=settings.OPENAI_TEXT_MODEL,
+                messages=[
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=0.7,
+            )
+        return response.choices[0].message.content or ""
+
+    texts = await asyncio.gather(*(write(kind, prompt) for kind, _, prompt in parts))
+    return collect_blog_parts(payload, parts, texts)
@@ -0,0 +1,276 @@
+"""
+Token-budget-aware prompt assembly for the AI wizard.
+
+Prompts are laid out prefix-first: session_context() holds everything known
+from wizard step 1 (persona, tone, niche, keyword, audience, reference links)
+and is sent unchanged by every step as the system instruction/message, so
+provider prefix caches can reuse it (see context_cache). Step-specific fields
+and instructions follow it.
+
+Most wizard fields are short, but reference_links, intro_md and the outline are
+free-form. Reference links are compacted in the session context once they pass
+CONTEXT_REFERENCE_TOKENS (de-duplicated, query strings/fragments dropped, only
+the first links kept with a "(+N more)" note). fit_payload() returns a copy of
+the payload whose intro_md (cut at a sentence boundary) and outline (headings
+cut to MAX_HEADING_CHARS, then trailing headings dropped) fit the model's
+prompt budget. Payloads that already fit are returned unchanged.
+
+record_prompt() observes the final prompt size per provider/operation.
+
+blog_part_prompts()/collect_blog_parts() split a blog into independently
+generated parts (intro, one per outline heading, conclusion) that share one
+context header, for section-parallel generation. Only that header uses the
+fitted payload; parts and the stitched result follow the payload as sent.
+
+Tokens are estimated at ~4 characters per token (English text), which is close
+enough for budgeting and needs no tokenizer.
+"""
+import logging
+import math
+import re
+from textwrap import dedent
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit, urlunsplit
+
+from core.config import settings
+from core.metrics import LLM_PROMPT_TOKENS, LLM_PROMPT_TRUNCATIONS
+
+logger = logging.getLogger(__name__)
+
+CHARS_PER_TOKEN = 4
+
+# Instructions, schema hints and the short wizard fields
+PROMPT_OVERHEAD_TOKENS = 500
+
+MAX_HEADING_CHARS = 120
+
+# Reference links beyond this are compacted in the session context
+CONTEXT_REFERENCE_TOKENS = 400
+
+# Prompt budgets by model name prefix (first match wins); PROMPT_TOKEN_BUDGET overrides
+_MODEL_BUDGETS = (
+    ("gemini-1.5-pro", 16000),
+    ("gemini", 8000),
+    ("gpt-4o", 8000),
+    ("gpt-4.1", 8000),
+    ("gpt-4", 4000),
+    ("gpt-3.5", 3000),
+)
+_DEFAULT_BUDGET = 4000
+
+_FREE_FORM_FIELDS = ("intro_md", "outline")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count of a string."""
+    return math.ceil(len(text or "") / CHARS_PER_TOKEN)
+
+
+def prompt_budget(model: str) -> int:
+    """Prompt token budget for a model."""
+    if settings.PROMPT_TOKEN_BUDGET > 0:
+        return settings.PROMPT_TOKEN_BUDGET
+    name = (model or "").lower()
+    for prefix, budget in _MODEL_BUDGETS:
+        if name.startswith(prefix):
+            return budget
+    return _DEFAULT_BUDGET
+
+
+def _field_tokens(value) -> int:
+    if isinstance(value, list):
+        return estimate_tokens(str(value))
+    return estimate_tokens(str(value or ""))
+
+
+def split_reference_links(raw: str) -> List[str]:
+    """Links from a comma/whitespace separated string, de-duplicated, without query strings or fragments."""
+    links: List[str] = []
+    seen = set()
+    for part in re.split(r"[,\s]+", raw or ""):
+        if not part:
+            continue
+        parts = urlsplit(part)
+        if parts.scheme in ("http", "https") and parts.netloc:
+            part = urlunsplit((parts.scheme, parts.netloc, parts.path, "", ""))
+        if part not in seen:
+            seen.add(part)
+            links.append(part)
+    return links
+
+
+def summarize_reference_links(raw: str, max_tokens: int) -> str:
+    """Compact reference links to at most max_tokens, noting how many were left out."""
+    links = split_reference_links(raw)
+    kept: List[str] = []
+    # Reserve room for the "(+N more)" note
+    remaining = max_tokens * CHARS_PER_TOKEN - 12
+    for link in links:
+        cost = len(link) + 2
+        if cost > remaining:
+            break
+        kept.append(link)
+        remaining -= cost
+    text = ", ".join(kept)
+    if len(kept) < len(links):
+        text = f"{text} (+{len(links) - len(kept)} more)".lstrip()
+    return text
+
+
+def truncate_text(text: str, max_tokens: int) -> str:
+    """Cut text to at most max_tokens, preferring a sentence or word boundary."""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    cut = text[: max(0, max_chars - 2)]
+    boundary = max(cut.rfind(". "), cut.rfind("! "), cut.rfind("? "), cut.rfind("\n"))
+    if boundary < len(cut) // 2:
+        boundary = cut.rfind(" ")
+    if boundary >= len(cut) // 2:
+        cut = cut[: boundary + 1]
+    return cut.rstrip() + " …"
+
+
+def truncate_outline(outline: List[str], max_tokens: int) -> List[str]:
+    """Shorten headings, then drop trailing ones until the outline fits max_tokens."""
+    headings = [truncate_text(str(h), MAX_HEADING_CHARS // CHARS_PER_TOKEN) for h in outline]
+    while headings and _field_tokens(headings) > max_tokens:
+        headings.pop()
+    return headings
+
+
+def session_context(payload: dict) -> str:
+    """
+    Prompt prefix shared by every wizard step of one session.
+
+    Only fields known from step 1 go here, so the text is byte-identical for all
+    steps of a session.
+    """
+    refs = payload.get("reference_links") or ""
+    if estimate_tokens(refs) > CONTEXT_REFERENCE_TOKENS:
+        refs = summarize_reference_links(refs, CONTEXT_REFERENCE_TOKENS)
+    return (
+        "You are a senior blog writer.\n"
+        "Language must be English.\n"
+        f"Tone: {payload['tone']}\n"
+        f"Creativity: {payload['creativity']}\n"
+        f"Focus/Niche: {payload.get('focus_or_niche', '')}\n"
+        f"Keyword: {payload.get('targeted_keyword', '')}\n"
+        f"Audience: {payload.get('targeted_audience', '')}\n"
+        f"Reference links: {refs}\n"
+    )
+
+
+def fit_payload(payload: dict, model: str, operation: str) -> dict:
+    """
+    Return payload with intro_md and outline fitted to the prompt budget.
+
+    Every other field (and the session context) counts as fixed overhead. The
+    space left is shared out so that short fields keep their full text and long
+    ones split the remainder.
+    """
+    costs: Dict[str, int] = {f: _field_tokens(payload.get(f)) for f in _FREE_FORM_FIELDS if payload.get(f)}
+    fixed = PROMPT_OVERHEAD_TOKENS + sum(
+        _field_tokens(v) for k, v in payload.items()
+        if k not in _FREE_FORM_FIELDS and k != "reference_links" and isinstance(v, str)
+    ) + min(_field_tokens(payload.get("reference_links")), CONTEXT_REFERENCE_TOKENS)
+    available = prompt_budget(model) - fixed
+    if sum(costs.values()) <= available:
+        return payload
+    if available <= 0:
+        logger.warning(f"{operation}: prompt fields alone exceed the {prompt_budget(model)} token budget")
+        available = 0
+
+    # Smallest fields first, each gets at most an equal share of what is left
+    allowance: Dict[str, int] = {}
+    remaining = available
+    ordered = sorted(costs, key=costs.get)
+    for i, field in enumerate(ordered):
+        allowance[field] = min(costs[field], remaining // (len(ordered) - i))
+        remaining -= allowance[field]
+
+    fitted = dict(payload)
+    for field, limit in allowance.items():
+        if costs[field] <= limit:
+            continue
+        if field == "outline":
+            fitted[field] = truncate_outline(payload[field], limit)
+        else:
+            fitted[field] = truncate_text(payload[field], limit)
+        LLM_PROMPT_TRUNCATIONS.labels(operation, field).inc()
+        logger.info(f"{operation}: {field} cut from ~{costs[field]} to ~{_field_tokens(fitted[field])} tokens")
+    return fitted
+
+
+def record_prompt(provider: str, operation: str, *texts: str) -> int:
+    """Observe the estimated size of a prompt (all message texts); returns the estimate."""
+    tokens = sum(estimate_tokens(t) for t in texts)
+    LLM_PROMPT_TOKENS.labels(provider, operation).observe(tokens)
+    return tokens
+
+
+# ---------------- Section-parallel blog generation ----------------
+def article_context(payload: dict) -> str:
+    """Header shared by every part of one blog (intro, sections, conclusion), after the session context."""
+    outline = "\n".join(f"- {h}" for h in payload.get("outline") or [])
+    return (
+        "You are writing one part of a longer blog post.\n"
+        f"Selected idea: {payload.get('selected_idea', '')}\n"
+        f"Title: {payload['title']}\n"
+        f"Intro (markdown): {payload.get('intro_md', '')}\n"
+        f"Outline headings:\n{outline}\n"
+    )
+
+
+def blog_part_prompts(payload: dict, fitted: Optional[dict] = None) -> List[Tuple[str, str, str]]:
+    """
+    (kind, heading, prompt) for each independently written part of a blog.
+
+    fitted (from fit_payload) only feeds the shared context header; every
+    outline heading of payload still gets its own part, under its full text.
+    The selected intro is kept as written; an intro is only generated when the
+    payload has none.
+    """
+    context = article_context(fitted or payload)
+    outline = payload.get("outline") or []
+    parts: List[Tuple[str, str, str]] = []
+    if not (payload.get("intro_md") or "").strip():
+        parts.append(("intro", "", context + dedent("""
+        Write the introduction of the post in Markdown: 80-140 words, no heading.
+        Return ONLY the Markdown text.
+        """)))
+    for i, heading in enumerate(outline):
+        parts.append(("section", heading, context + dedent(f"""
+        Write the body of section {i + 1} of {len(outline)}: "{heading}".
+        Rules:
+        - 150-300 words of Markdown; '###' subheadings, lists and code blocks are allowed
+        - Do not repeat the section heading and do not use '#' or '##' headings
+        - Stay on this section; the other outline headings are covered separately
+        Return ONLY the Markdown text.
+        """)))
+    parts.append(("conclusion", "Conclusion", context + dedent("""
+    Write the conclusion of the post in Markdown: 60-120 words, no heading.
+    Return ONLY the Markdown text.
+    """)))
+    return parts
+
+
+def _strip_leading_heading(text: str) -> str:
+    text = (text or "").strip()
+    if text.startswith("#"):
+        text = text.split("\n", 1)[1].strip() if "\n" in text else ""
+    return text
+
+
+def collect_blog_parts(payload: dict, parts: List[Tuple[str, str, str]], texts: List[str]) -> dict:
+    """Stitch generated part texts back together in outline order (payload as sent, not fitted)."""
+    result = {"intro_md": payload.get("intro_md") or "", "sections": [], "conclusion_md": ""}
+    for (kind, heading, _), text in zip(parts, texts):
+        text = _strip_leading_heading(text)
+        if kind == "intro":
+            result["intro_md"] = text
+        elif kind == "section":
+            result["sections"].append({"heading": heading, "body_md": text})
+        else:
+            result["conclusion_md"] = text
+    return result
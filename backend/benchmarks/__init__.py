@@ -0,0 +1,10 @@
+"""
+Benchmarks and load tests for the CMS backend.
+
+Everything runs in-process against the real FastAPI app, with Firestore, the
+LLM providers and GCS replaced by local stand-ins (see benchmarks.fakes) that
+add configurable latency. No network or credentials are needed.
+
+    cd backend
+    python -m benchmarks.loadtest --help
+"""
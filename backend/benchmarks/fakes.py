@@ -0,0 +1,560 @@
+"""
+Local stand-ins for Firestore, Gemini/OpenAI and GCS used by the benchmarks.
+
+- FakeFirestore: in-memory subset of google.cloud.firestore.Client covering what
+  app.models.firestore_db and core.deps use (where/order_by/limit/select/
+  start_after queries, get_all, batches, transactions, write preconditions).
+  Every RPC sleeps for the configured latency, like a real network round trip.
+- Fake Gemini text/image clients, a fake OpenAI client (chat completions and
+  DALL-E images) and a fake GCS client with the same latency knob.
+
+install() swaps them into the app modules; it must be called before the app
+handles any request.
+"""
+import copy
+import itertools
+import json
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from io import BytesIO
+from typing import Any, Dict, List, Optional
+
+from google.api_core.exceptions import NotFound
+from google.cloud import firestore
+
+
+@dataclass
+class FakeLatency:
+    """Simulated latency in seconds per call."""
+    firestore: float = 0.005
+    llm: float = 0.05
+    image: float = 0.2
+    storage: float = 0.02
+
+
+class FirestoreCounters:
+    """Documents read/written and RPCs seen by the fake (ground truth for the accounting headers)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reads = 0
+        self.writes = 0
+        self.rpcs = 0
+
+    def add(self, reads: int = 0, writes: int = 0, rpcs: int = 0) -> None:
+        with self._lock:
+            self.reads += reads
+            self.writes += writes
+            self.rpcs += rpcs
+
+    def snapshot(self) -> Dict[str, int]:
+        return {"reads": self.reads, "writes": self.writes, "rpcs": self.rpcs}
+
+
+# ---------------- Firestore ----------------
+def _get(data: Optional[Dict[str, Any]], path: str) -> Any:
+    value: Any = data
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value
+
+
+def _has(data: Optional[Dict[str, Any]], path: str) -> bool:
+    value: Any = data
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return False
+        value = value[part]
+    return True
+
+
+def _set_path(data: Dict[str, Any], path: str, value: Any) -> None:
+    parts = path.split(".")
+    target = data
+    for part in parts[:-1]:
+        target = target.setdefault(part, {})
+    if value is firestore.DELETE_FIELD:
+        target.pop(parts[-1], None)
+    elif isinstance(value, firestore.ArrayUnion):
+        current = target.setdefault(parts[-1], [])
+        current.extend(v for v in value.values if v not in current)
+    elif isinstance(value, firestore.Increment):
+        target[parts[-1]] = (target.get(parts[-1]) or 0) + value.value
+    else:
+        target[parts[-1]] = copy.deepcopy(value)
+
+
+def _project(data: Dict[str, Any], field_paths: Optional[List[str]]) -> Dict[str, Any]:
+    if field_paths is None:
+        return copy.deepcopy(data)
+    out: Dict[str, Any] = {}
+    for path in field_paths:
+        if _has(data, path):
+            _set_path(out, path, _get(data, path))
+    return out
+
+
+class FakeSnapshot:
+    def __init__(self, reference: "FakeDocumentReference", data: Optional[Dict[str, Any]], update_time):
+        self.reference = reference
+        self.id = reference.id
+        self.exists = data is not None
+        self.update_time = update_time
+        self._data = data
+
+    def to_dict(self) -> Optional[Dict[str, Any]]:
+        return copy.deepcopy(self._data) if self._data is not None else None
+
+    def get(self, field_path: str) -> Any:
+        return _get(self._data, field_path)
+
+
+class FakeDocumentReference:
+    def __init__(self, client: "FakeFirestore", path: str):
+        self._client = client
+        self.path = path
+        self.id = path.rsplit("/", 1)[-1]
+
+    def collection(self, name: str) -> "FakeCollection":
+        return FakeCollection(self._client, f"{self.path}/{name}")
+
+    def get(self, field_paths=None, transaction=None) -> FakeSnapshot:
+        self._client._rpc(reads=1)
+        return self._client._snapshot(self, field_paths)
+
+    def set(self, data: Dict[str, Any], merge: bool = False) -> None:
+        self._client._rpc(writes=1)
+        self._client._apply_set(self.path, data, merge)
+
+    def update(self, updates: Dict[str, Any], option=None) -> None:
+        self._client._rpc(writes=1)
+        self._client._apply_update(self.path, updates, option)
+
+    def delete(self, option=None) -> None:
+        self._client._rpc(writes=1)
+        self._client._docs.pop(self.path, None)
+
+
+class FakeQuery:
+    def __init__(self, collection: "FakeCollection"):
+        self._collection = collection
+        self._filters: List[Any] = []
+        self._order: Optional[tuple] = None
+        self._limit: Optional[int] = None
+        self._offset = 0
+        self._projection: Optional[List[str]] = None
+        self._start_after: Optional[FakeSnapshot] = None
+
+    def _copy(self) -> "FakeQuery":
+        query = FakeQuery(self._collection)
+        query.__dict__.update({k: copy.copy(v) for k, v in self.__dict__.items()})
+        return query
+
+    def where(self, field_path=None, op_string=None, value=None, *, filter=None) -> "FakeQuery":
+        query = self._copy()
+        if filter is not None:
+            field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+        query._filters.append((field_path, op_string, value))
+        return query
+
+    def order_by(self, field_path: str, direction: str = firestore.Query.ASCENDING) -> "FakeQuery":
+        query = self._copy()
+        query._order = (field_path, direction)
+        return query
+
+    def limit(self, count: int) -> "FakeQuery":
+        query = self._copy()
+        query._limit = count
+        return query
+
+    def offset(self, count: int) -> "FakeQuery":
+        query = self._copy()
+        query._offset = count
+        return query
+
+    def select(self, field_paths) -> "FakeQuery":
+        query = self._copy()
+        query._projection = list(field_paths)
+        return query
+
+    def start_after(self, snapshot: FakeSnapshot) -> "FakeQuery":
+        query = self._copy()
+        query._start_after = snapshot
+        return query
+
+    def _matches(self, data: Dict[str, Any]) -> bool:
+        for field_path, op_string, value in self._filters:
+            current = _get(data, field_path)
+            if op_string == "==" and current != value:
+                return False
+            if op_string == "in" and current not in value:
+                return False
+        return True
+
+    def stream(self, transaction=None):
+        client = self._collection._client
+        prefix = self._collection.path + "/"
+        rows = [
+            (path, data, update_time)
+            for path, (data, update_time) in list(client._docs.items())
+            if path.startswith(prefix) and "/" not in path[len(prefix):] and self._matches(data)
+        ]
+        if self._order is not None:
+            field_path, direction = self._order
+            reverse = direction == firestore.Query.DESCENDING
+            if field_path == "__name__":
+                rows.sort(key=lambda row: row[0], reverse=reverse)
+            else:
+                # Firestore drops documents that lack the order_by field
+                rows = [row for row in rows if _has(row[1], field_path)]
+                rows.sort(key=lambda row: _get(row[1], field_path), reverse=reverse)
+        if self._start_after is not None:
+            paths = [row[0] for row in rows]
+            if self._start_after.reference.path in paths:
+                rows = rows[paths.index(self._start_after.reference.path) + 1:]
+        rows = rows[self._offset:]
+        if self._limit is not None:
+            rows = rows[:self._limit]
+        # Firestore bills at least one read per query
+        client._rpc(reads=max(1, len(rows)))
+        for path, data, update_time in rows:
+            yield FakeSnapshot(FakeDocumentReference(client, path), _project(data, self._projection), update_time)
+
+    def get(self, transaction=None) -> List[FakeSnapshot]:
+        return list(self.stream())
+
+
+class FakeCollection(FakeQuery):
+    def __init__(self, client: "FakeFirestore", path: str):
+        self._client = client
+        self.path = path
+        self.id = path.rsplit("/", 1)[-1]
+        super().__init__(self)
+
+    def _copy(self) -> FakeQuery:
+        query = FakeQuery(self)
+        return query
+
+    def document(self, document_id: Optional[str] = None) -> FakeDocumentReference:
+        return FakeDocumentReference(self._client, f"{self.path}/{document_id or uuid.uuid4().hex[:20]}")
+
+    def list_documents(self, page_size: Optional[int] = None):
+        self._client._rpc()
+        prefix = self.path + "/"
+        with self._client._lock:
+            paths = [p for p in self._client._docs if p.startswith(prefix) and "/" not in p[len(prefix):]]
+        return [FakeDocumentReference(self._client, p) for p in paths]
+
+    def add(self, data: Dict[str, Any]):
+        ref = self.document()
+        ref.set(data)
+        return datetime.now(timezone.utc), ref
+
+
+class FakeWriteBatch:
+    def __init__(self, client: "FakeFirestore"):
+        self._client = client
+        self._ops: List[tuple] = []
+
+    def set(self, reference, data, merge: bool = False) -> None:
+        self._ops.append(("set", reference, data, merge))
+
+    def update(self, reference, updates, option=None) -> None:
+        self._ops.append(("update", reference, updates, option))
+
+    def delete(self, reference, option=None) -> None:
+        self._ops.append(("delete", reference, None, None))
+
+    def commit(self) -> list:
+        self._client._rpc(writes=len(self._ops))
+        with self._client._lock:
+            for op, reference, data, extra in self._ops:
+                if op == "update":
+                    self._client._check_precondition(reference.path, extra)
+            for op, reference, data, extra in self._ops:
+                if op == "set":
+                    self._client._apply_set(reference.path, data, extra)
+                elif op == "update":
+                    self._client._apply_update(reference.path, data, None)
+                else:
+                    self._client._docs.pop(reference.path, None)
+        self._ops = []
+        return []
+
+
+class FakeTransaction(FakeWriteBatch):
+    def __init__(self, client: "FakeFirestore", max_attempts: int = 5, read_only: bool = False):
+        super().__init__(client)
+        self._max_attempts = max_attempts
+
+
+def fake_transactional(to_wrap):
+    """Stand-in for firestore.transactional: run once, then commit the buffered writes."""
+    def wrapper(transaction, *args, **kwargs):
+        result = to_wrap(transaction, *args, **kwargs)
+        transaction.commit()
+        return result
+    return wrapper
+
+
+class _WriteOption:
+    def __init__(self, last_update_time=None):
+        self.last_update_time = last_update_time
+
+
+class FakeFirestore:
+    """In-memory Firestore client with per-RPC latency."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.counters = FirestoreCounters()
+        self._docs: Dict[str, tuple] = {}
+        self._lock = threading.RLock()
+        self._clock = itertools.count(1)
+
+    def _rpc(self, reads: int = 0, writes: int = 0) -> None:
+        self.counters.add(reads=reads, writes=writes, rpcs=1)
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _now(self) -> datetime:
+        return datetime.now(timezone.utc).replace(microsecond=next(self._clock) % 1_000_000)
+
+    def _snapshot(self, reference: FakeDocumentReference, field_paths=None) -> FakeSnapshot:
+        data, update_time = self._docs.get(reference.path, (None, None))
+        return FakeSnapshot(reference, _project(data, field_paths) if data is not None else None, update_time)
+
+    def _check_precondition(self, path: str, option) -> None:
+        if path not in self._docs:
+            raise Exception(f"404 No document to update: {path}")
+        if option is not None and option.last_update_time is not None:
+            if self._docs[path][1] != option.last_update_time:
+                raise Exception("FailedPrecondition: update_time does not match")
+
+    def _apply_set(self, path: str, data: Dict[str, Any], merge: bool) -> None:
+        with self._lock:
+            base = copy.deepcopy(self._docs[path][0]) if merge and path in self._docs else {}
+            for key, value in data.items():
+                if merge and isinstance(value, dict):
+                    base.setdefault(key, {}).update(copy.deepcopy(value))
+                else:
+                    _set_path(base, key, value)
+            self._docs[path] = (base, self._now())
+
+    def _apply_update(self, path: str, updates: Dict[str, Any], option) -> None:
+        with self._lock:
+            if path not in self._docs:
+                raise NotFound(f"No document to update: {path}")
+            self._check_precondition(path, option)
+            data = copy.deepcopy(self._docs[path][0])
+            for key, value in updates.items():
+                _set_path(data, key, value)
+            self._docs[path] = (data, self._now())
+
+    def collection(self, name: str) -> FakeCollection:
+        return FakeCollection(self, name)
+
+    def document(self, path: str) -> FakeDocumentReference:
+        return FakeDocumentReference(self, path)
+
+    def batch(self) -> FakeWriteBatch:
+        return FakeWriteBatch(self)
+
+    def transaction(self, **kwargs) -> FakeTransaction:
+        return FakeTransaction(self, **kwargs)
+
+    def get_all(self, references, field_paths=None, transaction=None):
+        references = list(references)
+        self._rpc(reads=len(references))
+        for reference in references:
+            yield self._snapshot(reference, field_paths)
+
+    def write_option(self, last_update_time=None, exists=None) -> _WriteOption:
+        return _WriteOption(last_update_time=last_update_time)
+
+
+# ---------------- LLM / image / storage ----------------
+def _tiny_png() -> bytes:
+    from PIL import Image
+
+    out = BytesIO()
+    Image.new("RGB", (64, 48), (68, 67, 228)).save(out, format="PNG")
+    return out.getvalue()
+
+
+class _Usage:
+    def __init__(self, prompt: str, text: str):
+        self.prompt_token_count = len(prompt) // 4
+        self.candidates_token_count = len(text) // 4
+
+
+def _fake_answer(prompt: str) -> str:
+    """Answer in the shape the wizard prompt asks for (shared by the Gemini and OpenAI fakes)."""
+    from app.models.schemas import AI_OPTIONS_COUNT
+
+    if "one part of a longer blog post" in prompt:
+        return "Body text. " * 80
+    if "Markdown text" in prompt:
+        return "# Title\n\n" + "\n\n".join(f"## Section {i}\n\n" + "Body text. " * 80 for i in range(6))
+    if "outline variants" in prompt:
+        return json.dumps({"options": [{"outline": [f"Heading {i}" for i in range(7)]} for _ in range(AI_OPTIONS_COUNT)]})
+    return json.dumps({"options": [f"Option {i}" for i in range(AI_OPTIONS_COUNT)]})
+
+
+class _GeminiResponse:
+    def __init__(self, prompt: str, text: str):
+        self.text = text
+        self.usage_metadata = _Usage(prompt, text)
+
+
+class FakeGeminiModel:
+    """Replaces genai.GenerativeModel: answers like the wizard prompts expect, after a delay."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def generate_content(self, prompt: str, **kwargs) -> _GeminiResponse:
+        text = _fake_answer(prompt)
+        # Decoding time grows with the answer: one latency unit per ~1000 characters
+        time.sleep(self.latency * max(1.0, len(text) / 1000))
+        return _GeminiResponse(prompt, text)
+
+
+class _InlineData:
+    def __init__(self, data: bytes):
+        self.data = data
+        self.mime_type = "image/png"
+
+
+class _Part:
+    def __init__(self, data: bytes):
+        self.inline_data = _InlineData(data)
+
+
+class _ImageResponse:
+    def __init__(self, data: bytes):
+        self.parts = [_Part(data)]
+
+
+class FakeGenAIClient:
+    """Replaces google.genai.Client for image generation."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self._png = _tiny_png()
+        self.models = self
+
+    def generate_content(self, model=None, contents=None, config=None) -> _ImageResponse:
+        time.sleep(self.latency)
+        return _ImageResponse(self._png)
+
+
+class _Namespace:
+    def __init__(self, **attrs):
+        self.__dict__.update(attrs)
+
+
+class FakeOpenAIClient:
+    """
+    Replaces openai.OpenAI: chat completions (text wizard) and images (DALL-E fallback).
+
+    Generated images get a fake URL that fake_stream_download serves from memory.
+    """
+
+    URL_PREFIX = "https://fake-openai.invalid/images/"
+
+    def __init__(self, llm_latency: float, image_latency: float):
+        self.llm_latency = llm_latency
+        self.image_latency = image_latency
+        self.images_by_url: Dict[str, bytes] = {}
+        self._png = _tiny_png()
+        self.chat = _Namespace(completions=_Namespace(create=self._create_completion))
+        self.images = _Namespace(generate=self._generate_image)
+
+    def _create_completion(self, messages=None, **kwargs) -> _Namespace:
+        prompt = "\n".join(m.get("content") or "" for m in messages or [])
+        text = _fake_answer(prompt)
+        time.sleep(self.llm_latency * max(1.0, len(text) / 1000))
+        usage = _Namespace(
+            prompt_tokens=len(prompt) // 4, completion_tokens=len(text) // 4,
+            prompt_tokens_details=_Namespace(cached_tokens=0),
+        )
+        return _Namespace(choices=[_Namespace(message=_Namespace(content=text))], usage=usage)
+
+    def _generate_image(self, **kwargs) -> _Namespace:
+        time.sleep(self.image_latency)
+        url = f"{self.URL_PREFIX}{uuid.uuid4().hex}.png"
+        self.images_by_url[url] = self._png
+        return _Namespace(data=[_Namespace(url=url)])
+
+
+def fake_stream_download(openai_client: FakeOpenAIClient, real_download):
+    """stream_download that serves FakeOpenAIClient image URLs locally and passes other URLs through."""
+    def download(url: str, path: str, max_bytes: Optional[int] = None) -> int:
+        data = openai_client.images_by_url.pop(url, None)
+        if data is None:
+            return real_download(url, path, max_bytes)
+        with open(path, "wb") as f:
+            f.write(data)
+        return len(data)
+    return download
+
+
+class _FakeBlob:
+    def __init__(self, client: "FakeStorageClient", name: str):
+        self.client = client
+        self.name = name
+        self.cache_control: Optional[str] = None
+
+    def upload_from_string(self, data, content_type=None) -> None:
+        time.sleep(self.client.latency)
+        self.client.objects[self.name] = (data, content_type)
+
+    def delete(self) -> None:
+        time.sleep(self.client.latency)
+        if self.client.objects.pop(self.name, None) is None:
+            raise NotFound(f"No such object: {self.name}")
+
+
+class FakeStorageClient:
+    """Replaces google.cloud.storage.Client (uploads are kept in memory, in objects)."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.objects: Dict[str, tuple] = {}
+
+    def bucket(self, name: str) -> "FakeStorageClient":
+        return self
+
+    def blob(self, name: str) -> _FakeBlob:
+        return _FakeBlob(self, name)
+
+
+def install(latency: FakeLatency, uploads_dir: str) -> FakeFirestore:
+    """Point the app at the stand-ins and return the fake Firestore client."""
+    import core.firestore_db as core_firestore_db
+    from app.services import gemini_service, image_service, openai_service
+    from core.config import settings
+
+    fake_db = FakeFirestore(latency=latency.firestore)
+    core_firestore_db.db = fake_db
+    firestore.transactional = fake_transactional
+
+    model = FakeGeminiModel(latency.llm)
+    gemini_service._get_model = lambda system_instruction=None: model
+    genai_client = FakeGenAIClient(latency.image)
+    image_service._get_client = lambda: genai_client
+    openai_client = FakeOpenAIClient(latency.llm, latency.image)
+    openai_service._get_client = lambda: openai_client
+    image_service._get_openai_client = lambda: openai_client
+    image_service.stream_download = fake_stream_download(openai_client, image_service.stream_download)
+    storage_client = FakeStorageClient(latency.storage)
+    image_service._get_storage_client = lambda: storage_client
+    image_service.UPLOADS_DIR = uploads_dir
+    settings.GCS_BUCKET = settings.GCS_BUCKET or "bench-bucket"
+    return fake_db
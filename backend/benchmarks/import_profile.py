@@ -0,0 +1,118 @@
+"""
+Import-time profile of the API (worker cold start).
+
+Imports the app module in fresh interpreters with `python -X importtime`,
+reports the median wall time and which packages account for it (self time
+summed per top-level package, google.* split one level further).
+
+    cd backend
+    python -m benchmarks.import_profile                          # 5 runs of "import main"
+    python -m benchmarks.import_profile -r 10 --top 15
+    python -m benchmarks.import_profile --output imports.json    # save a baseline
+    python -m benchmarks.import_profile --baseline imports.json  # regression gate
+
+With --baseline the exit code is 1 when the median import time regresses by
+more than --max-regression (default 25%).
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)$")
+
+_PROBE = (
+    "import time, sys\n"
+    "t = time.perf_counter()\n"
+    "import {module}\n"
+    "sys.stdout.write(repr(time.perf_counter() - t))\n"
+)
+
+
+def _package(name: str) -> str:
+    parts = name.split(".")
+    # google.* is a namespace shared by unrelated SDKs
+    depth = 3 if parts[0] == "google" and len(parts) > 2 and parts[1] == "cloud" else 2 if parts[0] == "google" else 1
+    return ".".join(parts[:depth])
+
+
+def profile_once(module: str) -> Tuple[float, Dict[str, int]]:
+    """Import module in a fresh interpreter; returns (wall seconds, self microseconds per package)."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _PROBE.format(module=module)],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=False,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    per_package: Dict[str, int] = defaultdict(int)
+    for line in proc.stderr.splitlines():
+        match = _IMPORTTIME_RE.match(line)
+        if match:
+            per_package[_package(match.group(4))] += int(match.group(1))
+    return float(proc.stdout.strip()), dict(per_package)
+
+
+def run(module: str, runs: int, top: int) -> Dict[str, Any]:
+    walls: List[float] = []
+    totals: Dict[str, List[int]] = defaultdict(list)
+    for _ in range(runs):
+        wall, per_package = profile_once(module)
+        walls.append(wall)
+        for name, us in per_package.items():
+            totals[name].append(us)
+    packages = sorted(
+        ((name, statistics.median(values) / 1000) for name, values in totals.items()),
+        key=lambda item: item[1], reverse=True,
+    )
+    return {
+        "module": module,
+        "runs": runs,
+        "median_ms": round(statistics.median(walls) * 1000, 1),
+        "min_ms": round(min(walls) * 1000, 1),
+        "max_ms": round(max(walls) * 1000, 1),
+        "packages_ms": {name: round(ms, 1) for name, ms in packages[:top]},
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Profile the import time of the CMS backend.")
+    parser.add_argument("-m", "--module", default="main", help="Module to import (default: main)")
+    parser.add_argument("-r", "--runs", type=int, default=5, help="Fresh interpreters to time")
+    parser.add_argument("--top", type=int, default=10, help="Packages to list")
+    parser.add_argument("--output", help="Write results as JSON (usable as a baseline)")
+    parser.add_argument("--baseline", help="Baseline JSON to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.25,
+                        help="Allowed relative increase of the median import time (default 0.25)")
+    args = parser.parse_args(argv)
+
+    results = run(args.module, args.runs, args.top)
+    print(f"import {results['module']}: median {results['median_ms']} ms "
+          f"(min {results['min_ms']}, max {results['max_ms']}, {results['runs']} runs)")
+    for name, ms in results["packages_ms"].items():
+        print(f"  {name:<32} {ms:>8.1f} ms")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        old, new = baseline.get("median_ms", 0), results["median_ms"]
+        if old and new > old * (1 + args.max_regression):
+            print(f"Import time regression: {old} -> {new} ms (+{(new / old - 1) * 100:.0f}%)")
+            return 1
+        print("No regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,286 @@
+"""
+In-process load test for the CMS backend.
+
+Seeds a fake Firestore, stubs Gemini/GCS with configurable latency and drives
+the real ASGI app with N concurrent clients per scenario. For each scenario it
+reports throughput, p50/p95/p99 latency and Firestore documents read per request:
+as charged to each request (X-Firestore-Reads accounting header, which counts a
+coalesced read for every request that waited on it) and as actually read from
+the fake (fake_reads_per_request).
+
+    cd backend
+    python -m benchmarks.loadtest                                  # all scenarios
+    python -m benchmarks.loadtest -s public_blogs -s blog_stats -n 500 -c 50
+    python -m benchmarks.loadtest --output results.json            # save a baseline
+    python -m benchmarks.loadtest --baseline results.json          # regression gate
+
+With --baseline the exit code is 1 when any scenario's p95 latency or either
+reads-per-request figure regress by more than --max-regression (default 25%).
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+# Make "python benchmarks/loadtest.py" work as well as "python -m benchmarks.loadtest"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fakes import FakeLatency, install
+
+BENCH_FIREBASE_UID = "bench-user"
+
+_WIZARD = {
+    "tone": "informative",
+    "creativity": "medium",
+    "focus_or_niche": "python performance",
+    "targeted_keyword": "fastapi",
+    "targeted_audience": "backend developers",
+    "reference_links": "https://example.com/a, https://example.com/b",
+    "selected_idea": "Profiling async Python services",
+    "title": "Profiling async Python services",
+    "intro_md": "Async services hide their bottlenecks well.",
+}
+
+# name -> (method, path, json body)
+SCENARIOS: Dict[str, tuple] = {
+    "public_blogs": ("GET", "/public/blogs?page=1&limit=10", None),
+    "my_blogs_search": ("GET", "/blog?page=1&limit=10&search=python", None),
+    "blog_stats": ("GET", "/blogs/stats", None),
+    "images_ai": ("GET", "/images?source=ai", None),
+    "ai_ideas": ("POST", "/ai/ideas", _WIZARD),
+    "ai_titles": ("POST", "/ai/titles", _WIZARD),
+    "ai_intros": ("POST", "/ai/intros", _WIZARD),
+    "ai_outlines": ("POST", "/ai/outlines", _WIZARD),
+    "ai_image_prompts": ("POST", "/ai/image-prompts", _WIZARD),
+    "ai_blog_generate": ("POST", "/ai/blog-generate", {**_WIZARD, "outline": [f"Heading {i}" for i in range(7)]}),
+    "ai_blog_sections": ("POST", "/ai/blog-generate",
+                         {**_WIZARD, "outline": [f"Heading {i}" for i in range(7)], "mode": "sections"}),
+    "ai_image_generate": ("POST", "/ai/image-generate", {**_WIZARD, "prompt": "abstract cover", "save_to_gallery": False}),
+}
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile (values need not be sorted)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, int(round(pct / 100.0 * len(ordered) + 0.5)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def seed(blogs: int, images: int) -> str:
+    """Create the benchmark user, blogs and images; returns the user's document ID."""
+    from app.models.firestore_db import create_blog, create_image
+    from core.firestore_db import get_db
+
+    _, user_ref = get_db().collection("users").add({
+        "firebase_uid": BENCH_FIREBASE_UID,
+        "username": "Bench User",
+        "email": "bench@example.com",
+        "is_superuser": True,
+        "is_active": True,
+    })
+    statuses = ("saved", "pending", "published", "published")
+    topics = ("python", "marketing", "design", "cloud")
+    base = datetime(2024, 1, 1)
+    for i in range(blogs):
+        created = base + timedelta(hours=i)
+        status = statuses[i % len(statuses)]
+        title = f"{topics[i % len(topics)].title()} post {i}"
+        create_blog({
+            "owner_id": user_ref.id,
+            "owner_name": "Bench User",
+            "status": status,
+            "meta": {"title": title, "tone": "informative", "creativity": "medium", "language": "English",
+                     "focus_or_niche": topics[i % len(topics)]},
+            "final_blog": {
+                "render": {"title": title, "cover_image_url": "", "intro_md": "Intro " * 40, "sections": []},
+                "markdown": f"# {title}\n\n" + "Body text. " * 800,
+                "html": f"<h1>{title}</h1>" + "<p>Body text.</p>" * 800,
+            },
+            "admin_review": {"requested_at": created if status == "pending" else None, "feedback": ""},
+            "created_at": created,
+            "updated_at": created,
+            "published_at": created if status == "published" else None,
+        })
+    sources = ("nano", "blog", None)
+    for i in range(images):
+        doc = {
+            "owner_id": user_ref.id,
+            "image_url": f"https://example.com/img/{i}.png",
+            "meta": {"prompt": f"image {i}"},
+            "created_at": base + timedelta(minutes=i),
+        }
+        if sources[i % len(sources)] is not None:
+            doc["source"] = sources[i % len(sources)]
+        create_image(doc)
+    return user_ref.id
+
+
+async def run_scenario(client, name: str, requests: int, concurrency: int, headers: Dict[str, str], fake_db) -> Dict[str, Any]:
+    method, path, body = SCENARIOS[name]
+    latencies: List[float] = []
+    reads: List[int] = []
+    errors = 0
+    remaining = iter(range(requests))
+    before = fake_db.counters.snapshot()
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            start = time.perf_counter()
+            response = await client.request(method, path, json=body, headers=headers)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+            reads.append(int(response.headers.get("x-firestore-reads", "0")))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    after = fake_db.counters.snapshot()
+
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "throughput_rps": round(requests / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "reads_per_request": round(sum(reads) / len(reads), 2) if reads else 0.0,
+        "fake_reads_per_request": round((after["reads"] - before["reads"]) / requests, 2),
+        "rpcs_per_request": round((after["rpcs"] - before["rpcs"]) / requests, 2),
+    }
+
+
+async def run(args) -> Dict[str, Any]:
+    import httpx
+
+    from core.config import settings
+    from core.verify import create_access_token
+
+    settings.TRACE_HEADERS = True
+    # One benchmark user would otherwise hit the per-user AI limits immediately
+    settings.RATE_LIMIT_ENABLED = args.rate_limit
+    settings.JWT_SECRET = settings.JWT_SECRET or "benchmark-secret"
+
+    uploads_dir = tempfile.mkdtemp(prefix="cms-bench-uploads-")
+    latency = FakeLatency(
+        firestore=args.firestore_latency_ms / 1000,
+        llm=args.llm_latency_ms / 1000,
+        image=args.image_latency_ms / 1000,
+        storage=args.storage_latency_ms / 1000,
+    )
+    fake_db = install(latency, uploads_dir)
+
+    import main as app_main
+
+    # Seed without simulated latency
+    fake_db.latency = 0
+    seed(args.blogs, args.images)
+    fake_db.latency = latency.firestore
+
+    token = create_access_token(
+        user_id=BENCH_FIREBASE_UID, role="admin", secret=settings.JWT_SECRET, expires_minutes=60
+    )
+    headers = {"Authorization": f"Bearer {token}"}
+    transport = httpx.ASGITransport(app=app_main.app)
+
+    results: Dict[str, Any] = {}
+    async with app_main.lifespan(app_main.api_app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench/cms-backend", timeout=None) as client:
+            for name in args.scenario or list(SCENARIOS):
+                if args.warmup:
+                    await run_scenario(client, name, args.warmup, min(args.warmup, args.concurrency), headers, fake_db)
+                results[name] = await run_scenario(client, name, args.requests, args.concurrency, headers, fake_db)
+                print(_format_row(name, results[name]))
+    return {
+        "config": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "blogs": args.blogs,
+            "images": args.images,
+            "latency_ms": {
+                "firestore": args.firestore_latency_ms,
+                "llm": args.llm_latency_ms,
+                "image": args.image_latency_ms,
+                "storage": args.storage_latency_ms,
+            },
+        },
+        "scenarios": results,
+    }
+
+
+def _format_row(name: str, r: Dict[str, Any]) -> str:
+    return (
+        f"{name:<20} {r['throughput_rps']:>9.1f} req/s  p50 {r['p50_ms']:>8.1f} ms  p95 {r['p95_ms']:>8.1f} ms  "
+        f"p99 {r['p99_ms']:>8.1f} ms  reads/req {r['reads_per_request']:>7.1f}  errors {r['errors']}"
+    )
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], max_regression: float) -> List[str]:
+    """Return a list of regressions of p95 latency or reads per request against a baseline run."""
+    failures = []
+    for name, current in results["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if not previous:
+            continue
+        for metric in ("p95_ms", "reads_per_request", "fake_reads_per_request"):
+            old, new = previous.get(metric, 0), current.get(metric, 0)
+            if old and new > old * (1 + max_regression):
+                failures.append(f"{name}: {metric} {old} -> {new} (+{(new / old - 1) * 100:.0f}%)")
+        if current["errors"] > previous.get("errors", 0):
+            failures.append(f"{name}: errors {previous.get('errors', 0)} -> {current['errors']}")
+    return failures
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Load test the CMS backend against local stand-ins.")
+    parser.add_argument("-s", "--scenario", action="append", choices=sorted(SCENARIOS),
+                        help="Scenario to run (repeatable, default: all)")
+    parser.add_argument("-n", "--requests", type=int, default=200, help="Requests per scenario")
+    parser.add_argument("-c", "--concurrency", type=int, default=20, help="Concurrent clients")
+    parser.add_argument("--warmup", type=int, default=10, help="Unmeasured requests per scenario")
+    parser.add_argument("--blogs", type=int, default=300, help="Seeded blogs")
+    parser.add_argument("--images", type=int, default=120, help="Seeded images")
+    parser.add_argument("--firestore-latency-ms", type=float, default=5.0)
+    parser.add_argument("--llm-latency-ms", type=float, default=50.0)
+    parser.add_argument("--image-latency-ms", type=float, default=200.0)
+    parser.add_argument("--storage-latency-ms", type=float, default=20.0)
+    parser.add_argument("--rate-limit", action="store_true", help="Keep AI rate limits/quotas enabled")
+    parser.add_argument("--output", help="Write results as JSON (usable as a baseline)")
+    parser.add_argument("--baseline", help="Baseline JSON to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.25,
+                        help="Allowed relative increase of p95/reads per request (default 0.25)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    results = asyncio.run(run(args))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        failures = compare(results, baseline, args.max_regression)
+        if failures:
+            print("Performance regressions:")
+            for failure in failures:
+                print(f"  - {failure}")
+            return 1
+        print("No regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,255 @@
+"""
+Shared cache for values that must stay coherent across worker processes.
+
+With several workers (gunicorn.conf.py) every in-process cache is private to
+one worker: an invalidation in the worker that handled a write does not reach
+the others. Caches that must agree across workers go through this module.
+
+Backends (CACHE_BACKEND):
+- memory (default): per process, for single-worker runs and development
+- sqlite: one SQLite file (CACHE_SQLITE_PATH) shared by all workers on a host;
+  also what tests and benchmarks use to exercise the multi-worker behaviour
+- redis: shared by all workers/instances (REDIS_URL); needs the `redis` package
+
+Values are stored as JSON (datetimes as ISO strings, i.e. as they appear in
+API responses). A backend error is logged and treated as a cache miss, so an
+unreachable cache slows the API down instead of failing it.
+
+CacheNamespace groups keys under a version number. invalidate() bumps the
+version, which orphans every key of the namespace at once (they then expire
+through their TTL) without listing or deleting keys.
+"""
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from core.config import settings
+from core.metrics import CACHE_REQUESTS
+from core.responses import dumps_json
+
+logger = logging.getLogger(__name__)
+
+
+def dumps(value: Any) -> str:
+    return dumps_json(value).decode("utf-8")
+
+
+class MemoryCacheBackend:
+    """Key/value store in process memory (not shared between workers)."""
+
+    MAX_KEYS = 10_000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data: Dict[str, Tuple[str, float]] = {}  # key -> (value, expires at; 0 = never)
+
+    async def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at and expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            return value
+
+    async def set(self, key: str, value: str, ttl: float = 0) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._data[key] = (value, now + ttl if ttl else 0)
+            if len(self._data) > self.MAX_KEYS:
+                self._data = {k: v for k, v in self._data.items() if not v[1] or v[1] > now}
+
+    async def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    async def incr(self, key: str) -> int:
+        with self._lock:
+            value, expires_at = self._data.get(key, ("0", 0))
+            new_value = int(value) + 1
+            self._data[key] = (str(new_value), expires_at)
+            return new_value
+
+
+class SQLiteCacheBackend:
+    """
+    Key/value store in a local SQLite file, shared by the workers of one host.
+
+    Runs on the calling thread: statements are single-row lookups on a local
+    file in WAL mode, and lock waits are capped at busy_timeout.
+    """
+
+    PURGE_PROBABILITY = 1 / 256
+
+    def __init__(self, path: str, busy_timeout: float = 0.2):
+        self._path = path
+        self._busy_timeout = busy_timeout
+        self._local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self._path, timeout=self._busy_timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    async def get(self, key: str) -> Optional[str]:
+        row = self._connection().execute(
+            "SELECT value FROM cache WHERE key = ? AND (expires_at = 0 OR expires_at > ?)", (key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    async def set(self, key: str, value: str, ttl: float = 0) -> None:
+        conn = self._connection()
+        now = time.time()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, value, now + ttl if ttl else 0),
+        )
+        if random.random() < self.PURGE_PROBABILITY:
+            conn.execute("DELETE FROM cache WHERE expires_at != 0 AND expires_at <= ?", (now,))
+
+    async def delete(self, key: str) -> None:
+        self._connection().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    async def incr(self, key: str) -> int:
+        row = self._connection().execute(
+            "INSERT INTO cache (key, value, expires_at) VALUES (?, '1', 0) "
+            "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1 RETURNING value",
+            (key,),
+        ).fetchone()
+        return int(row[0])
+
+
+class RedisCacheBackend:
+    """Key/value store in Redis, shared across workers and hosts."""
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis_asyncio
+
+        self._redis = redis_asyncio.from_url(url, decode_responses=True)
+
+    async def get(self, key: str) -> Optional[str]:
+        return await self._redis.get(key)
+
+    async def set(self, key: str, value: str, ttl: float = 0) -> None:
+        await self._redis.set(key, value, px=int(ttl * 1000) if ttl else None)
+
+    async def delete(self, key: str) -> None:
+        await self._redis.delete(key)
+
+    async def incr(self, key: str) -> int:
+        return int(await self._redis.incr(key))
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_cache_backend():
+    """Get (lazily creating) the configured backend."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                if settings.CACHE_BACKEND == "redis":
+                    _backend = RedisCacheBackend(settings.REDIS_URL)
+                    logger.info("Shared cache uses Redis backend")
+                elif settings.CACHE_BACKEND == "sqlite":
+                    _backend = SQLiteCacheBackend(settings.CACHE_SQLITE_PATH)
+                    logger.info(f"Shared cache uses SQLite backend at {settings.CACHE_SQLITE_PATH}")
+                else:
+                    _backend = MemoryCacheBackend()
+    return _backend
+
+
+class CacheNamespace:
+    """
+    A group of JSON values with one TTL that can be invalidated together.
+
+    Keys are stored as <CACHE_PREFIX><name>:v<version>:<key>.
+    """
+
+    def __init__(self, name: str, ttl: float):
+        self.name = name
+        self.ttl = ttl
+
+    def _version_key(self) -> str:
+        return f"{settings.CACHE_PREFIX}{self.name}:version"
+
+    async def _key(self, key: str) -> str:
+        version = await get_cache_backend().get(self._version_key()) or "0"
+        return f"{settings.CACHE_PREFIX}{self.name}:v{version}:{key}"
+
+    async def get(self, key: str) -> Optional[Any]:
+        if self.ttl <= 0:
+            return None
+        try:
+            return await self._get(await self._key(key))
+        except Exception as e:
+            return self._backend_error(e)
+
+    async def set(self, key: str, value: Any) -> None:
+        if self.ttl <= 0:
+            return
+        try:
+            await get_cache_backend().set(await self._key(key), dumps(value), self.ttl)
+        except Exception as e:
+            logger.warning(f"Cache backend unavailable, not caching '{self.name}': {e}")
+
+    async def get_or_load(self, key: str, load: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Cached value for key, else await load(), store and return its (JSON round-tripped) result.
+
+        The versioned key is resolved before loading, so a load that overlaps an
+        invalidate() is stored under the old version and never served afterwards.
+        """
+        if self.ttl <= 0:
+            return await load()
+        full_key = None
+        try:
+            full_key = await self._key(key)
+            cached = await self._get(full_key)
+            if cached is not None:
+                return cached
+        except Exception as e:
+            self._backend_error(e)
+        value = json.loads(dumps_json(await load()))
+        if full_key is not None:
+            try:
+                await get_cache_backend().set(full_key, dumps(value), self.ttl)
+            except Exception as e:
+                logger.warning(f"Cache backend unavailable, not caching '{self.name}': {e}")
+        return value
+
+    async def _get(self, full_key: str) -> Optional[Any]:
+        raw = await get_cache_backend().get(full_key)
+        CACHE_REQUESTS.labels(self.name, "miss" if raw is None else "hit").inc()
+        return None if raw is None else json.loads(raw)
+
+    def _backend_error(self, error: Exception) -> None:
+        CACHE_REQUESTS.labels(self.name, "error").inc()
+        logger.warning(f"Cache backend unavailable, treating '{self.name}' lookup as a miss: {error}")
+        return None
+
+    async def invalidate(self) -> None:
+        """Drop every key of the namespace, in all workers."""
+        try:
+            await get_cache_backend().incr(self._version_key())
+        except Exception as e:
+            logger.error(f"Could not invalidate cache '{self.name}': {e}")
@@ -0,0 +1,168 @@
+"""
+Negotiated response compression (brotli or gzip).
+
+Blog detail responses carry the full markdown and HTML, and admin/list pages
+are JSON arrays: both compress 5-10x. CompressionMiddleware picks the best
+encoding the client accepts (br when the brotli package is installed, else
+gzip) and compresses text-like responses of at least COMPRESSION_MIN_SIZE
+bytes. Smaller bodies, already encoded responses, 204/304 and binary content
+(uploaded images) pass through unchanged.
+
+Brotli runs at a low quality (default 4): close to gzip's speed with a
+better ratio, which is the right trade-off for dynamic responses.
+"""
+import zlib
+from typing import Callable, List, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from core.metrics import HTTP_COMPRESSED_BYTES
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+_COMPRESSIBLE_PREFIXES = ("text/", "application/json", "application/javascript", "application/xml", "image/svg+xml")
+
+
+def _accepted_encodings(accept_encoding: str) -> List[str]:
+    """Encodings with q > 0 from an Accept-Encoding header."""
+    accepted = []
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        if token and q > 0:
+            accepted.append(token.strip().lower())
+    return accepted
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    accepted = _accepted_encodings(accept_encoding)
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+class _Compressor:
+    """Streaming compressor with one interface for gzip and brotli."""
+
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._br = brotli.Compressor(quality=brotli_quality)
+            self._process: Callable[[bytes], bytes] = getattr(self._br, "process", None) or self._br.compress
+        else:
+            # wbits 16+ = gzip container
+            self._gz = zlib.compressobj(gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            self._process = self._gz.compress
+
+    def compress(self, data: bytes) -> bytes:
+        return self._process(data) if data else b""
+
+    def flush(self) -> bytes:
+        return self._br.flush() if self.encoding == "br" else self._gz.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._br.finish() if self.encoding == "br" else self._gz.flush(zlib.Z_FINISH)
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing responses for clients that send Accept-Encoding."""
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope.get("method") == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = _CompressingResponder(send, encoding, self)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressingResponder:
+    def __init__(self, send: Send, encoding: str, config: CompressionMiddleware):
+        self._send = send
+        self._encoding = encoding
+        self._config = config
+        self._start: Optional[Message] = None
+        self._compressor: Optional[_Compressor] = None
+        self._passthrough = False
+        self._sizes: Tuple[int, int] = (0, 0)  # raw, compressed
+
+    def _compressible(self, headers: Headers) -> bool:
+        if self._start["status"] in (204, 304) or "content-encoding" in headers:
+            return False
+        content_type = headers.get("content-type", "").lower()
+        return content_type.startswith(_COMPRESSIBLE_PREFIXES)
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self._start = message
+            return
+        if message["type"] != "http.response.body" or self._passthrough:
+            await self._send(message)
+            return
+
+        body: bytes = message.get("body", b"")
+        more_body: bool = message.get("more_body", False)
+
+        if self._compressor is None:
+            headers = MutableHeaders(raw=self._start["headers"])
+            if not self._compressible(headers):
+                self._passthrough = True
+                await self._send(self._start)
+                await self._send(message)
+                return
+            headers.add_vary_header("Accept-Encoding")
+            if not more_body and len(body) < self._config.minimum_size:
+                self._passthrough = True
+                await self._send(self._start)
+                await self._send(message)
+                return
+            self._compressor = _Compressor(self._encoding, self._config.gzip_level, self._config.brotli_quality)
+            headers["Content-Encoding"] = self._encoding
+            if not more_body:
+                # Whole body at once: compress it and send a Content-Length
+                compressed = self._compressor.compress(body) + self._compressor.finish()
+                headers["Content-Length"] = str(len(compressed))
+                self._record(len(body), len(compressed))
+                await self._send(self._start)
+                await self._send({"type": "http.response.body", "body": compressed})
+                return
+            # Streaming: length is unknown until the end
+            if "content-length" in headers:
+                del headers["Content-Length"]
+            await self._send(self._start)
+
+        chunk = self._compressor.compress(body)
+        chunk += self._compressor.flush() if more_body else self._compressor.finish()
+        raw, compressed = self._sizes
+        self._sizes = (raw + len(body), compressed + len(chunk))
+        if not more_body:
+            self._record(*self._sizes)
+        await self._send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+    def _record(self, raw: int, compressed: int) -> None:
+        HTTP_COMPRESSED_BYTES.labels(self._encoding, "raw").inc(raw)
+        HTTP_COMPRESSED_BYTES.labels(self._encoding, "compressed").inc(compressed)
+
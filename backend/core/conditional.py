@@ -0,0 +1,90 @@
+"""
+Conditional GET support: weak ETags, Last-Modified and 304 Not Modified.
+
+The frontend polls blog and image endpoints on every tab focus. Responses
+carry a weak ETag (and Last-Modified when the resource has an updated_at),
+with Cache-Control: no-cache so browsers revalidate instead of reusing them
+blindly. A request whose If-None-Match (or, without it, If-Modified-Since)
+still matches gets an empty 304 instead of the full body.
+
+ETags are either derived from the document's updated_at (single blog: decided
+before the heavy body is read) or a hash of the response body (lists).
+
+Usage in a route (the injected Response carries the headers on a 200):
+
+    return respond_conditionally(request, response, body, etag=content_etag(body))
+"""
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Optional
+
+from fastapi import Request, Response
+
+from core.responses import dumps_json
+
+
+def weak_etag(*parts: Any) -> str:
+    """Weak ETag from version identifiers (document ID, updated_at, ...)."""
+    digest = hashlib.blake2b("\x1f".join(str(p) for p in parts).encode(), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+
+def content_etag(body: Any) -> str:
+    """Weak ETag from a hash of the JSON-encoded response body."""
+    digest = hashlib.blake2b(dumps_json(body), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+
+def _as_utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison (RFC 9110 13.1.2): W/ prefixes are ignored."""
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in if_none_match.split(","))
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime] = None) -> bool:
+    """True when the client's cached copy (If-None-Match / If-Modified-Since) is current."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = _as_utc(parsedate_to_datetime(if_modified_since))
+        except (TypeError, ValueError):
+            return False
+        # HTTP dates have one-second resolution
+        return _as_utc(last_modified).replace(microsecond=0) <= since
+    return False
+
+
+def validator_headers(etag: str, last_modified: Optional[datetime] = None, public: bool = False) -> dict:
+    headers = {"ETag": etag, "Cache-Control": f"{'public' if public else 'private'}, no-cache"}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(_as_utc(last_modified), usegmt=True)
+    return headers
+
+
+def not_modified_response(etag: str, last_modified: Optional[datetime] = None, public: bool = False) -> Response:
+    return Response(status_code=304, headers=validator_headers(etag, last_modified, public))
+
+
+def respond_conditionally(
+    request: Request,
+    response: Response,
+    body: Any,
+    etag: str,
+    last_modified: Optional[datetime] = None,
+    public: bool = False,
+) -> Any:
+    """Return a 304 if the client's copy is current, else body with validator headers set."""
+    if is_not_modified(request, etag, last_modified):
+        return not_modified_response(etag, last_modified, public)
+    response.headers.update(validator_headers(etag, last_modified, public))
+    return body
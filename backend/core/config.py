@@ -43,5 +43,96 @@ class Settings:
     OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY", "")
     OPENAI_TEXT_MODEL: str = os.getenv("OPENAI_TEXT_MODEL", "gpt-4o")
     OPENAI_IMAGE_MODEL: str = os.getenv("OPENAI_IMAGE_MODEL", "dall-e-3")
+    IMAGE_OUTPUT_FORMAT: str = os.getenv("IMAGE_OUTPUT_FORMAT", "")  # png | jpeg | webp; empty = keep provider encoding
+
+    # Prompt size (estimated tokens); reference links, intro and outline are cut to fit
+    PROMPT_TOKEN_BUDGET: int = int(os.getenv("PROMPT_TOKEN_BUDGET", "0"))  # 0 = per-model default
+
+    # Final blog generation: "single" (one LLM call) or "sections" (intro/sections/conclusion in parallel)
+    BLOG_GENERATION_MODE: str = os.getenv("BLOG_GENERATION_MODE", "single")
+    BLOG_SECTION_CONCURRENCY: int = int(os.getenv("BLOG_SECTION_CONCURRENCY", "6"))  # parallel LLM calls per blog
+
+    # Session context (stable prompt prefix) handles reused across wizard steps
+    PROMPT_CONTEXT_CACHE_SIZE: int = int(os.getenv("PROMPT_CONTEXT_CACHE_SIZE", "512"))
+    PROMPT_CONTEXT_TTL_SECONDS: int = int(os.getenv("PROMPT_CONTEXT_TTL_SECONDS", "3600"))
+    GEMINI_CONTEXT_CACHE: bool = os.getenv("GEMINI_CONTEXT_CACHE", "false").lower() == "true"  # explicit CachedContent
+    GEMINI_CONTEXT_CACHE_MIN_TOKENS: int = int(os.getenv("GEMINI_CONTEXT_CACHE_MIN_TOKENS", "1024"))
+
+    # Outbound HTTP (shared pooled client for OpenAI, google-genai images and downloads)
+    HTTP2_ENABLED: bool = os.getenv("HTTP2_ENABLED", "true").lower() == "true"  # needs the h2 package
+    HTTP_MAX_CONNECTIONS: int = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+    HTTP_MAX_KEEPALIVE: int = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+    HTTP_KEEPALIVE_EXPIRY_SECONDS: float = float(os.getenv("HTTP_KEEPALIVE_EXPIRY_SECONDS", "60"))
+    HTTP_TIMEOUT_SECONDS: float = float(os.getenv("HTTP_TIMEOUT_SECONDS", "120"))
+    HTTP_CONNECT_TIMEOUT_SECONDS: float = float(os.getenv("HTTP_CONNECT_TIMEOUT_SECONDS", "10"))
+    HTTP_MAX_DOWNLOAD_MB: int = int(os.getenv("HTTP_MAX_DOWNLOAD_MB", "25"))
+
+    # Response compression (br needs the brotli package, else gzip)
+    COMPRESSION_ENABLED: bool = os.getenv("COMPRESSION_ENABLED", "true").lower() == "true"
+    COMPRESSION_MIN_SIZE: int = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))  # bytes
+    COMPRESSION_GZIP_LEVEL: int = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+    COMPRESSION_BROTLI_QUALITY: int = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+
+    # Executor pools (workers = concurrent jobs, queue = jobs allowed to wait before 503)
+    THREAD_POOL_WORKERS: int = int(os.getenv("THREAD_POOL_WORKERS", "32"))  # default loop executor
+    EXECUTOR_DB_WORKERS: int = int(os.getenv("EXECUTOR_DB_WORKERS", "32"))
+    EXECUTOR_DB_QUEUE: int = int(os.getenv("EXECUTOR_DB_QUEUE", "256"))
+    EXECUTOR_STORAGE_WORKERS: int = int(os.getenv("EXECUTOR_STORAGE_WORKERS", "16"))
+    EXECUTOR_STORAGE_QUEUE: int = int(os.getenv("EXECUTOR_STORAGE_QUEUE", "64"))
+    EXECUTOR_LLM_WORKERS: int = int(os.getenv("EXECUTOR_LLM_WORKERS", "32"))
+    EXECUTOR_LLM_QUEUE: int = int(os.getenv("EXECUTOR_LLM_QUEUE", "64"))
+    EXECUTOR_IMAGING_WORKERS: int = int(os.getenv("EXECUTOR_IMAGING_WORKERS", "0"))  # 0 = CPU count
+    EXECUTOR_IMAGING_QUEUE: int = int(os.getenv("EXECUTOR_IMAGING_QUEUE", "32"))
+
+    # Startup warm-up and /ready probe
+    WARMUP_ENABLED: bool = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+    WARMUP_TIMEOUT_SECONDS: float = float(os.getenv("WARMUP_TIMEOUT_SECONDS", "20"))  # per check
+    READY_CHECK_TTL_SECONDS: float = float(os.getenv("READY_CHECK_TTL_SECONDS", "10"))  # Firestore re-ping interval
+
+    # Graceful shutdown (keep uvicorn --timeout-graceful-shutdown at DRAIN_TIMEOUT_SECONDS)
+    DRAIN_TIMEOUT_SECONDS: float = float(os.getenv("DRAIN_TIMEOUT_SECONDS", "60"))  # from SIGTERM
+    DRAIN_RETRY_AFTER_SECONDS: int = int(os.getenv("DRAIN_RETRY_AFTER_SECONDS", "10"))
+    JOB_RESUME_ENABLED: bool = os.getenv("JOB_RESUME_ENABLED", "true").lower() == "true"
+    JOB_RESUME_BATCH: int = int(os.getenv("JOB_RESUME_BATCH", "20"))  # interrupted jobs claimed per worker start
+    JOB_MAX_ATTEMPTS: int = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+
+    # Shared cache (coherent across workers; see core.cache)
+    CACHE_BACKEND: str = os.getenv("CACHE_BACKEND", "memory")  # memory | sqlite | redis
+    CACHE_SQLITE_PATH: str = os.getenv("CACHE_SQLITE_PATH", "cache/cms-cache.sqlite3")
+    CACHE_PREFIX: str = os.getenv("CACHE_PREFIX", "cms:cache:")
+    PUBLIC_BLOGS_CACHE_TTL_SECONDS: float = float(os.getenv("PUBLIC_BLOGS_CACHE_TTL_SECONDS", "30"))  # 0 = off
+    REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")  # rate limits and shared cache
+
+    # Blog revision history (deltas against the previous version, a full snapshot every N versions)
+    REVISION_SNAPSHOT_INTERVAL: int = max(1, int(os.getenv("REVISION_SNAPSHOT_INTERVAL", "10")))
+
+    # Background tasks (durable local queue shared by the workers of a host; see core.tasks)
+    TASK_QUEUE_PATH: str = os.getenv("TASK_QUEUE_PATH", "cache/cms-tasks.sqlite3")
+    TASK_WORKER_ENABLED: bool = os.getenv("TASK_WORKER_ENABLED", "true").lower() == "true"
+    TASK_CONCURRENCY: int = int(os.getenv("TASK_CONCURRENCY", "4"))  # tasks run at once per worker process
+    TASK_POLL_INTERVAL_SECONDS: float = float(os.getenv("TASK_POLL_INTERVAL_SECONDS", "2"))
+    TASK_TIMEOUT_SECONDS: float = float(os.getenv("TASK_TIMEOUT_SECONDS", "120"))
+    TASK_LEASE_SECONDS: float = float(os.getenv("TASK_LEASE_SECONDS", "300"))  # > timeout; expired = worker died
+    TASK_MAX_ATTEMPTS: int = int(os.getenv("TASK_MAX_ATTEMPTS", "5"))
+    TASK_RETRY_BASE_SECONDS: float = float(os.getenv("TASK_RETRY_BASE_SECONDS", "5"))  # doubled per attempt
+    TASK_RETENTION_HOURS: float = float(os.getenv("TASK_RETENTION_HOURS", "168"))  # finished tasks kept
+    # Published artifacts (static pages, sitemap, RSS) link to the frontend
+    SITE_URL: str = os.getenv("SITE_URL", "")  # defaults to PUBLIC_BASE_URL
+    SITE_NAME: str = os.getenv("SITE_NAME", "Blog")  # RSS channel title
+    SITE_BLOG_PATH: str = os.getenv("SITE_BLOG_PATH", "/blogs/{id}")
+    THUMBNAIL_WIDTH: int = int(os.getenv("THUMBNAIL_WIDTH", "480"))
+
+    # Rate limiting / AI quotas (per user, or per IP for anonymous requests)
+    RATE_LIMIT_ENABLED: bool = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+    RATE_LIMIT_BACKEND: str = os.getenv("RATE_LIMIT_BACKEND", "memory")  # memory | redis
+    TRUST_PROXY_HEADERS: bool = os.getenv("TRUST_PROXY_HEADERS", "false").lower() == "true"  # use X-Forwarded-For
+    TRUSTED_PROXY_HOPS: int = int(os.getenv("TRUSTED_PROXY_HOPS", "1"))  # proxies in front of the app that append to it
+    AI_RATE_LIMIT_PER_MINUTE: float = float(os.getenv("AI_RATE_LIMIT_PER_MINUTE", "20"))  # per route
+    AI_RATE_LIMIT_BURST: int = int(os.getenv("AI_RATE_LIMIT_BURST", "5"))
+    AI_DAILY_QUOTA: int = int(os.getenv("AI_DAILY_QUOTA", "300"))  # cost units per day, 0 = unlimited
+
+    # Tracing (X-Firestore-* debug headers are sent to clients: opt in, e.g. in local development)
+    TRACE_HEADERS: bool = os.getenv("TRACE_HEADERS", "false").lower() == "true"
+    TRACING_EXPORT_FILE: str = os.getenv("TRACING_EXPORT_FILE", "")  # JSON-lines span file, needs opentelemetry-sdk
 
 settings = Settings()
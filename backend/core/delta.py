@@ -0,0 +1,106 @@
+"""
+Compact deltas between two JSON-like values (dicts, lists, strings, scalars).
+
+Used for blog revision history: each revision stores the delta from the
+previous version instead of a full copy. Blog content is mostly a few long
+strings (markdown, html, section bodies) and short lists, so:
+- dicts are diffed key by key; unchanged keys are omitted
+- long or multi-line strings are diffed line by line
+- lists are diffed item by item
+- anything else is replaced whole
+
+Line and item diffs are lists of ops: {"=": [i, j]} copies old[i:j], {"+": x}
+inserts x (a string, or a list of items). Deltas are serialized with
+pack()/unpack() as zlib-compressed JSON.
+
+    delta = make_delta(old, new)
+    assert apply_delta(old, delta) == new
+"""
+import json
+import zlib
+from difflib import SequenceMatcher
+from typing import Any, Dict, List, Optional
+
+from core.responses import dumps_json
+
+# Strings shorter than this (and without newlines) are replaced whole
+TEXT_DIFF_MIN_LENGTH = 200
+
+
+def _sequence_ops(old: List[Any], new: List[Any], keys_old: List[Any], keys_new: List[Any], join) -> List[Dict[str, Any]]:
+    ops: List[Dict[str, Any]] = []
+    matcher = SequenceMatcher(None, keys_old, keys_new, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            ops.append({"=": [i1, i2]})
+        elif j2 > j1:
+            ops.append({"+": join(new[j1:j2])})
+    return ops
+
+
+def _apply_sequence_ops(old: List[Any], ops: List[Dict[str, Any]], split) -> List[Any]:
+    out: List[Any] = []
+    for op in ops:
+        if "=" in op:
+            start, end = op["="]
+            out.extend(old[start:end])
+        else:
+            out.extend(split(op["+"]))
+    return out
+
+
+def _item_key(item: Any) -> str:
+    return dumps_json(item).decode("utf-8")
+
+
+def make_delta(old: Any, new: Any) -> Optional[Dict[str, Any]]:
+    """Delta turning old into new, or None when they are equal."""
+    if old == new:
+        return None
+    if isinstance(old, dict) and isinstance(new, dict):
+        changed = {}
+        for key, value in new.items():
+            if key in old:
+                sub = make_delta(old[key], value)
+                if sub is not None:
+                    changed[key] = sub
+            else:
+                changed[key] = {"v": value}
+        delta: Dict[str, Any] = {"d": changed}
+        removed = [key for key in old if key not in new]
+        if removed:
+            delta["x"] = removed
+        return delta
+    if isinstance(old, str) and isinstance(new, str) and (
+        len(old) >= TEXT_DIFF_MIN_LENGTH or "\n" in old
+    ):
+        old_lines, new_lines = old.splitlines(keepends=True), new.splitlines(keepends=True)
+        return {"s": _sequence_ops(old_lines, new_lines, old_lines, new_lines, "".join)}
+    if isinstance(old, list) and isinstance(new, list):
+        return {"l": _sequence_ops(old, new, [_item_key(i) for i in old], [_item_key(i) for i in new], list)}
+    return {"v": new}
+
+
+def apply_delta(old: Any, delta: Optional[Dict[str, Any]]) -> Any:
+    """Apply a make_delta() result to old (which is not modified)."""
+    if delta is None:
+        return old
+    if "v" in delta:
+        return delta["v"]
+    if "d" in delta:
+        out = {key: value for key, value in old.items() if key not in delta.get("x", ())}
+        for key, sub in delta["d"].items():
+            out[key] = apply_delta(old.get(key), sub)
+        return out
+    if "s" in delta:
+        return "".join(_apply_sequence_ops(old.splitlines(keepends=True), delta["s"], lambda text: [text]))
+    return _apply_sequence_ops(old, delta["l"], list)
+
+
+def pack(value: Any) -> bytes:
+    """zlib-compressed JSON (for snapshots and deltas stored in Firestore)."""
+    return zlib.compress(dumps_json(value), 6)
+
+
+def unpack(data: bytes) -> Any:
+    return json.loads(zlib.decompress(data))
@@ -1,4 +1,5 @@
-from fastapi import Header, HTTPException, Depends
+from fastapi import Header, HTTPException, Depends, Request
+from typing import Optional
 import os
 import logging
 
@@ -8,23 +9,50 @@ from core.config import settings
 from core.verify import decode_token
 from utils.firebase_auth import verify_firebase_token, initialize_firebase
 from core.firestore_db import get_db
+from core.executors import run_in_executor, ExecutorSaturated
+from core.metrics import firestore_op, record_firestore
 
 logger = logging.getLogger(__name__)
 
-# Initialize Firebase
-try:
-    initialize_firebase()
-    FIREBASE_AVAILABLE = True
-except Exception as e:
-    logger.warning(f"Firebase initialization failed: {e}")
-    FIREBASE_AVAILABLE = False
+# Firebase Admin SDK is initialized on first use, not at import (faster worker startup)
+_firebase_available: Optional[bool] = None
 
 
-async def get_current_user(authorization: str = Header(default="")):
+def firebase_available() -> bool:
+    """Initialize Firebase on first call; False if it cannot be initialized."""
+    global _firebase_available
+    if _firebase_available is None:
+        try:
+            initialize_firebase()
+            _firebase_available = True
+        except Exception as e:
+            logger.warning(f"Firebase initialization failed: {e}")
+            _firebase_available = False
+    return _firebase_available
+
+
+@firestore_op("find_user_doc")
+def _find_user_doc(firebase_uid: str):
+    """Look up the users document for a Firebase UID (blocking Firestore call)."""
+    db = get_db()
+    users_collection = db.collection('users')
+    from google.cloud.firestore_v1.base_query import FieldFilter
+    user_docs = list(users_collection.where(filter=FieldFilter('firebase_uid', '==', firebase_uid)).limit(1).stream())
+    record_firestore(reads=len(user_docs))
+    return user_docs[0] if user_docs else None
+
+
+async def get_current_user(request: Request, authorization: str = Header(default="")):
     """
     Get current user from Firebase token and Firestore.
     Uses the same Firestore users collection as main dashboard.
+    The result is cached on request.state, so get_optional_user and
+    get_current_user resolve the user only once per request.
     """
+    cached = getattr(request.state, "current_user", None)
+    if cached is not None:
+        return cached
+
     if not authorization.startswith("Bearer "):
         logger.warning("Missing Bearer token in authorization header")
         raise HTTPException(status_code=401, detail="Missing token")
@@ -41,7 +69,7 @@ async def get_current_user(authorization: str = Header(default="")):
     
     
     if not payload:
-        if not FIREBASE_AVAILABLE:
+        if not firebase_available():
             logger.error("Firebase Admin SDK not available")
             raise HTTPException(
                 status_code=401, 
@@ -66,7 +94,7 @@ async def get_current_user(authorization: str = Header(default="")):
     
     if not payload:
         error_detail = "Invalid or expired token"
-        if not FIREBASE_AVAILABLE:
+        if not firebase_available():
             error_detail += " (Firebase Admin SDK not available - check Firebase credentials configuration)"
         logger.warning(f"Token verification failed: {error_detail}")
         raise HTTPException(status_code=401, detail=error_detail)
@@ -80,13 +108,8 @@ async def get_current_user(authorization: str = Header(default="")):
     
    
     try:
-        db = get_db()
-        users_collection = db.collection('users')
-        
-        # Query Firestore for user by firebase_uid
-        from google.cloud.firestore_v1.base_query import FieldFilter
-        user_docs = list(users_collection.where(filter=FieldFilter('firebase_uid', '==', firebase_uid)).limit(1).stream())
-        user_doc = user_docs[0] if user_docs else None
+        # Query Firestore for user by firebase_uid (on the db pool, off the event loop)
+        user_doc = await run_in_executor("db", _find_user_doc, firebase_uid)
         
         if not user_doc:
             logger.warning(f"User with firebase_uid {firebase_uid} not found in Firestore")
@@ -105,19 +128,33 @@ async def get_current_user(authorization: str = Header(default="")):
         
         logger.info(f"User authenticated: {firebase_uid}, email: {email}, is_superuser: {is_superuser}, role: {role}")
         
-        return {
+        user = {
             "id": user_doc.id,  # Firestore document ID
             "name": user_data.get('username') or user_data.get('display_name') or payload.get("name", ""),
             "email": user_data.get('email') or email,
             "role": role,
         }
-    except HTTPException:
+        request.state.current_user = user
+        return user
+    except (HTTPException, ExecutorSaturated):
         raise
     except Exception as e:
         logger.error(f"Error querying Firestore for user {firebase_uid}: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Database error")
 
 
+async def get_optional_user(request: Request, authorization: str = Header(default="")):
+    """
+    Current user if the request carries a valid token, otherwise None.
+    Used where authentication is optional (e.g. to key rate limits by user instead of IP).
+    """
+    if not authorization.startswith("Bearer "):
+        return None
+    try:
+        return await get_current_user(request, authorization)
+    except HTTPException:
+        return None
+
 
 async def require_admin(user=Depends(get_current_user)):
     """
@@ -0,0 +1,191 @@
+"""
+Named, bounded executors for blocking work.
+
+Instead of one huge default thread pool shared by everything, blocking work is
+routed to a pool sized for its workload:
+
+- db:      Firestore I/O (auth lookups, queries, writes)
+- storage: GCS uploads and local file writes
+- llm:     blocking Gemini/OpenAI SDK calls (text and image generation)
+- imaging: CPU-bound Pillow work, run in a process pool to avoid the GIL
+
+Every pool has admission control: at most max_workers jobs run and at most
+max_queue jobs wait. Further submissions fail fast with ExecutorSaturated,
+which the API turns into 503 + Retry-After instead of letting requests pile up.
+"""
+import asyncio
+import contextvars
+import functools
+import logging
+import os
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ExecutorSaturated(Exception):
+    """Raised when a pool is full (all workers busy and its queue at capacity)."""
+
+    def __init__(self, name: str, retry_after: int):
+        super().__init__(f"Executor '{name}' is saturated")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class BoundedExecutor:
+    """
+    Thread or process pool with a bounded queue and simple counters.
+
+    queue_depth = jobs submitted but not yet started (approximated as
+    in-flight jobs beyond max_workers).
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queue: int, kind: str = "thread", retry_after: int = 5):
+        self.name = name
+        self.kind = kind
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        self._lock = threading.Lock()
+        self._inflight = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        if kind == "process":
+            self._executor: Executor = ProcessPoolExecutor(max_workers=max_workers)
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"{name}-pool")
+
+    @property
+    def inflight(self) -> int:
+        return self._inflight
+
+    @property
+    def queue_depth(self) -> int:
+        return max(0, self._inflight - self.max_workers)
+
+    def submit(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+        with self._lock:
+            if self._inflight >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise ExecutorSaturated(self.name, self.retry_after)
+            self._inflight += 1
+            self.submitted += 1
+
+        if self.kind == "thread":
+            # Propagate contextvars (request-scoped state) into the worker thread
+            ctx = contextvars.copy_context()
+            call = functools.partial(ctx.run, fn, *args, **kwargs)
+        else:
+            call = functools.partial(fn, *args, **kwargs)
+        try:
+            future = self._executor.submit(call)
+        except Exception:
+            self._done(None)
+            raise
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, future: Optional[Future]) -> None:
+        with self._lock:
+            self._inflight -= 1
+            if future is not None and not future.cancelled() and future.exception() is None:
+                self.completed += 1
+            else:
+                self.failed += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "kind": self.kind,
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "inflight": self._inflight,
+            "queue_depth": self.queue_depth,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self, wait: bool = True, cancel_futures: bool = False) -> None:
+        self._executor.shutdown(wait=wait, cancel_futures=cancel_futures)
+
+
+# name -> (kind, workers, queue)
+def _pool_config() -> Dict[str, tuple]:
+    return {
+        "db": ("thread", settings.EXECUTOR_DB_WORKERS, settings.EXECUTOR_DB_QUEUE),
+        "storage": ("thread", settings.EXECUTOR_STORAGE_WORKERS, settings.EXECUTOR_STORAGE_QUEUE),
+        "llm": ("thread", settings.EXECUTOR_LLM_WORKERS, settings.EXECUTOR_LLM_QUEUE),
+        "imaging": ("process", settings.EXECUTOR_IMAGING_WORKERS or (os.cpu_count() or 1), settings.EXECUTOR_IMAGING_QUEUE),
+    }
+
+
+_executors: Dict[str, BoundedExecutor] = {}
+_executors_lock = threading.Lock()
+
+
+def get_executor(name: str) -> BoundedExecutor:
+    """Get (lazily creating) the named executor."""
+    executor = _executors.get(name)
+    if executor is None:
+        with _executors_lock:
+            executor = _executors.get(name)
+            if executor is None:
+                kind, workers, queue = _pool_config()[name]
+                executor = BoundedExecutor(name, max_workers=workers, max_queue=queue, kind=kind)
+                _executors[name] = executor
+                logger.info(f"Executor '{name}' started: kind={kind} max_workers={workers} max_queue={queue}")
+    return executor
+
+
+async def run_in_executor(name: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Run a blocking callable on the named executor and await its result."""
+    return await asyncio.wrap_future(get_executor(name).submit(fn, *args, **kwargs))
+
+
+def executor_stats() -> Dict[str, Dict[str, Any]]:
+    """Counters and queue depth for every started executor."""
+    return {name: executor.stats() for name, executor in list(_executors.items())}
+
+
+def start_executors() -> None:
+    """Create all executors up front (called from the app lifespan)."""
+    for name in _pool_config():
+        get_executor(name)
+
+
+async def drain_executors(timeout: float, *others: Executor) -> bool:
+    """
+    Shut the pools (and any extra executors) down without abandoning running jobs.
+
+    Queued jobs are cancelled; running ones get up to timeout seconds to finish.
+    Returns True if every pool finished in time.
+    """
+    with _executors_lock:
+        executors = [*_executors.values(), *others]
+        _executors.clear()
+    threads = [
+        threading.Thread(target=executor.shutdown, kwargs={"wait": True, "cancel_futures": True}, daemon=True)
+        for executor in executors
+    ]
+    for thread in threads:
+        thread.start()
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while any(thread.is_alive() for thread in threads) and loop.time() < deadline:
+        await asyncio.sleep(0.05)
+    return not any(thread.is_alive() for thread in threads)
+
+
+def shutdown_executors(wait: bool = False) -> None:
+    with _executors_lock:
+        executors = list(_executors.values())
+        _executors.clear()
+    for executor in executors:
+        executor.shutdown(wait=wait)
@@ -0,0 +1,103 @@
+"""
+Shared, pooled HTTP client for outbound calls.
+
+One httpx.Client per process (HTTP/2 when the h2 package is installed, bounded
+keep-alive pool) is reused by:
+
+- the OpenAI SDK (text and image generation), via http_client=
+- the google-genai image client, via HttpOptions(httpx_client=)
+- image downloads (stream_download), written to disk chunk by chunk
+
+so connections and TLS sessions are reused instead of a handshake per call.
+The client is synchronous because every outbound call already runs on an
+executor thread (see core.executors); httpx.Client is thread-safe.
+
+google-generativeai (text) and google-cloud-storage/firestore bring their own
+gRPC/HTTP transports and keep using them.
+
+The client is created on first use and closed by close_http_client() in the
+app lifespan.
+"""
+import logging
+import os
+import threading
+from typing import Optional
+
+import httpx
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+_client: Optional[httpx.Client] = None
+_client_lock = threading.Lock()
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def get_http_client() -> httpx.Client:
+    """Get (lazily creating) the process-wide pooled client."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                http2 = settings.HTTP2_ENABLED and _http2_available()
+                _client = httpx.Client(
+                    http2=http2,
+                    limits=httpx.Limits(
+                        max_connections=settings.HTTP_MAX_CONNECTIONS,
+                        max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE,
+                        keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY_SECONDS,
+                    ),
+                    timeout=httpx.Timeout(settings.HTTP_TIMEOUT_SECONDS, connect=settings.HTTP_CONNECT_TIMEOUT_SECONDS),
+                    follow_redirects=True,
+                )
+                logger.info(f"Shared HTTP client created (http2={http2}, max_connections={settings.HTTP_MAX_CONNECTIONS})")
+    return _client
+
+
+def close_http_client() -> None:
+    """Close the shared client and its pooled connections (app shutdown)."""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+
+
+def stream_download(url: str, path: str, max_bytes: Optional[int] = None) -> int:
+    """
+    Download url to path without holding the body in memory; returns the bytes written.
+
+    The body goes to "<path>.part" first and is renamed on success, so readers
+    never see a partial file. Raises RuntimeError past max_bytes
+    (default HTTP_MAX_DOWNLOAD_MB).
+    """
+    limit = max_bytes if max_bytes is not None else settings.HTTP_MAX_DOWNLOAD_MB * 1024 * 1024
+    tmp_path = f"{path}.part"
+    written = 0
+    try:
+        with get_http_client().stream("GET", url) as response:
+            response.raise_for_status()
+            with open(tmp_path, "wb") as f:
+                for chunk in response.iter_bytes(DOWNLOAD_CHUNK_SIZE):
+                    written += len(chunk)
+                    if written > limit:
+                        raise RuntimeError(f"Download exceeds {limit} bytes: {url}")
+                    f.write(chunk)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+    return written
@@ -0,0 +1,232 @@
+"""
+Long-running job tracking, drain mode and resumption after restarts.
+
+AI generations and image uploads run for seconds to minutes. During a deploy
+the worker gets SIGTERM and, without coordination, abandons them: the user
+retries and pays for the LLM call twice. Instead:
+
+1. SIGTERM/SIGINT (or lifespan shutdown) puts the worker in drain mode:
+   /ready turns 503 so load balancers stop routing here, and new long-running
+   jobs are refused with 503 + Retry-After (ServiceDraining).
+2. Jobs already running get until DRAIN_TIMEOUT_SECONDS (counted from the
+   signal) to finish. Run uvicorn with --timeout-graceful-shutdown of the same
+   length so their requests are not cancelled earlier.
+3. Jobs still running at the deadline are saved to the Firestore jobs
+   collection when they are resumable (their result is stored server side,
+   e.g. an image saved to the gallery); the others are only counted.
+4. On startup, after warm-up, each worker claims interrupted jobs and re-runs
+   them through the resumer registered for their kind.
+
+Handlers wrap their work in `async with job_tracker.track(kind, ...)`.
+"""
+import asyncio
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from core.config import settings
+from core.executors import run_in_executor
+from core.metrics import JOBS_INTERRUPTED, JOBS_REJECTED, JOBS_RESUMED
+from core.readiness import readiness
+
+logger = logging.getLogger(__name__)
+
+
+class ServiceDraining(Exception):
+    """Raised when a long-running job is submitted to a worker that is shutting down."""
+
+    def __init__(self, kind: str, retry_after: int):
+        super().__init__(f"Worker is draining, refusing job '{kind}'")
+        self.kind = kind
+        self.retry_after = retry_after
+
+
+class Job:
+    """One tracked in-flight job."""
+
+    def __init__(self, kind: str, owner_id: str, payload: Optional[Dict[str, Any]], resumable: bool,
+                 job_id: Optional[str] = None):
+        self.id = job_id or uuid.uuid4().hex
+        self.kind = kind
+        self.owner_id = owner_id
+        self.payload = payload or {}
+        self.resumable = resumable
+        self.created_at = datetime.utcnow()
+
+    def as_record(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "owner_id": self.owner_id,
+            "payload": self.payload,
+            "created_at": self.created_at,
+        }
+
+
+class JobTracker:
+    """In-flight jobs of this worker. Only touched from the event loop thread."""
+
+    def __init__(self):
+        self.draining = False
+        self._drain_started: Optional[float] = None
+        self._jobs: Dict[str, Job] = {}
+        self._interrupted: Dict[str, Job] = {}
+
+    @asynccontextmanager
+    async def track(self, kind: str, owner_id: str = "", payload: Optional[Dict[str, Any]] = None,
+                    resumable: bool = False, job_id: Optional[str] = None) -> AsyncIterator[Job]:
+        """Register a job for the duration of the block; refuses new jobs while draining."""
+        if self.draining:
+            JOBS_REJECTED.labels(kind).inc()
+            raise ServiceDraining(kind, settings.DRAIN_RETRY_AFTER_SECONDS)
+        job = Job(kind, owner_id, payload, resumable, job_id)
+        self._jobs[job.id] = job
+        try:
+            yield job
+        except asyncio.CancelledError:
+            # The server gave up waiting for the request: keep the job for persisting
+            if self.draining:
+                self._interrupted[job.id] = job
+            raise
+        finally:
+            self._jobs.pop(job.id, None)
+
+    def begin_drain(self) -> None:
+        if not self.draining:
+            self.draining = True
+            self._drain_started = time.monotonic()
+
+    def remaining(self) -> float:
+        """Seconds left until the drain deadline."""
+        if self._drain_started is None:
+            return float(settings.DRAIN_TIMEOUT_SECONDS)
+        return max(0.0, settings.DRAIN_TIMEOUT_SECONDS - (time.monotonic() - self._drain_started))
+
+    async def wait_idle(self) -> bool:
+        """Wait until no job is running or the drain deadline passes; True if idle."""
+        while self._jobs and self.remaining() > 0:
+            await asyncio.sleep(0.1)
+        return not self._jobs
+
+    def unfinished(self) -> List[Job]:
+        return list({**self._interrupted, **self._jobs}.values())
+
+    def stats(self) -> Dict[str, Any]:
+        inflight: Dict[str, int] = {}
+        for job in self._jobs.values():
+            inflight[job.kind] = inflight.get(job.kind, 0) + 1
+        return {"draining": self.draining, "inflight": inflight, "interrupted": len(self._interrupted)}
+
+
+job_tracker = JobTracker()
+
+
+def begin_drain() -> None:
+    """Enter drain mode: /ready reports 503 and new long-running jobs are refused."""
+    if not job_tracker.draining:
+        print(f"✅ Draining: refusing new jobs, waiting up to {settings.DRAIN_TIMEOUT_SECONDS}s for in-flight ones")
+    job_tracker.begin_drain()
+    readiness.draining = True
+
+
+def install_drain_signal_handlers() -> None:
+    """
+    Start draining as soon as SIGTERM/SIGINT arrives, then let the server's own
+    handler run (uvicorn stops accepting connections and waits for requests).
+    """
+    if threading.current_thread() is not threading.main_thread():
+        return
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        previous = signal.getsignal(sig)
+
+        def handler(signum, frame, previous=previous):
+            begin_drain()
+            if callable(previous):
+                previous(signum, frame)
+            else:
+                signal.signal(signum, previous)
+                signal.raise_signal(signum)
+
+        signal.signal(sig, handler)
+
+
+# ---------------- persisting and resuming ----------------
+Resumer = Callable[[Dict[str, Any]], Awaitable[None]]
+_resumers: Dict[str, Resumer] = {}
+
+
+def register_resumer(kind: str, resumer: Resumer) -> None:
+    """Register how to re-run an interrupted job of this kind (receives the stored job)."""
+    _resumers[kind] = resumer
+
+
+def _worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+async def persist_unfinished_jobs() -> int:
+    """Save resumable jobs that did not finish before the drain deadline."""
+    from app.models.firestore_db import save_interrupted_jobs
+
+    records = []
+    for job in job_tracker.unfinished():
+        resumable = job.resumable and job.kind in _resumers
+        JOBS_INTERRUPTED.labels(job.kind, "persisted" if resumable else "dropped").inc()
+        if resumable:
+            records.append(job.as_record())
+        else:
+            logger.warning(f"Job {job.id} ({job.kind}) interrupted by shutdown and cannot be resumed")
+    if not records:
+        return 0
+    try:
+        return await run_in_executor("db", save_interrupted_jobs, records)
+    except Exception as e:
+        logger.error(f"Could not persist {len(records)} interrupted job(s): {e}")
+        return 0
+
+
+async def resume_interrupted_jobs() -> int:
+    """Claim and re-run jobs interrupted by a previous shutdown; returns jobs resumed."""
+    from app.models.firestore_db import claim_interrupted_jobs, finish_job
+
+    try:
+        jobs = await run_in_executor("db", claim_interrupted_jobs, settings.JOB_RESUME_BATCH, _worker_id())
+    except Exception as e:
+        logger.error(f"Could not load interrupted jobs: {e}")
+        return 0
+
+    async def _resume(stored: Dict[str, Any]) -> bool:
+        kind = stored.get("kind", "")
+        resumer = _resumers.get(kind)
+        if resumer is None or stored.get("attempts", 1) > settings.JOB_MAX_ATTEMPTS:
+            await run_in_executor("db", finish_job, stored["id"], "failed", "not resumable")
+            JOBS_RESUMED.labels(kind, "failed").inc()
+            return False
+        try:
+            async with job_tracker.track(kind, stored.get("owner_id", ""), stored.get("payload"),
+                                         resumable=True, job_id=stored["id"]):
+                await resumer(stored)
+        except ServiceDraining:
+            await run_in_executor("db", finish_job, stored["id"], "interrupted")
+            return False
+        except Exception as e:
+            logger.error(f"Resuming job {stored['id']} ({kind}) failed: {e}")
+            await run_in_executor("db", finish_job, stored["id"], "failed", str(e))
+            JOBS_RESUMED.labels(kind, "failed").inc()
+            return False
+        await run_in_executor("db", finish_job, stored["id"], "done")
+        JOBS_RESUMED.labels(kind, "done").inc()
+        return True
+
+    results = await asyncio.gather(*(_resume(job) for job in jobs), return_exceptions=True)
+    resumed = sum(1 for r in results if r is True)
+    if jobs:
+        print(f"✅ Resumed {resumed}/{len(jobs)} interrupted job(s)")
+    return resumed
@@ -0,0 +1,266 @@
+"""
+Prometheus metrics for the CMS backend, exposed at /metrics.
+
+- HTTP request latency per route template
+- Response bytes before/after compression
+- Firestore calls, latency and documents read/written per firestore_db helper
+- LLM latency, token usage and errors per provider/model/operation
+- Estimated prompt size and prompt fields cut to fit the token budget
+- Session context (prompt prefix) cache hits and cached prompt tokens
+- Image generation duration
+- Requests rejected by rate limits / quotas
+- Coalesced (singleflight) calls
+- Shared cache hits/misses per namespace
+- Executor pool in-flight jobs and queue depth
+- Long-running jobs rejected, interrupted and resumed around shutdowns
+- Background tasks enqueued, processed (ok / retry / failed) and their run time
+"""
+import functools
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Iterator, Optional
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, REGISTRY, generate_latest
+from prometheus_client import multiprocess
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+from core.executors import executor_stats
+from core.tracing import add_firestore_io, current_request_stats, span
+
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+_LLM_BUCKETS = (0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "cms_http_request_duration_seconds", "HTTP request latency",
+    ["method", "route", "status"], buckets=_LATENCY_BUCKETS,
+)
+
+FIRESTORE_CALLS = Counter(
+    "cms_firestore_calls_total", "Firestore helper calls", ["helper", "outcome"],
+)
+FIRESTORE_DURATION = Histogram(
+    "cms_firestore_call_duration_seconds", "Firestore helper latency", ["helper"], buckets=_LATENCY_BUCKETS,
+)
+FIRESTORE_DOCS_READ = Counter(
+    "cms_firestore_documents_read_total", "Firestore documents read", ["helper"],
+)
+FIRESTORE_DOCS_WRITTEN = Counter(
+    "cms_firestore_documents_written_total", "Firestore documents written", ["helper"],
+)
+HTTP_COMPRESSED_BYTES = Counter(
+    "cms_http_compression_bytes_total", "Response bytes before (raw) and after (compressed) compression",
+    ["encoding", "kind"],
+)
+HTTP_FIRESTORE_DOCS_READ = Counter(
+    "cms_http_firestore_documents_read_total", "Firestore documents read while serving each route", ["method", "route"],
+)
+
+LLM_DURATION = Histogram(
+    "cms_llm_request_duration_seconds", "LLM call latency",
+    ["provider", "model", "operation"], buckets=_LLM_BUCKETS,
+)
+LLM_TOKENS = Counter(
+    "cms_llm_tokens_total", "LLM tokens used", ["provider", "model", "kind"],
+)
+LLM_ERRORS = Counter(
+    "cms_llm_errors_total", "LLM call errors", ["provider", "model", "operation"],
+)
+
+_PROMPT_TOKEN_BUCKETS = (100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000)
+LLM_PROMPT_TOKENS = Histogram(
+    "cms_llm_prompt_estimated_tokens", "Estimated prompt size sent to the LLM",
+    ["provider", "operation"], buckets=_PROMPT_TOKEN_BUCKETS,
+)
+LLM_PROMPT_TRUNCATIONS = Counter(
+    "cms_llm_prompt_truncations_total", "Prompt fields shortened to fit the prompt token budget",
+    ["operation", "field"],
+)
+LLM_CONTEXT_CACHE = Counter(
+    "cms_llm_context_cache_total", "Session context handle lookups (hit = reused for a later wizard step)",
+    ["provider", "result"],
+)
+
+RATE_LIMITED = Counter(
+    "cms_rate_limited_total", "Requests rejected by rate limits or quotas", ["route", "reason"],
+)
+
+SINGLEFLIGHT_CALLS = Counter(
+    "cms_singleflight_calls_total", "Calls that ran (leader) or joined an identical in-flight call (coalesced)",
+    ["group", "role"],
+)
+
+JOBS_REJECTED = Counter(
+    "cms_jobs_rejected_draining_total", "Long-running jobs refused because the worker is draining", ["kind"],
+)
+JOBS_INTERRUPTED = Counter(
+    "cms_jobs_interrupted_total", "Jobs still running at the drain deadline (persisted = saved for resumption)",
+    ["kind", "outcome"],
+)
+JOBS_RESUMED = Counter(
+    "cms_jobs_resumed_total", "Interrupted jobs resumed after a restart", ["kind", "outcome"],
+)
+
+CACHE_REQUESTS = Counter(
+    "cms_cache_requests_total", "Shared cache lookups per namespace", ["namespace", "result"],
+)
+
+TASKS_ENQUEUED = Counter(
+    "cms_tasks_enqueued_total", "Background tasks enqueued (error = could not be written to the queue)",
+    ["kind", "outcome"],
+)
+TASKS_PROCESSED = Counter(
+    "cms_tasks_processed_total", "Background task runs (retry = failed and rescheduled, failed = gave up)",
+    ["kind", "outcome"],
+)
+TASK_DURATION = Histogram(
+    "cms_task_duration_seconds", "Background task run time", ["kind"], buckets=_LLM_BUCKETS,
+)
+
+IMAGE_GENERATION_DURATION = Histogram(
+    "cms_image_generation_duration_seconds", "Cover image generation latency (provider call to stored file)",
+    ["provider", "outcome"], buckets=_LLM_BUCKETS,
+)
+
+
+# ---------------- Firestore ----------------
+_current_firestore_op: ContextVar[Optional[str]] = ContextVar("current_firestore_op", default=None)
+
+
+def firestore_op(helper: str) -> Callable:
+    """Decorator for firestore_db helpers: counts calls/outcome and records latency."""
+    def decorator(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            token = _current_firestore_op.set(helper)
+            start = time.perf_counter()
+            outcome = "ok"
+            try:
+                with span(f"firestore.{helper}"):
+                    return fn(*args, **kwargs)
+            except Exception:
+                outcome = "error"
+                raise
+            finally:
+                FIRESTORE_DURATION.labels(helper).observe(time.perf_counter() - start)
+                FIRESTORE_CALLS.labels(helper, outcome).inc()
+                _current_firestore_op.reset(token)
+        return wrapper
+    return decorator
+
+
+def record_firestore(reads: int = 0, writes: int = 0, rpcs: int = 1) -> None:
+    """
+    Account one Firestore RPC and the documents it read/written.
+
+    Counted per helper (Prometheus) and per request (core.tracing).
+    """
+    add_firestore_io(reads=reads, writes=writes, rpcs=rpcs)
+    helper = _current_firestore_op.get() or "other"
+    if reads:
+        FIRESTORE_DOCS_READ.labels(helper).inc(reads)
+    if writes:
+        FIRESTORE_DOCS_WRITTEN.labels(helper).inc(writes)
+
+
+# ---------------- LLM ----------------
+class LLMCall:
+    """Handle yielded by observe_llm to report token usage."""
+
+    def __init__(self, provider: str, model: str):
+        self.provider = provider
+        self.model = model
+
+    def usage(self, prompt_tokens: Optional[int], completion_tokens: Optional[int], cached_tokens: Optional[int] = 0) -> None:
+        if prompt_tokens:
+            LLM_TOKENS.labels(self.provider, self.model, "prompt").inc(prompt_tokens)
+        if completion_tokens:
+            LLM_TOKENS.labels(self.provider, self.model, "completion").inc(completion_tokens)
+        if cached_tokens:
+            # Prompt tokens served from the provider's prefix/context cache (a subset of "prompt")
+            LLM_TOKENS.labels(self.provider, self.model, "cached_prompt").inc(cached_tokens)
+
+
+@contextmanager
+def observe_llm(provider: str, model: str, operation: str) -> Iterator[LLMCall]:
+    """Time one LLM call and count it as an error if the block raises."""
+    start = time.perf_counter()
+    try:
+        yield LLMCall(provider, model)
+    except Exception:
+        LLM_ERRORS.labels(provider, model, operation).inc()
+        raise
+    finally:
+        LLM_DURATION.labels(provider, model, operation).observe(time.perf_counter() - start)
+
+
+# ---------------- Executors ----------------
+class _ExecutorCollector:
+    """Reads executor counters at scrape time."""
+
+    def collect(self):
+        inflight = GaugeMetricFamily("cms_executor_inflight", "Jobs running or queued per pool", labels=["pool"])
+        depth = GaugeMetricFamily("cms_executor_queue_depth", "Jobs waiting for a worker per pool", labels=["pool"])
+        workers = GaugeMetricFamily("cms_executor_max_workers", "Configured workers per pool", labels=["pool"])
+        rejected = CounterMetricFamily("cms_executor_rejected", "Jobs rejected by admission control", labels=["pool"])
+        for name, stats in executor_stats().items():
+            inflight.add_metric([name], stats["inflight"])
+            depth.add_metric([name], stats["queue_depth"])
+            workers.add_metric([name], stats["max_workers"])
+            rejected.add_metric([name], stats["rejected"])
+        yield inflight
+        yield depth
+        yield workers
+        yield rejected
+
+
+REGISTRY.register(_ExecutorCollector())
+
+
+# ---------------- HTTP ----------------
+class MetricsMiddleware:
+    """ASGI middleware recording request latency labelled by route template (not raw path)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            route_path = getattr(route, "path_format", None) or getattr(route, "path", None) or "unmatched"
+            HTTP_REQUEST_DURATION.labels(scope["method"], route_path, str(status["code"])).observe(
+                time.perf_counter() - start
+            )
+            stats = current_request_stats()
+            if stats is not None and stats.reads:
+                HTTP_FIRESTORE_DOCS_READ.labels(scope["method"], route_path).inc(stats.reads)
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """
+    Serialize all metrics in the Prometheus text format.
+
+    With several uvicorn workers, set PROMETHEUS_MULTIPROC_DIR so counters and
+    histograms are aggregated across processes (executor gauges stay per-process).
+    """
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        registry.register(_ExecutorCollector())
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
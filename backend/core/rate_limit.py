@@ -0,0 +1,251 @@
+"""
+Rate limiting and daily AI quotas.
+
+Two checks run before an expensive endpoint:
+- a token bucket per (route, client): `burst` requests at once, refilled at
+  `per_minute` / 60 tokens per second
+- a daily quota per client shared by all AI endpoints, counted in cost units
+  (text steps are cheap, a full blog or an image costs more)
+
+Clients are identified by user ID when the request carries a valid token, else
+by IP address. Exceeding either limit raises RateLimitExceeded, which the API
+turns into 429 + Retry-After. A request refused by the quota gets its bucket
+token back.
+
+Backends:
+- memory (default): per process, so with N uvicorn workers each worker enforces
+  the limits separately
+- redis: shared by all workers/instances (RATE_LIMIT_BACKEND=redis, REDIS_URL);
+  needs the `redis` package. If Redis is unreachable, requests are allowed and a
+  warning is logged rather than failing the API.
+"""
+import logging
+import math
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Tuple
+
+from fastapi import Depends, Request
+
+from core.config import settings
+from core.deps import get_optional_user
+from core.metrics import RATE_LIMITED
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a client is over its rate limit or daily quota."""
+
+    def __init__(self, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.detail = detail
+        self.retry_after = max(1, retry_after)
+
+
+def _seconds_until_utc_midnight(now: Optional[datetime] = None) -> int:
+    now = now or datetime.now(timezone.utc)
+    midnight = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return max(1, math.ceil((midnight - now).total_seconds()))
+
+
+class MemoryRateLimitBackend:
+    """Token buckets and quota counters in process memory."""
+
+    # Drop idle buckets once this many keys are tracked
+    MAX_KEYS = 100_000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, Tuple[float, float]] = {}  # key -> (tokens, last refill time)
+        self._quotas: Dict[str, Tuple[int, float]] = {}  # key -> (used, expires at)
+
+    async def take_token(self, key: str, capacity: int, refill_per_sec: float, cost: int = 1) -> Tuple[bool, float]:
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.get(key, (float(capacity), now))
+            tokens = min(float(capacity), tokens + (now - last) * refill_per_sec)
+            if tokens >= cost:
+                self._buckets[key] = (tokens - cost, now)
+                allowed, retry_after = True, 0.0
+            else:
+                self._buckets[key] = (tokens, now)
+                allowed, retry_after = False, (cost - tokens) / refill_per_sec
+            if len(self._buckets) > self.MAX_KEYS:
+                self._prune(now)
+        return allowed, retry_after
+
+    async def refund_token(self, key: str, capacity: int, cost: int = 1) -> None:
+        with self._lock:
+            if key in self._buckets:
+                tokens, last = self._buckets[key]
+                self._buckets[key] = (min(float(capacity), tokens + cost), last)
+
+    async def consume_quota(self, key: str, limit: int, cost: int, ttl: int) -> Tuple[bool, int]:
+        now = time.time()
+        with self._lock:
+            used, expires_at = self._quotas.get(key, (0, now + ttl))
+            if expires_at <= now:
+                used, expires_at = 0, now + ttl
+            if used + cost > limit:
+                return False, used
+            self._quotas[key] = (used + cost, expires_at)
+            if len(self._quotas) > self.MAX_KEYS:
+                self._quotas = {k: v for k, v in self._quotas.items() if v[1] > now}
+            return True, used + cost
+
+    def _prune(self, now: float) -> None:
+        # Buckets idle for 10 minutes are full again for any sane refill rate
+        self._buckets = {k: v for k, v in self._buckets.items() if now - v[1] < 600}
+
+
+_TOKEN_BUCKET_LUA = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+local retry_after = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    retry_after = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return {allowed, tostring(retry_after)}
+"""
+
+_REFUND_TOKEN_LUA = """
+local tokens = tonumber(redis.call('HGET', KEYS[1], 'tokens'))
+if tokens then
+    redis.call('HSET', KEYS[1], 'tokens', math.min(tonumber(ARGV[1]), tokens + tonumber(ARGV[2])))
+end
+return 1
+"""
+
+_QUOTA_LUA = """
+local limit = tonumber(ARGV[1])
+local cost = tonumber(ARGV[2])
+local used = tonumber(redis.call('GET', KEYS[1]) or '0')
+if used + cost > limit then
+    return {0, used}
+end
+used = redis.call('INCRBY', KEYS[1], cost)
+if used == cost then
+    redis.call('EXPIRE', KEYS[1], tonumber(ARGV[3]))
+end
+return {1, used}
+"""
+
+
+class RedisRateLimitBackend:
+    """Token buckets and quota counters in Redis (atomic Lua scripts), shared across workers."""
+
+    def __init__(self, url: str, prefix: str = "cms:ratelimit:"):
+        import redis.asyncio as redis_asyncio
+
+        self._redis = redis_asyncio.from_url(url)
+        self._prefix = prefix
+        self._bucket_script = self._redis.register_script(_TOKEN_BUCKET_LUA)
+        self._refund_script = self._redis.register_script(_REFUND_TOKEN_LUA)
+        self._quota_script = self._redis.register_script(_QUOTA_LUA)
+
+    async def take_token(self, key: str, capacity: int, refill_per_sec: float, cost: int = 1) -> Tuple[bool, float]:
+        try:
+            allowed, retry_after = await self._bucket_script(
+                keys=[self._prefix + key], args=[capacity, refill_per_sec, time.time(), cost]
+            )
+        except Exception as e:
+            logger.warning(f"Rate limit backend unavailable, allowing request: {e}")
+            return True, 0.0
+        return bool(int(allowed)), float(retry_after)
+
+    async def refund_token(self, key: str, capacity: int, cost: int = 1) -> None:
+        try:
+            await self._refund_script(keys=[self._prefix + key], args=[capacity, cost])
+        except Exception as e:
+            logger.warning(f"Rate limit backend unavailable, token not refunded: {e}")
+
+    async def consume_quota(self, key: str, limit: int, cost: int, ttl: int) -> Tuple[bool, int]:
+        try:
+            allowed, used = await self._quota_script(keys=[self._prefix + key], args=[limit, cost, ttl])
+        except Exception as e:
+            logger.warning(f"Quota backend unavailable, allowing request: {e}")
+            return True, 0
+        return bool(int(allowed)), int(used)
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_rate_limit_backend():
+    """Get (lazily creating) the configured backend."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                if settings.RATE_LIMIT_BACKEND == "redis":
+                    _backend = RedisRateLimitBackend(settings.REDIS_URL)
+                    logger.info("Rate limiting uses Redis backend")
+                else:
+                    _backend = MemoryRateLimitBackend()
+    return _backend
+
+
+def client_key(request: Request, user: Optional[dict]) -> str:
+    """
+    user:<id> for authenticated requests, otherwise ip:<address>.
+
+    Behind proxies (TRUST_PROXY_HEADERS), the address is the X-Forwarded-For
+    entry added by the outermost of our TRUSTED_PROXY_HOPS proxies: each proxy
+    appends the peer it saw, so entries left of that one are client-supplied.
+    """
+    if user:
+        return f"user:{user['id']}"
+    if settings.TRUST_PROXY_HEADERS:
+        hops = [h.strip() for h in request.headers.get("x-forwarded-for", "").split(",") if h.strip()]
+        if len(hops) >= settings.TRUSTED_PROXY_HOPS > 0:
+            return f"ip:{hops[-settings.TRUSTED_PROXY_HOPS]}"
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+def ai_rate_limit(route: str, cost: int = 1):
+    """
+    Dependency enforcing the AI token bucket for `route` and the shared daily AI quota.
+
+    Usage: @router.post("/ideas", dependencies=[Depends(ai_rate_limit("ideas"))])
+    """
+    async def dependency(request: Request, user: Optional[dict] = Depends(get_optional_user)) -> None:
+        if not settings.RATE_LIMIT_ENABLED:
+            return
+        backend = get_rate_limit_backend()
+        key = client_key(request, user)
+
+        bucket = f"ai:{route}:{key}"
+        allowed, retry_after = await backend.take_token(
+            bucket,
+            capacity=settings.AI_RATE_LIMIT_BURST,
+            refill_per_sec=settings.AI_RATE_LIMIT_PER_MINUTE / 60.0,
+        )
+        if not allowed:
+            RATE_LIMITED.labels(route, "rate").inc()
+            raise RateLimitExceeded("Too many AI requests, please slow down.", math.ceil(retry_after))
+
+        if settings.AI_DAILY_QUOTA > 0:
+            day = datetime.now(timezone.utc).strftime("%Y%m%d")
+            ttl = _seconds_until_utc_midnight()
+            allowed, _ = await backend.consume_quota(f"ai-quota:{day}:{key}", settings.AI_DAILY_QUOTA, cost, ttl)
+            if not allowed:
+                await backend.refund_token(bucket, capacity=settings.AI_RATE_LIMIT_BURST)
+                RATE_LIMITED.labels(route, "quota").inc()
+                raise RateLimitExceeded("Daily AI quota exhausted, try again tomorrow.", ttl)
+
+    return dependency
@@ -0,0 +1,185 @@
+"""
+Startup warm-up and readiness checks.
+
+warm_up() runs in the app lifespan before the worker accepts traffic. It
+creates the Firestore, Firebase, GCS and LLM clients, imports the SDKs that are
+otherwise loaded on first use, and records the result of each step, so the
+first real request after a deploy does not pay for any of it.
+
+/ready reports those results: 200 once warm-up finished and every required
+dependency is usable, 503 otherwise (while warming up, draining, or when
+Firestore is unreachable). Firestore is re-pinged at most every
+READY_CHECK_TTL_SECONDS so the probe tracks its health without adding load.
+LLM/GCS checks only construct clients; they never spend tokens or upload.
+
+/health stays a static liveness check.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, Optional
+
+from core.config import settings
+from core.executors import run_in_executor
+from core.metrics import firestore_op, record_firestore
+
+logger = logging.getLogger(__name__)
+
+
+class DependencyStatus:
+    """Outcome of the last check of one dependency."""
+
+    def __init__(self, name: str, required: bool):
+        self.name = name
+        self.required = required
+        self.ok: Optional[bool] = None  # None = not checked yet
+        self.detail = "pending"
+        self.latency_ms = 0.0
+        self.checked_at = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "ok": self.ok,
+            "required": self.required,
+            "detail": self.detail,
+            "latency_ms": round(self.latency_ms, 1),
+        }
+
+
+class Readiness:
+    """Per-dependency status plus the warm-up/draining flags of this worker."""
+
+    def __init__(self):
+        self.warmed_up = False
+        self.draining = False
+        self.dependencies: Dict[str, DependencyStatus] = {}
+
+    def status(self, name: str, required: bool = False) -> DependencyStatus:
+        if name not in self.dependencies:
+            self.dependencies[name] = DependencyStatus(name, required)
+        return self.dependencies[name]
+
+    def is_ready(self) -> bool:
+        if not self.warmed_up or self.draining:
+            return False
+        return all(d.ok for d in self.dependencies.values() if d.required)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "ready": self.is_ready(),
+            "warmed_up": self.warmed_up,
+            "draining": self.draining,
+            "dependencies": {name: d.as_dict() for name, d in self.dependencies.items()},
+        }
+
+
+readiness = Readiness()
+
+
+# ---------------- checks (blocking, run on executor pools) ----------------
+@firestore_op("readiness_ping")
+def _check_firestore() -> str:
+    from core.firestore_db import get_db
+
+    docs = get_db().collection("users").limit(1).get()
+    record_firestore(reads=len(docs))
+    return "reachable"
+
+
+def _check_firebase() -> str:
+    from core.deps import firebase_available
+
+    if not firebase_available():
+        raise RuntimeError("Firebase Admin SDK could not be initialized")
+    return "initialized"
+
+
+def _check_storage() -> str:
+    if not settings.GCS_BUCKET:
+        return "skipped (GCS_BUCKET not set)"
+    from app.services.image_service import _get_storage_client
+
+    _get_storage_client().bucket(settings.GCS_BUCKET)
+    return "client ready"
+
+
+def _check_gemini() -> str:
+    if not settings.GEMINI_API_KEY:
+        raise RuntimeError("GEMINI_API_KEY is not set")
+    from app.services import gemini_service, image_service
+
+    gemini_service._get_model()
+    image_service._get_client()
+    return "clients ready"
+
+
+def _check_openai() -> str:
+    if not settings.OPENAI_API_KEY:
+        return "skipped (OPENAI_API_KEY not set)"
+    from app.services import image_service, openai_service
+
+    openai_service._get_client()
+    image_service._get_openai_client()
+    return "clients ready"
+
+
+def _prime_imports() -> str:
+    """Import what the API otherwise loads on first use (Pillow, markdown)."""
+    import PIL.Image  # noqa: F401
+
+    from app.services.markdown_service import markdown_to_html
+
+    markdown_to_html("# warm-up")
+    return "done"
+
+
+# name -> (check, executor pool, required for readiness)
+_CHECKS: Dict[str, tuple] = {
+    "firestore": (_check_firestore, "db", True),
+    "firebase": (_check_firebase, "db", False),
+    "storage": (_check_storage, "storage", False),
+    "gemini": (_check_gemini, "llm", False),
+    "openai": (_check_openai, "llm", False),
+    "imports": (_prime_imports, "llm", False),
+}
+
+
+async def _run_check(name: str, check: Callable[[], str], pool: str, required: bool) -> None:
+    status = readiness.status(name, required)
+    start = time.perf_counter()
+    try:
+        status.detail = await asyncio.wait_for(
+            run_in_executor(pool, check), timeout=settings.WARMUP_TIMEOUT_SECONDS
+        )
+        status.ok = True
+    except asyncio.TimeoutError:
+        status.ok, status.detail = False, f"timed out after {settings.WARMUP_TIMEOUT_SECONDS}s"
+    except Exception as e:
+        status.ok, status.detail = False, str(e) or e.__class__.__name__
+    status.latency_ms = (time.perf_counter() - start) * 1000
+    status.checked_at = time.monotonic()
+    if not status.ok:
+        log = logger.error if required else logger.warning
+        log(f"Warm-up check '{name}' failed: {status.detail}")
+
+
+async def warm_up() -> Readiness:
+    """Run every check concurrently; the worker is ready once required ones pass."""
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        _run_check(name, check, pool, required) for name, (check, pool, required) in _CHECKS.items()
+    ))
+    readiness.warmed_up = True
+    failed = [name for name, d in readiness.dependencies.items() if not d.ok]
+    print(f"✅ Warm-up finished in {(time.perf_counter() - start) * 1000:.0f} ms"
+          + (f" (failed: {', '.join(failed)})" if failed else ""))
+    return readiness
+
+
+async def check_ready() -> Readiness:
+    """Readiness for /ready, re-pinging Firestore when its last check is older than the TTL."""
+    if readiness.warmed_up and not readiness.draining:
+        firestore = readiness.status("firestore", required=True)
+        if time.monotonic() - firestore.checked_at > settings.READY_CHECK_TTL_SECONDS:
+            await _run_check("firestore", _check_firestore, "db", True)
+    return readiness
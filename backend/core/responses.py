@@ -0,0 +1,41 @@
+"""
+Fast JSON encoding.
+
+Routes with a response_model are serialized by FastAPI straight to JSON bytes
+through Pydantic (Rust), which is faster than any response class that first
+runs jsonable_encoder, so they keep the default JSONResponse.
+
+Everything else that encodes JSON by hand uses dumps_json(): responses built
+in code (FastJSONResponse), shared cache values and ETag content hashes.
+It uses orjson when installed and falls back to the standard library.
+Datetimes are encoded as ISO 8601 strings in both cases, like in API responses.
+"""
+import json
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+def dumps_json(value: Any) -> bytes:
+    """Compact JSON bytes (orjson if available)."""
+    if orjson is not None:
+        return orjson.dumps(value, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, default=_default, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse encoded with dumps_json (for responses built in code, not via response_model)."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps_json(content)
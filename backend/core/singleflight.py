@@ -0,0 +1,104 @@
+"""
+Request coalescing ("singleflight") for identical in-flight calls.
+
+When the same expensive call (an LLM generation, an image, a Firestore list
+query) is already running, later identical callers await that call instead of
+starting their own. The call runs as its own task, so a caller that goes away
+(client disconnect) does not cancel it for the others. Nothing is cached: once
+the call finishes, the next caller starts a fresh one. The call's Firestore I/O
+is tallied apart and charged to every caller's request stats (core.tracing),
+since each of them needed those reads to answer.
+
+    _group = SingleFlight("gemini")
+
+    @_group.coalesce("topic_ideas")
+    async def gen_topic_ideas(payload: dict) -> List[str]: ...
+
+Keys are built from the call's arguments with make_key(), so dict ordering and
+surrounding whitespace in strings do not matter.
+"""
+import asyncio
+import copy
+import functools
+import hashlib
+import json
+from typing import Any, Awaitable, Callable, Dict, Tuple, TypeVar
+
+from core.metrics import SINGLEFLIGHT_CALLS
+from core.tracing import RequestStats, add_firestore_io, separate_io
+
+T = TypeVar("T")
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    return value
+
+
+def make_key(*parts: Any) -> str:
+    """Stable hash of normalized call parameters."""
+    raw = json.dumps(_normalize(list(parts)), sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key onto one asyncio task."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: Dict[str, Tuple[asyncio.Task, RequestStats]] = {}
+
+    def inflight(self) -> int:
+        return len(self._inflight)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run fn() unless a call with this key is in flight, then share its outcome.
+
+        Every caller gets its own deep copy of the result, so callers may mutate it.
+        Exceptions are shared the same way, and so is the Firestore I/O charged
+        to each caller's request.
+        """
+        entry = self._inflight.get(key)
+        if entry is None:
+            SINGLEFLIGHT_CALLS.labels(self.name, "leader").inc()
+            stats = RequestStats()
+            entry = (asyncio.ensure_future(self._run(fn, stats)), stats)
+            self._inflight[key] = entry
+            entry[0].add_done_callback(functools.partial(self._done, key))
+        else:
+            SINGLEFLIGHT_CALLS.labels(self.name, "coalesced").inc()
+        task, stats = entry
+        try:
+            # shield: a cancelled caller must not cancel the call for everyone else
+            result = await asyncio.shield(task)
+        finally:
+            if task.done():
+                add_firestore_io(**stats.as_dict())
+        return copy.deepcopy(result)
+
+    @staticmethod
+    async def _run(fn: Callable[[], Awaitable[T]], stats: RequestStats) -> T:
+        with separate_io(stats):
+            return await fn()
+
+    def _done(self, key: str, task: asyncio.Task) -> None:
+        self._inflight.pop(key, None)
+        # Mark the exception as retrieved in case every caller went away
+        if not task.cancelled():
+            task.exception()
+
+    def coalesce(self, operation: str) -> Callable:
+        """Decorator coalescing an async function on (operation, args, kwargs)."""
+        def decorator(fn: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+            @functools.wraps(fn)
+            async def wrapper(*args: Any, **kwargs: Any) -> T:
+                key = make_key(operation, args, kwargs)
+                return await self.do(key, lambda: fn(*args, **kwargs))
+            return wrapper
+        return decorator
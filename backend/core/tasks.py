@@ -0,0 +1,344 @@
+"""
+Durable background tasks for slow side effects of a request.
+
+Publishing a blog should not make the admin wait for static page rendering,
+feed regeneration or thumbnails. Handlers enqueue a task instead and return;
+a TaskWorker in every worker process runs it shortly after.
+
+- Durable: tasks are rows in a local SQLite file (TASK_QUEUE_PATH, WAL mode)
+  shared by all worker processes of the host, so they survive restarts and
+  crashes. A running task holds a lease (TASK_LEASE_SECONDS); if its worker
+  dies, another worker claims it again once the lease expires.
+- Retries: a failed run is retried with exponential backoff
+  (TASK_RETRY_BASE_SECONDS * 2^n) up to TASK_MAX_ATTEMPTS, then kept as
+  "failed" until it is enqueued again.
+- Idempotency keys: a key has at most one pending run. Enqueueing a key that
+  is already queued only updates its payload; while it runs, it is queued once
+  more after it finishes; a finished key is queued again. Delivery is
+  at-least-once, so handlers must be idempotent: they derive their output
+  from the current state (e.g. re-read the blog) rather than from the event.
+
+Queue statements are single-row writes on a local file, so like the SQLite
+cache backend they run on the calling thread, with lock waits capped at the
+busy timeout.
+
+    @task_handler("blog.thumbnail")
+    async def make_thumbnail(payload): ...
+
+    await enqueue_task("blog.thumbnail", {"blog_id": blog_id}, key=f"blog.thumbnail:{blog_id}")
+"""
+import asyncio
+import json
+import logging
+import os
+import random
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from core.config import settings
+from core.metrics import TASK_DURATION, TASKS_ENQUEUED, TASKS_PROCESSED
+from core.responses import dumps_json
+
+logger = logging.getLogger(__name__)
+
+TaskHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+_handlers: Dict[str, TaskHandler] = {}
+
+
+def task_handler(kind: str) -> Callable[[TaskHandler], TaskHandler]:
+    """Register the coroutine that runs tasks of this kind (receives the payload)."""
+    def decorator(fn: TaskHandler) -> TaskHandler:
+        _handlers[kind] = fn
+        return fn
+    return decorator
+
+
+class TaskQueue:
+    """Task rows in a local SQLite file, shared by the worker processes of one host."""
+
+    def __init__(self, path: str, busy_timeout: float = 1.0):
+        self._path = path
+        self._busy_timeout = busy_timeout
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS tasks ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " kind TEXT NOT NULL,"
+            " key TEXT NOT NULL UNIQUE,"
+            " payload TEXT NOT NULL,"
+            " status TEXT NOT NULL,"  # queued | running | done | failed
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " rerun INTEGER NOT NULL DEFAULT 0,"
+            " run_after REAL NOT NULL,"
+            " lease_until REAL NOT NULL DEFAULT 0,"
+            " worker TEXT,"
+            " last_error TEXT,"
+            " created_at REAL NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS tasks_due ON tasks (status, run_after)")
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self._path, timeout=self._busy_timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def enqueue(self, kind: str, payload: Dict[str, Any], key: str, delay: float = 0) -> None:
+        now = time.time()
+        self._connection().execute(
+            "INSERT INTO tasks (kind, key, payload, status, run_after, created_at, updated_at)"
+            " VALUES (?, ?, ?, 'queued', ?, ?, ?)"
+            " ON CONFLICT(key) DO UPDATE SET"
+            "  payload = excluded.payload,"
+            "  rerun = CASE WHEN status = 'running' THEN 1 ELSE rerun END,"
+            "  attempts = CASE WHEN status IN ('done', 'failed') THEN 0 ELSE attempts END,"
+            "  run_after = CASE WHEN status = 'running' THEN run_after"
+            "   WHEN status = 'queued' THEN MIN(run_after, excluded.run_after) ELSE excluded.run_after END,"
+            "  status = CASE WHEN status IN ('done', 'failed') THEN 'queued' ELSE status END,"
+            "  updated_at = excluded.updated_at",
+            (kind, key, dumps_json(payload).decode("utf-8"), now + delay, now, now),
+        )
+
+    def claim(self, worker: str, limit: int, lease: float) -> List[Dict[str, Any]]:
+        """Atomically take up to limit due tasks (and tasks whose lease expired)."""
+        now = time.time()
+        rows = self._connection().execute(
+            "UPDATE tasks SET status = 'running', worker = ?, lease_until = ?, attempts = attempts + 1,"
+            " rerun = 0, updated_at = ?"
+            " WHERE id IN (SELECT id FROM tasks"
+            "  WHERE (status = 'queued' AND run_after <= ?) OR (status = 'running' AND lease_until < ?)"
+            "  ORDER BY run_after LIMIT ?)"
+            " RETURNING id, kind, key, payload, attempts",
+            (worker, now + lease, now, now, now, limit),
+        ).fetchall()
+        return [
+            {"id": row[0], "kind": row[1], "key": row[2], "payload": json.loads(row[3]), "attempts": row[4]}
+            for row in rows
+        ]
+
+    def complete(self, task_id: int, worker: str) -> None:
+        """Mark a run done, or queue the task again if it was re-enqueued while running."""
+        now = time.time()
+        self._connection().execute(
+            "UPDATE tasks SET status = CASE WHEN rerun = 1 THEN 'queued' ELSE 'done' END,"
+            " attempts = CASE WHEN rerun = 1 THEN 0 ELSE attempts END,"
+            " rerun = 0, run_after = ?, lease_until = 0, last_error = NULL, updated_at = ?"
+            " WHERE id = ? AND worker = ? AND status = 'running'",
+            (now, now, task_id, worker),
+        )
+
+    def fail(self, task_id: int, worker: str, error: str, retry_at: Optional[float]) -> None:
+        """Schedule a retry at retry_at, or give up (failed) when retry_at is None."""
+        now = time.time()
+        self._connection().execute(
+            "UPDATE tasks SET status = CASE WHEN ? IS NULL AND rerun = 0 THEN 'failed' ELSE 'queued' END,"
+            " attempts = CASE WHEN ? IS NULL AND rerun = 1 THEN 0 ELSE attempts END,"
+            " run_after = COALESCE(?, ?), rerun = 0, lease_until = 0, last_error = ?, updated_at = ?"
+            " WHERE id = ? AND worker = ? AND status = 'running'",
+            (retry_at, retry_at, retry_at, now, error[:2000], now, task_id, worker),
+        )
+
+    def release(self, task_ids: List[int], worker: str) -> None:
+        """Put tasks interrupted by a shutdown back in the queue without using up an attempt."""
+        now = time.time()
+        conn = self._connection()
+        for task_id in task_ids:
+            conn.execute(
+                "UPDATE tasks SET status = 'queued', attempts = MAX(0, attempts - 1), rerun = 0, run_after = ?,"
+                " lease_until = 0, updated_at = ? WHERE id = ? AND worker = ? AND status = 'running'",
+                (now, now, task_id, worker),
+            )
+
+    def purge(self, older_than: float) -> int:
+        """Delete finished tasks last updated before older_than (epoch seconds)."""
+        cursor = self._connection().execute(
+            "DELETE FROM tasks WHERE status IN ('done', 'failed') AND updated_at < ?", (older_than,)
+        )
+        return cursor.rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        conn = self._connection()
+        counts = dict(conn.execute("SELECT status, COUNT(*) FROM tasks GROUP BY status").fetchall())
+        failed = conn.execute(
+            "SELECT kind, key, attempts, last_error, updated_at FROM tasks WHERE status = 'failed'"
+            " ORDER BY updated_at DESC LIMIT 20"
+        ).fetchall()
+        return {
+            "counts": {status: counts.get(status, 0) for status in ("queued", "running", "done", "failed")},
+            "recent_failures": [
+                {"kind": k, "key": key, "attempts": a, "error": err, "updated_at": u}
+                for k, key, a, err, u in failed
+            ],
+        }
+
+
+_queue: Optional[TaskQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_task_queue() -> TaskQueue:
+    """Get (lazily creating) the queue at TASK_QUEUE_PATH."""
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = TaskQueue(settings.TASK_QUEUE_PATH)
+    return _queue
+
+
+class TaskWorker:
+    """Claims due tasks from the queue and runs their handlers on this event loop."""
+
+    PURGE_INTERVAL_SECONDS = 3600
+
+    def __init__(self, queue: TaskQueue):
+        self.queue = queue
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._wake = asyncio.Event()
+        self._stopping = False
+        self._loop_task: Optional[asyncio.Task] = None
+        self._running: Dict[int, asyncio.Task] = {}
+        self._last_purge = 0.0
+
+    def start(self) -> None:
+        self._loop_task = asyncio.create_task(self._run())
+
+    def notify(self) -> None:
+        """A task was enqueued by this process: claim it now instead of at the next poll."""
+        self._wake.set()
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            free = settings.TASK_CONCURRENCY - len(self._running)
+            if free > 0:
+                try:
+                    for task in self.queue.claim(self.worker_id, free, settings.TASK_LEASE_SECONDS):
+                        self._running[task["id"]] = asyncio.create_task(self._execute(task))
+                    self._maybe_purge()
+                except Exception as e:
+                    logger.error(f"Task queue unavailable: {e}")
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), settings.TASK_POLL_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _execute(self, task: Dict[str, Any]) -> None:
+        kind = task["kind"]
+        start = time.perf_counter()
+        try:
+            handler = _handlers.get(kind)
+            if handler is None:
+                raise LookupError(f"No handler registered for task kind '{kind}'")
+            await asyncio.wait_for(handler(task["payload"]), settings.TASK_TIMEOUT_SECONDS)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if task["attempts"] >= settings.TASK_MAX_ATTEMPTS:
+                retry_at, outcome = None, "failed"
+                logger.error(f"Task {task['key']} failed after {task['attempts']} attempts: {e}")
+            else:
+                delay = settings.TASK_RETRY_BASE_SECONDS * 2 ** (task["attempts"] - 1)
+                retry_at, outcome = time.time() + delay * random.uniform(0.8, 1.2), "retry"
+                logger.warning(f"Task {task['key']} failed (attempt {task['attempts']}), retrying in ~{delay:.0f}s: {e}")
+            self._finish(task, outcome, lambda: self.queue.fail(task["id"], self.worker_id, f"{type(e).__name__}: {e}", retry_at))
+        else:
+            self._finish(task, "ok", lambda: self.queue.complete(task["id"], self.worker_id))
+        finally:
+            TASK_DURATION.labels(kind).observe(time.perf_counter() - start)
+            self._running.pop(task["id"], None)
+            self._wake.set()
+
+    def _finish(self, task: Dict[str, Any], outcome: str, record: Callable[[], None]) -> None:
+        TASKS_PROCESSED.labels(task["kind"], outcome).inc()
+        try:
+            record()
+        except Exception as e:
+            # The lease expires and the task runs again (handlers are idempotent)
+            logger.error(f"Could not record outcome of task {task['key']}: {e}")
+
+    def _maybe_purge(self) -> None:
+        now = time.time()
+        if now - self._last_purge >= self.PURGE_INTERVAL_SECONDS:
+            self._last_purge = now
+            purged = self.queue.purge(now - settings.TASK_RETENTION_HOURS * 3600)
+            if purged:
+                logger.info(f"Purged {purged} finished task(s)")
+
+    async def stop(self, timeout: float) -> bool:
+        """Stop claiming, wait up to timeout for running tasks, re-queue the rest; True if all finished."""
+        self._stopping = True
+        self._wake.set()
+        if self._loop_task is not None:
+            await asyncio.gather(self._loop_task, return_exceptions=True)
+        running = list(self._running.values())
+        if running:
+            await asyncio.wait(running, timeout=timeout)
+        unfinished = {task_id: t for task_id, t in self._running.items() if not t.done()}
+        for t in unfinished.values():
+            t.cancel()
+        if unfinished:
+            await asyncio.gather(*unfinished.values(), return_exceptions=True)
+            try:
+                self.queue.release(list(unfinished), self.worker_id)
+            except Exception as e:
+                logger.error(f"Could not re-queue {len(unfinished)} interrupted task(s): {e}")
+        return not unfinished
+
+
+_worker: Optional[TaskWorker] = None
+
+
+def start_task_worker() -> None:
+    """Start this process's worker (lifespan startup)."""
+    global _worker
+    if not settings.TASK_WORKER_ENABLED:
+        return
+    _worker = TaskWorker(get_task_queue())
+    _worker.start()
+    print(f"✅ Task worker started ({_worker.worker_id}, concurrency {settings.TASK_CONCURRENCY}, "
+          f"handlers: {sorted(_handlers)})")
+
+
+async def stop_task_worker(timeout: float) -> bool:
+    """Stop this process's worker (lifespan shutdown); tasks that do not finish go back to the queue."""
+    global _worker
+    if _worker is None:
+        return True
+    worker, _worker = _worker, None
+    return await worker.stop(timeout)
+
+
+async def enqueue_task(kind: str, payload: Dict[str, Any], key: Optional[str] = None, delay: float = 0) -> bool:
+    """
+    Add a task to the queue (see module docstring for key semantics).
+
+    Never raises: the request that triggered the task has already committed its
+    change, so a queue error is logged and counted instead of failing it.
+    """
+    try:
+        get_task_queue().enqueue(kind, payload, key or f"{kind}:{uuid.uuid4().hex}", delay)
+    except Exception as e:
+        TASKS_ENQUEUED.labels(kind, "error").inc()
+        logger.error(f"Could not enqueue task {kind} ({key}): {e}")
+        return False
+    TASKS_ENQUEUED.labels(kind, "ok").inc()
+    if _worker is not None and delay <= 0:
+        _worker.notify()
+    return True
+
+
+def task_stats() -> Dict[str, Any]:
+    stats = get_task_queue().stats()
+    stats["worker"] = None if _worker is None else {"id": _worker.worker_id, "running": len(_worker._running)}
+    return stats
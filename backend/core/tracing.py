@@ -0,0 +1,188 @@
+"""
+Per-request tracing and Firestore I/O accounting.
+
+Every HTTP request gets a RequestStats object in a contextvar. The firestore_db
+helpers (via core.metrics.record_firestore) and the auth user lookup add the
+documents they read/write and the RPCs they issue to it, so each request knows
+exactly how much Firestore quota it used. The context is copied into executor
+threads, and RequestStats is shared by reference, so work offloaded with
+run_in_executor is counted too.
+
+The totals are exported:
+- as X-Firestore-* / X-Response-Time-Ms response headers when TRACE_HEADERS is on
+- as attributes of an OpenTelemetry span per request (plus a child span per
+  Firestore helper). With TRACING_EXPORT_FILE set, spans are written as JSON
+  lines to that file; this needs opentelemetry-sdk. Without it the OpenTelemetry
+  API is a no-op unless the deployment installs its own tracer provider.
+"""
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:  # opentelemetry-api is optional
+    otel_trace = None
+
+
+class RequestStats:
+    """Firestore I/O tallied for one request."""
+
+    __slots__ = ("reads", "writes", "rpcs", "_lock")
+
+    def __init__(self):
+        self.reads = 0
+        self.writes = 0
+        self.rpcs = 0
+        self._lock = threading.Lock()
+
+    def add(self, reads: int = 0, writes: int = 0, rpcs: int = 0) -> None:
+        with self._lock:
+            self.reads += reads
+            self.writes += writes
+            self.rpcs += rpcs
+
+    def as_dict(self) -> Dict[str, int]:
+        return {"reads": self.reads, "writes": self.writes, "rpcs": self.rpcs}
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def current_request_stats() -> Optional[RequestStats]:
+    """Stats of the request being handled, or None outside a request (scripts, startup)."""
+    return _request_stats.get()
+
+
+def add_firestore_io(reads: int = 0, writes: int = 0, rpcs: int = 0) -> None:
+    """Add Firestore I/O to the current request (no-op outside a request)."""
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.add(reads=reads, writes=writes, rpcs=rpcs)
+
+
+@contextmanager
+def separate_io(stats: RequestStats) -> Iterator[RequestStats]:
+    """Tally the block's Firestore I/O in stats instead of the current request's."""
+    token = _request_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _request_stats.reset(token)
+
+
+# ---------------- OpenTelemetry ----------------
+def _get_tracer():
+    if otel_trace is None:
+        return None
+    return otel_trace.get_tracer("cms-backend")
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Any]:
+    """Start a child span if OpenTelemetry is installed; yields the span or None."""
+    tracer = _get_tracer()
+    if tracer is None:
+        yield None
+        return
+    with tracer.start_as_current_span(name, attributes=attributes or None) as current:
+        yield current
+
+
+def setup_tracing() -> None:
+    """
+    Install a tracer provider exporting spans to TRACING_EXPORT_FILE (JSON lines).
+
+    Does nothing when the setting is empty; logs a warning if opentelemetry-sdk is missing.
+    """
+    path = settings.TRACING_EXPORT_FILE
+    if not path:
+        return
+    try:
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor, SpanExporter, SpanExportResult
+    except ImportError:
+        logger.warning("TRACING_EXPORT_FILE is set but opentelemetry-sdk is not installed; spans are not exported")
+        return
+
+    class FileSpanExporter(SpanExporter):
+        """Append finished spans to a local file, one JSON object per line."""
+
+        def __init__(self, file_path: str):
+            self._lock = threading.Lock()
+            self._file = open(file_path, "a", encoding="utf-8")
+
+        def export(self, spans) -> "SpanExportResult":
+            with self._lock:
+                for s in spans:
+                    self._file.write(s.to_json(indent=None) + "\n")
+                self._file.flush()
+            return SpanExportResult.SUCCESS
+
+        def shutdown(self) -> None:
+            with self._lock:
+                self._file.close()
+
+    provider = TracerProvider(resource=Resource.create({"service.name": "cms-backend"}))
+    provider.add_span_processor(BatchSpanProcessor(FileSpanExporter(path)))
+    otel_trace.set_tracer_provider(provider)
+    logger.info(f"Tracing spans exported to {path}")
+
+
+# ---------------- Middleware ----------------
+class TracingMiddleware:
+    """
+    ASGI middleware opening a RequestStats context and a span per HTTP request.
+
+    Must be the outermost middleware that needs the stats (core.metrics reads
+    them to count documents read per route).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and settings.TRACE_HEADERS:
+                headers = list(message.get("headers", []))
+                headers += [
+                    (b"x-firestore-reads", str(stats.reads).encode()),
+                    (b"x-firestore-writes", str(stats.writes).encode()),
+                    (b"x-firestore-rpcs", str(stats.rpcs).encode()),
+                    (b"x-response-time-ms", f"{(time.perf_counter() - start) * 1000:.1f}".encode()),
+                ]
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            with span(f"{scope['method']} {scope.get('path', '')}", **{"http.method": scope["method"]}) as current:
+                try:
+                    await self.app(scope, receive, send_wrapper)
+                finally:
+                    if current is not None:
+                        route = scope.get("route")
+                        route_path = getattr(route, "path_format", None) or getattr(route, "path", None)
+                        if route_path:
+                            current.update_name(f"{scope['method']} {route_path}")
+                            current.set_attribute("http.route", route_path)
+                        current.set_attribute("firestore.documents_read", stats.reads)
+                        current.set_attribute("firestore.documents_written", stats.writes)
+                        current.set_attribute("firestore.rpcs", stats.rpcs)
+        finally:
+            _request_stats.reset(token)
@@ -0,0 +1,60 @@
+"""
+Gunicorn configuration for multi-worker deployments (uvicorn workers).
+
+    gunicorn main:app -c gunicorn.conf.py
+
+Every worker is a separate process with its own event loop, executor pools and
+lazily created clients (Firestore, GCS, Gemini/OpenAI, shared HTTP pool).
+The app is not preloaded: those clients open gRPC channels and threads that
+must not be inherited across fork(), so each worker creates them after fork,
+during its own lifespan warm-up.
+
+State that has to agree across workers is not kept in the worker:
+- shared caches: CACHE_BACKEND=sqlite (one host) or redis (several hosts)
+- rate limits / quotas: RATE_LIMIT_BACKEND=redis
+- Prometheus metrics: PROMETHEUS_MULTIPROC_DIR (dead workers are cleaned up below)
+
+Environment:
+    WEB_CONCURRENCY     workers (default: one per CPU core; async workers do not
+                        need 2n+1, blocking work runs on the executor pools)
+    PORT                listen port (default 8000)
+    DRAIN_TIMEOUT_SECONDS  graceful shutdown budget per worker (default 60)
+"""
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "0")) or multiprocessing.cpu_count()
+worker_class = "uvicorn_worker.UvicornWorker"
+preload_app = False
+
+backlog = 2048
+keepalive = 30
+# Worker heartbeat timeout; AI requests run on executor threads, the event loop stays responsive
+timeout = 120
+# SIGTERM -> worker drains in-flight jobs (core.jobs) before it is killed
+graceful_timeout = int(float(os.getenv("DRAIN_TIMEOUT_SECONDS", "60")))
+
+# Recycle workers now and then so slow leaks (SDK caches, fragmentation) stay bounded
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "5000"))
+max_requests_jitter = max_requests // 10
+
+accesslog = "-"
+errorlog = "-"
+
+
+def on_starting(server):
+    multiproc_dir = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if multiproc_dir:
+        os.makedirs(multiproc_dir, exist_ok=True)
+        # Stale files from a previous run would be summed into the new one
+        for name in os.listdir(multiproc_dir):
+            if name.endswith(".db"):
+                os.remove(os.path.join(multiproc_dir, name))
+
+
+def child_exit(server, worker):
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
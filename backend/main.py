@@ -3,36 +3,72 @@ import os
 import asyncio
 from concurrent.futures import ThreadPoolExecutor
 
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
 from fastapi.staticfiles import StaticFiles
 
+from core.compression import CompressionMiddleware
 from core.config import settings
+from core.deps import require_admin
+from core.executors import ExecutorSaturated, drain_executors, executor_stats, start_executors
+from core.http import close_http_client
+from core.jobs import (
+    ServiceDraining, begin_drain, install_drain_signal_handlers, job_tracker, persist_unfinished_jobs,
+    resume_interrupted_jobs,
+)
+from core.metrics import MetricsMiddleware, render_metrics
+from core.tracing import TracingMiddleware, setup_tracing
+from core.rate_limit import RateLimitExceeded
+from core.readiness import check_ready, readiness, warm_up
+from core.responses import FastJSONResponse
+from core.tasks import start_task_worker, stop_task_worker, task_stats
 from app.routers import auth, ai, blogs, admin, images
+from app.services import blog_tasks  # noqa: F401  (registers the background task handlers)
 
-# Thread pool configuration
-THREAD_POOL_WORKERS = int(os.getenv("THREAD_POOL_WORKERS", "300"))  # Default to 300 workers
+# Default loop executor (asyncio.to_thread / run_in_executor(None, ...)); workload
+# specific pools (db, storage, llm, imaging) live in core.executors
+THREAD_POOL_WORKERS = settings.THREAD_POOL_WORKERS
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """
     Application lifespan manager.
-    Firestore connection is initialized on first use via get_db().
+    Clients (Firestore, Firebase, GCS, LLM SDKs) are created by the warm-up
+    before the worker serves traffic; /ready reports the outcome.
     """
     # Startup
-    # Thread pool for concurrent users (blocking/sync work run via run_in_executor)
     thread_pool = ThreadPoolExecutor(max_workers=THREAD_POOL_WORKERS)
     loop = asyncio.get_running_loop()
     loop.set_default_executor(thread_pool)
     app.state.thread_pool = thread_pool
-    print(f"✅ Thread pool started: max_workers={THREAD_POOL_WORKERS}")
+    setup_tracing()
+    start_executors()
+    print(f"✅ Thread pools started: default max_workers={THREAD_POOL_WORKERS}, pools={list(executor_stats())}")
+    if settings.WARMUP_ENABLED:
+        await warm_up()
+    else:
+        readiness.warmed_up = True
+    install_drain_signal_handlers()
+    resume_task = asyncio.create_task(resume_interrupted_jobs()) if settings.JOB_RESUME_ENABLED else None
+    start_task_worker()
     
     yield
     
-    # Shutdown
-    thread_pool.shutdown(wait=False)
-    print("✅ Thread pool shut down")
+    # Shutdown: refuse new jobs, give in-flight jobs and background tasks until
+    # the drain deadline, save the jobs and re-queue the tasks that did not
+    # finish, then stop the pools
+    begin_drain()
+    idle, tasks_done = await asyncio.gather(job_tracker.wait_idle(), stop_task_worker(job_tracker.remaining()))
+    if resume_task is not None and not resume_task.done():
+        resume_task.cancel()
+        await asyncio.gather(resume_task, return_exceptions=True)
+    persisted = await persist_unfinished_jobs()
+    drained = await drain_executors(job_tracker.remaining(), thread_pool)
+    close_http_client()
+    print(f"✅ Thread pools shut down (jobs finished: {idle}, tasks finished: {tasks_done}, "
+          f"persisted for resume: {persisted}, pools drained: {drained})")
 
 
 # Create the main API application
@@ -49,24 +85,97 @@ api_app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Last-Modified"],
 )
+# br/gzip for text responses above COMPRESSION_MIN_SIZE (inside metrics, so latency includes it)
+if settings.COMPRESSION_ENABLED:
+    api_app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MIN_SIZE,
+        gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+        brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+    )
+# Request latency per route template, exported at /metrics
+api_app.add_middleware(MetricsMiddleware)
+# Per-request Firestore read/write/RPC accounting and spans (added last = outermost)
+api_app.add_middleware(TracingMiddleware)
 
 os.makedirs("uploads", exist_ok=True)
 api_app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
 
 
+@api_app.exception_handler(ExecutorSaturated)
+async def executor_saturated_handler(request: Request, exc: ExecutorSaturated):
+    """A worker pool is full: shed load instead of queueing without bound."""
+    return FastJSONResponse(
+        status_code=503,
+        content={"detail": f"Server busy ({exc.name}), please retry shortly."},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+@api_app.exception_handler(ServiceDraining)
+async def service_draining_handler(request: Request, exc: ServiceDraining):
+    """The worker is shutting down: the client should retry on another one."""
+    return FastJSONResponse(
+        status_code=503,
+        content={"detail": "Server is restarting, please retry shortly."},
+        headers={"Retry-After": str(exc.retry_after), "Connection": "close"},
+    )
+
+
+@api_app.exception_handler(RateLimitExceeded)
+async def rate_limit_handler(request: Request, exc: RateLimitExceeded):
+    """Client is over its rate limit or daily AI quota."""
+    return FastJSONResponse(
+        status_code=429,
+        content={"detail": exc.detail},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
 @api_app.get("/health")
 async def health_check():
     """Health check endpoint."""
     return {"status": "healthy, CI/CD running", "service": "cms-backend"}
 
 
+@api_app.get("/ready")
+async def ready_check():
+    """Readiness probe: 503 until warm-up is done and required dependencies are reachable."""
+    state = await check_ready()
+    return FastJSONResponse(
+        status_code=200 if state.is_ready() else 503,
+        content={**state.as_dict(), "jobs": job_tracker.stats()},
+    )
+
+
+@api_app.get("/health/executors", dependencies=[Depends(require_admin)])
+async def executors_health():
+    """Worker pool sizes, in-flight jobs and queue depth."""
+    return executor_stats()
+
+
+@api_app.get("/health/tasks", dependencies=[Depends(require_admin)])
+async def tasks_health():
+    """Background task queue: tasks per status, recent failures and this worker's running tasks."""
+    return task_stats()
+
+
+@api_app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint."""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+
 api_app.include_router(auth.router, prefix="/auth", tags=["auth"])
 api_app.include_router(ai.router, prefix="/ai", tags=["ai"])
 api_app.include_router(blogs.router, tags=["blogs"])
 api_app.include_router(images.router, tags=["images"])
 api_app.include_router(admin.router, prefix="/admin", tags=["admin"])
 
-# Create root app and mount API at /cms-backend
-app = FastAPI()
+# Create root app and mount API at /cms-backend.
+# Mounted sub-apps do not receive lifespan events, so the root app runs api_app's lifespan.
+app = FastAPI(lifespan=lambda root_app: lifespan(api_app))
 app.mount("/cms-backend", api_app)
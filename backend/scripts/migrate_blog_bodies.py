@@ -0,0 +1,29 @@
+"""
+Migrate legacy blog documents to the header/body storage layout.
+
+Moves the inline final_blog of every blogs/{blog_id} document into
+blogs/{blog_id}/content/body and leaves a small summary on the header.
+Safe to re-run: already migrated blogs have no inline final_blog and are skipped.
+
+Usage (from the backend directory):
+    python -m scripts.migrate_blog_bodies [--batch-size 200] [--dry-run]
+"""
+import argparse
+import logging
+
+from app.models.firestore_db import migrate_blog_bodies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Split blog bodies into separate Firestore documents")
+    parser.add_argument("--batch-size", type=int, default=200, help="Blogs migrated per batched write")
+    parser.add_argument("--dry-run", action="store_true", help="Only count blogs that need migration")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    count = migrate_blog_bodies(batch_size=args.batch_size, dry_run=args.dry_run)
+    print(f"✅ {'Blogs to migrate' if args.dry_run else 'Migrated blogs'}: {count}")
+
+
+if __name__ == "__main__":
+    main()